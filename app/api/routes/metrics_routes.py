@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Pipeline, LLM, queue and database metrics in the Prometheus text format.
+    """
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
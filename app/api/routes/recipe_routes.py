@@ -1,41 +1,180 @@
 import asyncio
+import hashlib
+import json
 from uuid import UUID, uuid4
-from typing import List
+from typing import List, Sequence
 
 from celery.result import AsyncResult
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.create_recipes import generate_recipe_task, celery_app
-from app.db.crud import get_all_recipes, get_recipe_by_id
-from app.db.models import RecipeStatus
-from app.schemas.recipe_schemas import Recipe, RecipeResponse, RecipeEdit
+from app.config import (
+    RANDOMIZATION_TYPES,
+    BATCH_MAX_COUNT,
+    RECIPES_PAGE_SIZE,
+    RECIPES_MAX_PAGE_SIZE,
+    POSSIBLE_ALLERGIES,
+    TASK_EVENTS_HEARTBEAT,
+    INVENTORY_ENABLED,
+)
+from app.core.sampler import ParameterSampler
+from app.core.transfer import export_recipes, import_recipes, ndjson_lines
+from app.core.inventory import inventory_stats, inventory_targets, serve_from_inventory
+from app.core.recipe_cache import CachedResponse, get_recipe_cache
+from app.core.task_events import RESYNC, TERMINAL_STATES, get_task_event_hub
+from app.core.create_recipes import (
+    generate_recipe_task,
+    generate_recipe_batch_task,
+    replenish_inventory_task,
+    celery_app,
+)
+from app.db.crud import (
+    MATERIALIZED_FIELDS,
+    get_recipes_page,
+    get_recipe_by_id,
+    get_recipe_response,
+    recipe_responses,
+    stream_recipes,
+    parse_recipe_fields,
+    search_recipes,
+    update_recipe,
+    update_recipes_status,
+    inventory_stock,
+)
+from app.db.models import Recipe as RecipeModel, RecipeStatus
+from app.schemas.recipe_schemas import (
+    Recipe,
+    RecipeResponse,
+    RecipeEdit,
+    RecipeChunkParams,
+    RecipeFilters,
+    RecipeSearch,
+    RecipeStatusUpdate,
+)
 from app.logging_config import logger
-from app.db.database import get_db
+from app.db.database import get_db, AsyncSessionLocal
 router = APIRouter()
 
+FIELDS_DESCRIPTION = ("Comma-separated recipe columns to return, "
+                      "or 'summary' for id, name, status, cooking_time, cuisine and dish_type")
+
 
 @router.post("/generate_recipe", response_model=dict)
-async def generate_recipe(params: Recipe, use_weights: bool = False):
+async def generate_recipe(params: Recipe, use_weights: bool = False, db: AsyncSession = Depends(get_db)):
     """
     Generates a recipe based on the input parameters and processes it in a background task.
     If no parameters are provided, random values will be generated.
     The 'use_weights' parameter determines if randomization with weights should be applied.
+    With INVENTORY_ENABLED, a pre-generated recipe satisfying the parameters is returned right away instead.
     """
     recipe_id = str(uuid4())
 
+    if INVENTORY_ENABLED:
+        served = await serve_inventory_recipe(db, params, recipe_id)
+        if served is not None:
+            return {"status": "Recipe served from inventory", "recipe_id": recipe_id,
+                    "recipe": RecipeResponse.model_validate(served, from_attributes=True)}
+
     try:
         task = generate_recipe_task.apply_async(
             args=[params.model_dump(), recipe_id],
             kwargs={"use_weights": use_weights},
             task_id=recipe_id
         )
-        logger.info(f"Recipe generation task {task.id} created.")
+        logger.info("Recipe generation task %s created.", task.id)
         return {"status": "Recipe generation started", "recipe_id": str(recipe_id)}
     except Exception as e:
-        logger.error(f"Error creating recipe generation task: {e}")
+        logger.error("Error creating recipe generation task: %s", e)
         raise HTTPException(status_code=500, detail="Error generating recipe")
 
 
+async def serve_inventory_recipe(db: AsyncSession, params: Recipe, recipe_id: str) -> RecipeModel | None:
+    """
+    Save a matching inventory recipe as `recipe_id` and have its bucket refilled in the background.
+    Errors are logged and treated as a miss, so the recipe is generated instead.
+    """
+    try:
+        served = await serve_from_inventory(db, params, recipe_id)
+    except Exception as e:
+        await db.rollback()
+        logger.error("Error serving a recipe from the inventory: %s", e)
+        return None
+    if served is None:
+        return None
+
+    recipe, bucket = served
+    try:
+        replenish_inventory_task.apply_async(kwargs={"buckets": [bucket]})
+    except Exception as e:
+        logger.error("Error creating inventory replenish task: %s", e)
+    return recipe
+
+
+@router.get("/inventory")
+async def get_inventory(db: AsyncSession = Depends(get_db)):
+    """
+    Target and current stock of the pre-generated recipe inventory by bucket, and the hit rate of this process.
+    """
+    try:
+        stock = await inventory_stock(db)
+    except Exception as e:
+        logger.error("Error reading the inventory stock: %s", e)
+        raise HTTPException(status_code=500, detail="Error reading the inventory")
+    buckets = {bucket: {"target": target, "stock": stock.get(bucket, 0)}
+               for bucket, target in inventory_targets().items()}
+    return {"enabled": INVENTORY_ENABLED, "buckets": buckets, **inventory_stats()}
+
+
+@router.post("/generate_recipe/batch", response_model=dict)
+async def generate_recipe_batch(chunk: RecipeChunkParams, count: int = Query(gt=0, le=BATCH_MAX_COUNT)):
+    """
+    Generates `count` recipes from the chunk parameters in a single background task.
+    Missing parameters are filled per recipe according to 'randomization_type' and 'weights', drawn from 'seed'
+    when given.
+    Progress can be followed with the returned 'batch_id'.
+    """
+    if chunk.randomization_type is not None and chunk.randomization_type not in RANDOMIZATION_TYPES:
+        raise HTTPException(status_code=400,
+                            detail=f"Invalid randomization_type. Must be one of: {RANDOMIZATION_TYPES}")
+    try:
+        ParameterSampler(chunk.randomization_type, chunk.weights, chunk.seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid weights: {e}")
+
+    batch_id = str(uuid4())
+
+    try:
+        task = generate_recipe_batch_task.apply_async(
+            args=[chunk.model_dump(), count],
+            task_id=batch_id
+        )
+        logger.info("Recipe batch generation task %s created for %s recipes.", task.id, count)
+        return {"status": "Batch generation started", "batch_id": batch_id, "total": count}
+    except Exception as e:
+        logger.error("Error creating recipe batch generation task: %s", e)
+        raise HTTPException(status_code=500, detail="Error generating recipes")
+
+
+@router.get("/generate_recipe/batch/{batch_id}")
+async def get_batch_progress(batch_id: str):
+    """
+    Get the aggregate progress of a batch generation task.
+    """
+    task_result = AsyncResult(id=batch_id, app=celery_app)
+    response = {
+        "batch_id": batch_id,
+        "status": task_result.state,
+    }
+
+    if task_result.state in ("PROGRESS", "SUCCESS") and isinstance(task_result.info, dict):
+        response.update(task_result.info)
+    elif task_result.state == "FAILURE":
+        response["error"] = str(task_result.info)
+
+    return response
+
+
 @router.patch("/recipe/{recipe_id}/status")
 async def update_recipe_status(recipe_id: UUID, status: str, db: AsyncSession = Depends(get_db)):
     """
@@ -46,82 +185,362 @@ async def update_recipe_status(recipe_id: UUID, status: str, db: AsyncSession =
             raise HTTPException(status_code=400,
                                 detail=f"Invalid status. Must be one of: {[s.name for s in RecipeStatus]}")
 
-        recipe = await get_recipe_by_id(db, recipe_id)
-        if not recipe:
-            raise HTTPException(status_code=404, detail="Recipe not found.")
-
-        recipe.status = RecipeStatus[status]
+        if await update_recipe(db, recipe_id, {"status": RecipeStatus[status]}) is None:
+            raise HTTPException(status_code=404, detail="Recipe not found")
         await db.commit()
-        logger.info(f"Recipe {recipe_id} status updated to {status}")
+        await get_recipe_cache().invalidate([recipe_id])
+        logger.info("Recipe %s status updated to %s", recipe_id, status)
         return {"status": "updated"}
 
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error updating recipe status: {e}")
+        logger.error("Unexpected error updating recipe status: %s", e)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
-@router.put("/recipe/{recipe_id}")
-async def edit_recipe(recipe_id: str, recipe_data: RecipeEdit, db: AsyncSession = Depends(get_db)):
+@router.patch("/recipes/status")
+async def update_recipes_status_endpoint(status_update: RecipeStatusUpdate, db: AsyncSession = Depends(get_db)):
     """
-    Edit the full data of a recipe.
+    Update the status of many recipes at once, given either their 'ids' or listing 'filters', in one statement.
+    Returns the number of recipes whose status changed.
     """
     try:
-        recipe = await get_recipe_by_id(db, UUID(recipe_id))
-        if not recipe:
-            raise HTTPException(status_code=404, detail="Recipe not found.")
+        changed = await update_recipes_status(db, RecipeStatus[status_update.status.value],
+                                               status_update.ids, status_update.filters)
+        await db.commit()
+        await get_recipe_cache().invalidate(changed)
+        logger.info("Status of %s recipes updated to %s", len(changed), status_update.status.value)
+        return {"status": "updated", "updated": len(changed)}
+    except Exception as e:
+        logger.error("Error updating recipe statuses: %s", e)
+        raise HTTPException(status_code=500, detail="Error updating recipe statuses")
 
-        recipe_data_dict = recipe_data.model_dump()
-        for key, value in recipe_data_dict.items():
-            setattr(recipe, key, value)
 
+@router.put("/recipe/{recipe_id}")
+async def edit_recipe(recipe_id: str, recipe_data: RecipeEdit, db: AsyncSession = Depends(get_db)):
+    """
+    Edit the data of a recipe. Only the fields given in the request are changed.
+    """
+    try:
+        stored = await update_recipe(db, UUID(recipe_id), recipe_data.model_dump(exclude_unset=True))
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Recipe not found")
         await db.commit()
-        await db.refresh(recipe)
-        logger.info(f"Recipe {recipe_id} edited successfully.")
-        return recipe
+        await get_recipe_cache().invalidate([UUID(recipe_id)])
+        logger.info("Recipe %s edited successfully.", recipe_id)
+        return json_response(*stored)
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Error editing recipe: {e}")
+        logger.error("Error editing recipe: %s", e)
         raise HTTPException(status_code=500, detail="Error editing recipe")
 
 
 @router.get("/recipes", response_model=List[RecipeResponse])
-async def get_all_recipes_endpoint(db: AsyncSession = Depends(get_db)):
+async def get_all_recipes_endpoint(filters: RecipeFilters = Depends(),
+                                   limit: int = Query(RECIPES_PAGE_SIZE, ge=1, le=RECIPES_MAX_PAGE_SIZE),
+                                   cursor: UUID | None = None,
+                                   format: str = Query("json", pattern="^(json|ndjson)$"),
+                                   fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+                                   if_none_match: str | None = Header(None),
+                                   db: AsyncSession = Depends(get_db)):
     """
-    Get all recipes from the database.
+    Get recipes from the database, one page of at most 'limit' recipes at a time.
+    When more recipes match, the 'X-Next-Cursor' response header holds the 'cursor' of the next page.
+    With format=ndjson, all matching recipes are streamed as newline-delimited JSON instead.
+    With 'fields', only the requested columns are loaded and returned.
+    Otherwise the stored responses of the recipes are served through the recipe cache, with an ETag for
+    If-None-Match requests.
     """
+    selected_fields = parse_recipe_fields(fields)
     try:
-        recipes = await get_all_recipes(db)
-        return recipes
+        if format == "ndjson":
+            return StreamingResponse(recipes_ndjson(filters, cursor, selected_fields),
+                                     media_type="application/x-ndjson")
+        if selected_fields is not None:
+            recipes, next_cursor = await get_recipes_page(db, filters, limit, cursor, selected_fields)
+            return projection_response(recipes, next_cursor, selected_fields)
+
+        async def load_page():
+            recipes, next_cursor = await get_recipes_page(db, filters, limit, cursor, MATERIALIZED_FIELDS)
+            return await encode_page(db, recipes, next_cursor)
+
+        query = {"path": "/recipes", "filters": filters.model_dump(), "limit": limit, "cursor": cursor}
+        return page_response(await get_recipe_cache().get_page(query, load_page), if_none_match)
     except Exception as e:
-        logger.error(f"Error retrieving all recipes: {e}")
+        logger.error("Error retrieving all recipes: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving recipes")
 
 
+@router.get("/recipes/search", response_model=List[RecipeResponse])
+async def search_recipes_endpoint(filters: RecipeFilters = Depends(),
+                                  ingredient: List[str] = Query([], description="Ingredients that must be used"),
+                                  exclude_allergen: List[str] = Query([], description="Allergens that must be absent"),
+                                  max_calories: float | None = None, min_protein: float | None = None,
+                                  max_fat: float | None = None, max_carbohydrates: float | None = None,
+                                  limit: int = Query(RECIPES_PAGE_SIZE, ge=1, le=RECIPES_MAX_PAGE_SIZE),
+                                  cursor: UUID | None = None,
+                                  fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+                                  if_none_match: str | None = Header(None),
+                                  db: AsyncSession = Depends(get_db)):
+    """
+    Search recipes by ingredients, excluded allergens and nutritional values, e.g.
+    ?ingredient=chickpeas&exclude_allergen=dairy&max_calories=500.
+    Pages work as for GET /recipes.
+    """
+    unknown_allergens = [allergen for allergen in exclude_allergen if allergen not in POSSIBLE_ALLERGIES]
+    if unknown_allergens:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown allergens: {unknown_allergens}. Must be among: {POSSIBLE_ALLERGIES}")
+    selected_fields = parse_recipe_fields(fields)
+    search = RecipeSearch(ingredients=ingredient, exclude_allergens=exclude_allergen, max_calories=max_calories,
+                          min_protein=min_protein, max_fat=max_fat, max_carbohydrates=max_carbohydrates)
+    try:
+        if selected_fields is not None:
+            recipes, next_cursor = await search_recipes(db, search, filters, limit, cursor, selected_fields)
+            return projection_response(recipes, next_cursor, selected_fields)
+
+        async def load_page():
+            recipes, next_cursor = await search_recipes(db, search, filters, limit, cursor, MATERIALIZED_FIELDS)
+            return await encode_page(db, recipes, next_cursor)
+
+        query = {"path": "/recipes/search", "search": search.model_dump(), "filters": filters.model_dump(),
+                 "limit": limit, "cursor": cursor}
+        return page_response(await get_recipe_cache().get_page(query, load_page), if_none_match)
+    except Exception as e:
+        logger.error("Error searching recipes: %s", e)
+        raise HTTPException(status_code=500, detail="Error searching recipes")
+
+
+@router.get("/recipes/cache")
+async def get_recipe_cache_stats():
+    """
+    Hits, misses, invalidations and hit rate of the recipe cache of this process.
+    """
+    cache = get_recipe_cache()
+    return {"enabled": cache.enabled, "shared": cache.redis is not None, **cache.stats()}
+
+
+@router.get("/recipes/export")
+async def export_recipes_endpoint(filters: RecipeFilters = Depends()):
+    """
+    Download the matching recipes as a gzip-compressed NDJSON file, streamed from a server-side cursor.
+    The file can be loaded into another database with POST /recipes/import.
+    """
+    async def body():
+        async with AsyncSessionLocal() as db:
+            async for chunk in export_recipes(db, filters):
+                yield chunk
+
+    return StreamingResponse(body(), media_type="application/gzip",
+                             headers={"Content-Disposition": 'attachment; filename="recipes.ndjson.gz"'})
+
+
+@router.post("/recipes/import")
+async def import_recipes_endpoint(request: Request,
+                                  on_conflict: str = Query("update", pattern="^(update|skip)$"),
+                                  db: AsyncSession = Depends(get_db)):
+    """
+    Load recipes from an NDJSON request body, gzip-compressed or not, e.g. a file from GET /recipes/export.
+    Recipes whose ID exists are overwritten, or kept with on_conflict=skip.
+    """
+    try:
+        return await import_recipes(db, ndjson_lines(request.stream()), update=on_conflict == "update")
+    except Exception as e:
+        logger.error("Error importing recipes: %s", e)
+        raise HTTPException(status_code=500, detail="Error importing recipes")
+
+
+async def recipes_ndjson(filters: RecipeFilters, after: UUID | None = None, fields: Sequence[str] | None = None):
+    """
+    Encode the matching recipes as NDJSON lines.
+    The session is opened here because the response is streamed after the request dependencies are closed.
+    """
+    async with AsyncSessionLocal() as db:
+        async for recipe in stream_recipes(db, filters, after, fields):
+            if fields is None:
+                yield RecipeResponse.model_validate(recipe, from_attributes=True).model_dump_json() + "\n"
+            else:
+                yield json.dumps(jsonable_encoder(project_recipe(recipe, fields))) + "\n"
+
+
+async def encode_page(db: AsyncSession, recipes: List[RecipeModel], next_cursor: UUID | None) -> CachedResponse:
+    """
+    Join a page from the stored responses of its recipes, loaded with MATERIALIZED_FIELDS.
+    """
+    encoded = await recipe_responses(db, recipes)
+    etag = hashlib.blake2b(" ".join([str(next_cursor)] + [etag for _, etag in encoded]).encode(),
+                           digest_size=16).hexdigest()
+    return CachedResponse(b"[" + b",".join(body for body, _ in encoded) + b"]", etag,
+                          str(next_cursor) if next_cursor is not None else None)
+
+
+def page_response(page: CachedResponse, if_none_match: str | None = None) -> Response:
+    """
+    Return an encoded page of recipes, with the cursor of the next page in the 'X-Next-Cursor' header.
+    """
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor is not None else {}
+    return json_response(page.body, page.etag, if_none_match, headers)
+
+
+def projection_response(recipes: List[RecipeModel], next_cursor: UUID | None, fields: Sequence[str]) -> Response:
+    """
+    Return a page of recipes loaded with only the given columns, with the cursor of the next page.
+    """
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+    return JSONResponse(jsonable_encoder([project_recipe(recipe, fields) for recipe in recipes]), headers=headers)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check whether an If-None-Match header names the ETag.
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or f'"{etag}"' in tags
+
+
+def json_response(body: bytes, etag: str, if_none_match: str | None = None, headers: dict | None = None) -> Response:
+    """
+    Return encoded JSON with its ETag, or 304 Not Modified when the client has this version already.
+    """
+    headers = {**(headers or {}), "ETag": f'"{etag}"'}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def project_recipe(recipe: RecipeModel, fields: Sequence[str]) -> dict:
+    """
+    Build the response for a recipe loaded with only the given columns.
+    """
+    return {field: getattr(recipe, field) for field in fields}
+
+
 @router.get("/recipe/{recipe_id}")
-async def get_recipe_with_id(recipe_id: str, db: AsyncSession = Depends(get_db)):
+async def get_recipe_with_id(recipe_id: str, fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+                             if_none_match: str | None = Header(None), db: AsyncSession = Depends(get_db)):
     """
     Get recipe by ID.
+    A saved recipe is served from its stored response through the recipe cache with an ETag, and If-None-Match
+    requests for an unchanged recipe are answered with 304 Not Modified. With 'fields', only the requested columns are loaded and returned.
+    Otherwise the state of its generation task is returned.
     """
-    task_result = AsyncResult(id=recipe_id, app=celery_app)
-
+    selected_fields = parse_recipe_fields(fields)
     try:
-        response = {
-            "recipe_id": str(recipe_id),
-            "status": task_result.state,
-        }
-    except ValueError as e:
+        recipe_uuid = UUID(recipe_id)
+    except ValueError:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
+    # Recipes served from the inventory are saved without a task, so the database is checked first.
+    if selected_fields is None:
+        stored = await get_recipe_cache().get_recipe(recipe_uuid, lambda: get_recipe_response(db, recipe_uuid))
+        if stored is not None:
+            return json_response(stored.body, stored.etag, if_none_match)
+    else:
+        try:
+            return project_recipe(await get_recipe_by_id(db, recipe_uuid, selected_fields), selected_fields)
+        except HTTPException:
+            pass
+
+    task_result = AsyncResult(id=recipe_id, app=celery_app)
+    response = {
+        "recipe_id": str(recipe_id),
+        "status": task_result.state,
+    }
     if task_result.state == "SUCCESS":
-        recipe = await get_recipe_by_id(db, UUID(recipe_id))
-        if recipe:
-            return recipe
-        else:
-            response["error"] = "Recipe not found in database."
+        response["error"] = "Recipe not found in database."
     elif task_result.state == "FAILURE":
         response["error"] = str(task_result.info)
 
     return response
+
+
+@router.get("/recipe/{recipe_id}/events")
+async def recipe_events(recipe_id: UUID):
+    """
+    Server-sent events with the state of a recipe generation task, instead of polling GET /recipe/{recipe_id}.
+    An event is sent for the current state and for every transition (PENDING, STARTED, SUCCESS, FAILURE).
+    The stream ends with the final state, which carries the recipe or the error.
+    """
+    return StreamingResponse(recipe_events_sse(str(recipe_id)), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/recipe/{recipe_id}/ws")
+async def recipe_events_websocket(websocket: WebSocket, recipe_id: UUID):
+    """
+    The events of GET /recipe/{recipe_id}/events as JSON messages over a WebSocket.
+    The socket is closed after the final state.
+    """
+    await websocket.accept()
+    try:
+        async for event in task_events(str(recipe_id)):
+            if event is not None:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.debug("Client of task %s events disconnected.", recipe_id)
+
+
+async def recipe_events_sse(recipe_id: str):
+    """
+    Encode the task events as server-sent events, with a comment line as keep-alive.
+    """
+    async for event in task_events(recipe_id):
+        if event is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield f"event: {event['status']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def task_events(recipe_id: str):
+    """
+    Yield the state of a generation task and every change of it, until the final state.
+    The changes come from the task event hub, so the result backend is only read once.
+    None is yielded after TASK_EVENTS_HEARTBEAT seconds without a change.
+    """
+    async with get_task_event_hub().listen(recipe_id) as events:
+        event = await task_snapshot(recipe_id)
+        sent_status = None
+        while True:
+            if event["status"] != sent_status:
+                sent_status = event["status"]
+                yield event
+            if event["status"] in TERMINAL_STATES:
+                return
+
+            try:
+                event = await asyncio.wait_for(events.get(), TASK_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if event is RESYNC:
+                event = await task_snapshot(recipe_id)
+
+
+async def task_snapshot(recipe_id: str) -> dict:
+    """
+    Read the current state of a generation task: SUCCESS with the recipe once it is saved,
+    the state of the result backend before.
+    The session is opened here because the events are streamed after the request dependencies are closed.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            recipe = await get_recipe_by_id(db, UUID(recipe_id))
+        except HTTPException:
+            recipe = None
+        if recipe is not None:
+            return {"recipe_id": recipe_id, "status": "SUCCESS",
+                    "recipe": jsonable_encoder(RecipeResponse.model_validate(recipe, from_attributes=True))}
+
+    task_result = AsyncResult(id=recipe_id, app=celery_app)
+    state = await asyncio.to_thread(lambda: task_result.state)
+    event = {"recipe_id": recipe_id, "status": state}
+    if state == "SUCCESS":
+        event["error"] = "Recipe not found in database."
+    elif state == "FAILURE":
+        event["error"] = str(task_result.info)
+    return event
@@ -1,4 +1,8 @@
+import json
 import os
+from dotenv import load_dotenv
+
+load_dotenv()
 
 POSSIBLE_AMOUNT_OF_PERSONS = [1, 2, 3, 4, 5, 6, 7]
 WEIGHTS_AMOUNT_OF_PERSONS = [5, 5, 5, 2, 1, 1, 2]
@@ -15,10 +19,141 @@ WEIGHTS_DIET_REQUIREMENTS = [5, 3, 2, 1]
 POSSIBLE_ALLERGIES = ["nuts", "dairy", "gluten", "soy", "seafood"]
 WEIGHTS_ALLERGIES = [4, 2, 2, 1, 1]
 
+ALLERGEN_KEYWORDS = {
+    "nuts": ["nut", "almond", "walnut", "cashew", "pecan", "pistachio", "hazelnut", "peanut", "macadamia",
+             "praline", "marzipan", "pesto"],
+    "dairy": ["milk", "cheese", "butter", "cream", "yogurt", "yoghurt", "ghee", "paneer", "parmesan", "mozzarella",
+              "ricotta", "mascarpone", "feta", "cheddar", "whey", "buttermilk", "custard"],
+    "gluten": ["wheat", "flour", "bread", "breadcrumb", "pasta", "spaghetti", "noodle", "barley", "rye", "couscous",
+               "semolina", "bulgur", "seitan", "tortilla", "pastry", "cracker", "panko"],
+    "soy": ["soy", "soya", "tofu", "tempeh", "edamame", "miso"],
+    "seafood": ["fish", "shrimp", "prawn", "salmon", "tuna", "crab", "lobster", "mussel", "clam", "oyster", "squid",
+                "cod", "anchovy", "scallop", "sardine", "mackerel", "tilapia", "octopus"],
+}
+ALLERGEN_EXCEPTIONS = {
+    "nuts": ["nut-free", "nut free", "water chestnut"],
+    "dairy": ["coconut milk", "coconut cream", "almond milk", "oat milk", "soy milk", "rice milk", "peanut butter",
+              "almond butter", "cocoa butter", "cashew cream", "vegan"],
+    "gluten": ["gluten-free", "gluten free", "rice flour", "almond flour", "coconut flour", "corn tortilla",
+               "rice noodle", "buckwheat"],
+    "soy": ["soy-free", "soy free"],
+    "seafood": [],
+}
+
+MEAT_KEYWORDS = ["meat", "chicken", "beef", "pork", "bacon", "ham", "lamb", "turkey", "duck", "sausage", "veal",
+                 "prosciutto", "salami", "chorizo", "pancetta", "pepperoni", "mince", "steak", "gelatin", "lard"]
+DIET_KEYWORDS = {
+    "vegetarian": MEAT_KEYWORDS + ALLERGEN_KEYWORDS["seafood"],
+    "vegan": MEAT_KEYWORDS + ALLERGEN_KEYWORDS["seafood"] + ALLERGEN_KEYWORDS["dairy"] + ["egg", "honey", "mayonnaise"],
+    "gluten-free": ALLERGEN_KEYWORDS["gluten"],
+    "keto": ["sugar", "rice", "pasta", "spaghetti", "noodle", "bread", "potato", "flour", "honey", "syrup", "corn",
+             "tortilla", "oat", "quinoa", "couscous", "banana", "bean", "lentil", "chickpea"],
+}
+DIET_EXCEPTIONS = {
+    "vegetarian": ["vegetarian", "vegan", "plant-based", "meat-free", "meatless"],
+    "vegan": ["vegan", "plant-based", "meat-free", "egg-free", "coconut milk", "coconut cream", "almond milk",
+              "oat milk", "soy milk", "rice milk", "peanut butter", "almond butter", "cocoa butter", "cashew cream"],
+    "gluten-free": ALLERGEN_EXCEPTIONS["gluten"],
+    "keto": ["sugar-free", "sugar free", "almond flour", "coconut flour", "cauliflower rice", "green bean"],
+}
+
 POSSIBLE_MAX_COOKING_TIMES = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110, 120]
 WEIGHTS_MAX_COOKING_TIMES = [3, 4, 5, 6, 7, 6, 5, 2, 1, 1, 1, 1]
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+RANDOMIZATION_TYPES = ["random", "weighted", "stratified"]
+SAMPLER_SEED = int(os.getenv("SAMPLER_SEED")) if os.getenv("SAMPLER_SEED") else None
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./test.db")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+RECIPES_PAGE_SIZE = int(os.getenv("RECIPES_PAGE_SIZE", "100"))
+RECIPES_MAX_PAGE_SIZE = int(os.getenv("RECIPES_MAX_PAGE_SIZE", "1000"))
+RECIPES_STREAM_BATCH_SIZE = int(os.getenv("RECIPES_STREAM_BATCH_SIZE", "500"))
 API_KEY = os.getenv("API_KEY", "default_api_key")
 
-LOGGING_LEVEL = os.getenv("LOGGING_LEVEL", "INFO")
+LOGGING_LEVEL = os.getenv("LOGGING_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_ARG_CHARS = int(os.getenv("LOG_MAX_ARG_CHARS", "2000"))
+# Message template: share of its records to keep, e.g. {"Recipe generated: %s": 0.1}
+LOG_SAMPLE_RATES = json.loads(os.getenv("LOG_SAMPLE_RATES", "{}"))
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+TASK_EVENTS_CHANNEL = os.getenv("TASK_EVENTS_CHANNEL", "recipe_task_events")
+TASK_EVENTS_HEARTBEAT = float(os.getenv("TASK_EVENTS_HEARTBEAT", "15"))
+TASK_EVENTS_RECONNECT_DELAY = float(os.getenv("TASK_EVENTS_RECONNECT_DELAY", "1"))
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MAX_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "100000"))
+
+RECIPE_CACHE_ENABLED = os.getenv("RECIPE_CACHE_ENABLED", "true").lower() == "true"
+RECIPE_CACHE_MAX_ENTRIES = int(os.getenv("RECIPE_CACHE_MAX_ENTRIES", "10000"))
+RECIPE_CACHE_LOCAL_TTL = float(os.getenv("RECIPE_CACHE_LOCAL_TTL", "5"))
+RECIPE_CACHE_REDIS = os.getenv("RECIPE_CACHE_REDIS", "false").lower() == "true"
+RECIPE_CACHE_TTL = float(os.getenv("RECIPE_CACHE_TTL", "300"))
+
+PIPELINE_MODES = ["classic", "fused"]
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "classic")
+FUSED_CONFIRMATION = os.getenv("FUSED_CONFIRMATION", "false").lower() == "true"
+FUSED_CONFIRMATION_MODEL = os.getenv("FUSED_CONFIRMATION_MODEL", "gpt-4o-mini")
+
+GENERATION_CANDIDATES = int(os.getenv("GENERATION_CANDIDATES", "1"))
+GENERATION_DEADLINE = float(os.getenv("GENERATION_DEADLINE", "0")) or None
+# Rejected candidates after which a recipe fails, whether or not their rejections used LLM attempts.
+GENERATION_MAX_CANDIDATES = int(os.getenv("GENERATION_MAX_CANDIDATES", "50"))
+
+BATCH_MAX_COUNT = int(os.getenv("BATCH_MAX_COUNT", "10000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", "100"))
+
+TRANSFER_BATCH_SIZE = int(os.getenv("TRANSFER_BATCH_SIZE", "500"))
+TRANSFER_COMMIT_SIZE = int(os.getenv("TRANSFER_COMMIT_SIZE", "5000"))
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_BATCH_SIZE = int(os.getenv("DEDUP_BATCH_SIZE", "1000"))
+
+INVENTORY_ENABLED = os.getenv("INVENTORY_ENABLED", "false").lower() == "true"
+INVENTORY_TOTAL_STOCK = int(os.getenv("INVENTORY_TOTAL_STOCK", "50"))
+INVENTORY_STOCK = json.loads(os.getenv("INVENTORY_STOCK", "{}"))
+INVENTORY_REPLENISH_INTERVAL = float(os.getenv("INVENTORY_REPLENISH_INTERVAL", "300"))
+INVENTORY_MATCH_CANDIDATES = int(os.getenv("INVENTORY_MATCH_CANDIDATES", "50"))
+
+NUTRITION_ENGINE = os.getenv("NUTRITION_ENGINE", "local")
+NUTRITION_TABLE_PATH = os.getenv("NUTRITION_TABLE_PATH", "./nutrition_learned.json")
+
+PREVALIDATION_ENABLED = os.getenv("PREVALIDATION_ENABLED", "true").lower() == "true"
+PREVALIDATION_MAX_GRAMS_PER_PERSON = float(os.getenv("PREVALIDATION_MAX_GRAMS_PER_PERSON", "1500"))
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+RETRY_TASK_MAX_ATTEMPTS = int(os.getenv("RETRY_TASK_MAX_ATTEMPTS", "60")) or None
+RETRY_TASK_TIMEOUT = float(os.getenv("RETRY_TASK_TIMEOUT", "900")) or None
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", "30"))
+
+METRICS_PUSHGATEWAY_URL = os.getenv("METRICS_PUSHGATEWAY_URL")
+METRICS_PUSH_INTERVAL = float(os.getenv("METRICS_PUSH_INTERVAL", "15"))
+
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+LLM_STREAM_MAX_CHARS = int(os.getenv("LLM_STREAM_MAX_CHARS", "20000"))
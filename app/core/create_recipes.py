@@ -1,73 +1,533 @@
 import asyncio
+import time
+from uuid import uuid4
 
 from celery import Celery
+from celery.signals import (
+    before_task_publish,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.recipe_generator import generate_recipe as generate_single_recipe
-from app.core.nutritional_calculator import calculate_nutrition
+from app.core.recipe_generator import generate_recipe as generate_single_recipe, generate_fused_recipe
+from app.core.nutritional_calculator import calculate_nutrition, parse_nutrition
 from app.core.validator import validate_recipe
+from app.core.prevalidator import RecipeRejected, prevalidate_member, prevalidate_recipe
+from app.core.retry import RetryExhausted, count_outcome, task_budget
+from app.core.task_events import publish_task_event
+from app.core.inventory import bucket_params, inventory_row, inventory_targets
+from app.core.dedup import dedup_recipes
+from app.core.metrics import (
+    CANDIDATES_PER_RECIPE,
+    QUEUE_WAIT,
+    observe_stage,
+    start_metrics_pusher,
+    stop_metrics_pusher,
+)
 from app.logging_config import logger
 from sqlalchemy.orm import sessionmaker
-from app.db.crud import save_recipe
+from app.db.crud import (
+    save_recipe,
+    save_recipes,
+    recipe_row,
+    add_inventory_recipes,
+    inventory_stock,
+    find_similar_recipes,
+)
 from app.db.database import engine
+from app.core.worker_loop import run_in_worker_loop, start_worker_loop, stop_worker_loop
 from app.core.utils import combine, generate_random_recipe_values, convert_ingredients_to_list
-from app.schemas.recipe_schemas import Recipe
+from app.core.sampler import ParameterSampler
+from app.schemas.recipe_schemas import Recipe, RecipeChunkParams, RecipeResponse
+from app.config import (
+    GENERATION_MAX_CANDIDATES,
+    LLM_CACHE_ENABLED,
+    PREVALIDATION_ENABLED,
+    DEDUP_ENABLED,
+    DEDUP_THRESHOLD,
+    GENERATION_CANDIDATES,
+    GENERATION_DEADLINE,
+    BATCH_CONCURRENCY,
+    BATCH_INSERT_SIZE,
+    REDIS_URL,
+    INVENTORY_ENABLED,
+    INVENTORY_REPLENISH_INTERVAL,
+    PIPELINE_MODE,
+    PIPELINE_MODES,
+    FUSED_CONFIRMATION,
+    FUSED_CONFIRMATION_MODEL,
+)
 
-celery_app = Celery("recipe_queue", broker="redis://localhost:6379/0", backend="redis://localhost:6379/0")
+celery_app = Celery("recipe_queue", broker=REDIS_URL, backend=REDIS_URL)
 async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+if INVENTORY_ENABLED:
+    celery_app.conf.beat_schedule = {
+        "replenish-inventory": {
+            "task": "app.core.create_recipes.replenish_inventory_task",
+            "schedule": INVENTORY_REPLENISH_INTERVAL,
+        },
+    }
+
+
+@worker_process_init.connect
+def start_worker_event_loop(**kwargs):
+    """
+    Give each forked worker process its own long-lived event loop.
+    """
+    start_worker_loop()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_worker_event_loop(**kwargs):
+    """
+    Close the LLM client and the DB engine pool, then stop the event loop.
+    """
+    stop_worker_loop()
+    stop_metrics_pusher()
+
+
+@before_task_publish.connect
+def stamp_enqueued_at(headers=None, **kwargs):
+    """
+    Record when a task was published, to measure how long it waits in the queue.
+    """
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+
+@task_prerun.connect
+def observe_queue_wait(task=None, **kwargs):
+    """
+    Observe the queue wait of a starting task and make sure the worker pushes its metrics.
+    """
+    start_metrics_pusher()
+    enqueued_at = task.request.get("enqueued_at") if task is not None else None
+    if enqueued_at is not None:
+        QUEUE_WAIT.labels(task.name).observe(max(time.time() - float(enqueued_at), 0.0))
+
 
 @celery_app.task(bind=True, ignore_result=False, track_started=True)
-def generate_recipe_task(self, params: dict, recipe_id: str, use_weights: bool = False):
+def generate_recipe_task(self, params: dict, recipe_id: str, use_weights: bool = False,
+                         candidates: int | None = None, deadline: float | None = None):
     """
-    Synchronous Celery task that wraps the async recipe generation function.
+    Synchronous Celery task that runs the async recipe generation function on the worker event loop.
     """
-    return asyncio.run(async_generate_recipe_task(self, params, recipe_id, use_weights))
+    return run_in_worker_loop(async_generate_recipe_task(self, params, recipe_id, use_weights, candidates, deadline))
 
 
-async def async_generate_recipe_task(self, params: dict, recipe_id: str, use_weights: bool = False):
+async def async_generate_recipe_task(self, params: dict, recipe_id: str, use_weights: bool = False,
+                                     candidates: int | None = None, deadline: float | None = None):
     """
     Asynchronous Celery task to generate a recipe and save it.
+
+    :param candidates: int: Number of candidates generated concurrently, defaults to GENERATION_CANDIDATES.
+    :param deadline: float: Overall time limit in seconds, defaults to GENERATION_DEADLINE.
     """
 
     params = Recipe(**params)
+    await publish_task_event(recipe_id, "STARTED")
     async with async_session() as session:
         try:
-            while True:
-                if not use_weights:
-                    logger.debug("Generating with random recipe.")
-                    filled_params = await generate_random_recipe_values(params)
-                else:
-                    logger.debug("Generating a weighted random recipe.")
-                    filled_params = await generate_random_recipe_values(params, use_weights=use_weights)
+            if not use_weights:
+                logger.debug("Generating with random recipe.")
+                filled_params = await generate_random_recipe_values(params)
+            else:
+                logger.debug("Generating a weighted random recipe.")
+                filled_params = await generate_random_recipe_values(params, use_weights=use_weights)
 
-                logger.info(f"Generating recipe with parameters: {filled_params}")
-                generated_recipe = await generate_single_recipe(filled_params)
-                logger.info(f"Recipe generated: {generated_recipe}")
+            with task_budget():
+                recipe = await generate_valid_recipe(
+                    filled_params,
+                    candidates=GENERATION_CANDIDATES if candidates is None else candidates,
+                    deadline=GENERATION_DEADLINE if deadline is None else deadline,
+                )
 
-                logger.debug("Calculating nutrition for the generated recipe...")
-                nutritious = await calculate_nutrition(generated_recipe)
+            logger.info("Recipe generated successfully.")
+            with observe_stage("save"):
+                saved_recipe = await save_recipe(session, recipe, recipe_id, filled_params)
+                await session.commit()
 
-                logger.debug("Combining the recipe and nutrition information...")
-                recipe = await combine(generated_recipe, nutritious)
+            await publish_task_event(recipe_id, "SUCCESS",
+                                     recipe=RecipeResponse.model_validate(saved_recipe, from_attributes=True))
+            return recipe
 
-                logger.debug("Validating the generated recipe...")
-                if isinstance(recipe.get("ingredients"), dict):
-                    recipe["ingredients"] = await convert_ingredients_to_list(recipe["ingredients"])
-                    logger.debug("Converted ingredients to list.")
+        except Exception as e:
+            self.update_state(task_id=recipe_id, state="FAILURE", meta=str(e))
+            logger.error("Error in generate_recipe_task: %s", e)
+            await publish_task_event(recipe_id, "FAILURE", error=str(e))
+            return {"status": "error", "message": str(e)}
 
-                validate = await validate_recipe(recipe)
-                logger.debug(f"Validation result: {validate}")
 
-                if "Yes" in validate:
-                    logger.info("Recipe generated successfully.")
-                    await save_recipe(session, recipe, recipe_id)
-                    await session.commit()
+@celery_app.task(bind=True, ignore_result=False, track_started=True)
+def generate_recipe_batch_task(self, chunk: dict, count: int):
+    """
+    Synchronous Celery task that runs the async batch generation function on the worker event loop.
+    """
+    return run_in_worker_loop(async_generate_recipe_batch_task(self, self.request.id, chunk, count))
 
-                    return recipe
-                else:
-                    logger.info("Recipe is not realistic, retrying.")
 
+async def async_generate_recipe_batch_task(self, batch_id: str, chunk: dict, count: int,
+                                           concurrency: int = BATCH_CONCURRENCY,
+                                           insert_size: int = BATCH_INSERT_SIZE):
+    """
+    Asynchronous Celery task to generate `count` recipes from chunk parameters and bulk-save them.
+
+    The parameters of all recipes are drawn up front by one seeded ParameterSampler call. Recipes are
+    generated with at most `concurrency` in flight and inserted `insert_size` rows per transaction.
+    Aggregate progress is reported through the PROGRESS task state.
+
+    :param batch_id: str: The ID of the batch task.
+    :param chunk: dict: The RecipeChunkParams of the batch.
+    :param count: int: Number of recipes to generate.
+    :param concurrency: int: Maximum number of recipes generated at the same time.
+    :param insert_size: int: Number of recipes inserted per transaction.
+    :return: dict: Aggregate counts and the IDs of the saved recipes.
+    """
+    chunk = RecipeChunkParams(**chunk)
+    sampled_params = ParameterSampler(chunk.randomization_type, chunk.weights, chunk.seed).sample(chunk.params, count)
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    pending_rows = []
+    progress = {"total": count, "completed": 0, "failed": 0, "recipe_ids": []}
+
+    async def flush(session):
+        rows = pending_rows[:]
+        pending_rows.clear()
+        try:
+            with observe_stage("save"):
+                await save_recipes(session, rows)
         except Exception as e:
-            self.update_state(state="FAILURE", meta=str(e))
-            logger.error(f"Error in generate_recipe_task: {e}")
-            return {"status": "error", "message": str(e)}
+            await session.rollback()
+            progress["failed"] += len(rows)
+            logger.error("Error saving %s batch recipes: %s", len(rows), e)
+        else:
+            progress["completed"] += len(rows)
+            progress["recipe_ids"].extend(str(row["id"]) for row in rows)
+        self.update_state(task_id=batch_id, state="PROGRESS",
+                          meta={key: progress[key] for key in ("total", "completed", "failed")})
+
+    async def generate_one(session, params):
+        async with semaphore:
+            try:
+                with task_budget():
+                    recipe = await generate_valid_recipe(params, candidates=GENERATION_CANDIDATES,
+                                                         deadline=GENERATION_DEADLINE)
+            except Exception as e:
+                progress["failed"] += 1
+                logger.error("Error generating batch recipe: %s", e)
+                return
+
+        async with write_lock:
+            pending_rows.append(recipe_row(recipe, str(uuid4()), params))
+            if len(pending_rows) >= insert_size:
+                await flush(session)
+
+    async with async_session() as session:
+        await asyncio.gather(*(generate_one(session, params) for params in sampled_params))
+        async with write_lock:
+            await flush(session)
+
+    logger.info("Batch generated %s of %s recipes, %s failed.", progress["completed"], count, progress["failed"])
+    return progress
+
+
+async def find_duplicates(recipe: dict, threshold: float = DEDUP_THRESHOLD) -> list:
+    """
+    Find stored recipes the generated recipe is a near-duplicate of.
+    A failing lookup is logged and lets the recipe through.
+
+    :param recipe: dict: The generated recipe.
+    :param threshold: float: The lowest estimated Jaccard similarity of a near-duplicate.
+    :return: list: The IDs and similarities of the near-duplicates, most similar first.
+    """
+    try:
+        async with async_session() as session:
+            return await find_similar_recipes(session, recipe.get("Name"), recipe.get("Ingredients"), threshold)
+    except Exception as e:
+        logger.error("Error looking up near-duplicates: %s", e)
+        return []
+
+
+@celery_app.task(bind=True, ignore_result=False)
+def dedup_recipes_task(self, threshold: float | None = None, action: str = "delete", dry_run: bool = False):
+    """
+    Synchronous Celery task that removes the near-duplicates from the recipes table on the worker event loop.
+    """
+    return run_in_worker_loop(async_dedup_recipes_task(threshold, action, dry_run))
+
+
+async def async_dedup_recipes_task(threshold: float | None = None, action: str = "delete", dry_run: bool = False):
+    async with async_session() as session:
+        result = await dedup_recipes(session, DEDUP_THRESHOLD if threshold is None else threshold, action, dry_run)
+    result.pop("pairs")
+    return result
+
+
+@celery_app.task(bind=True, ignore_result=True)
+def replenish_inventory_task(self, buckets: list | None = None):
+    """
+    Synchronous Celery task that runs the async inventory replenisher on the worker event loop.
+    """
+    return run_in_worker_loop(async_replenish_inventory(buckets))
+
+
+async def async_replenish_inventory(buckets: list | None = None, concurrency: int = BATCH_CONCURRENCY) -> dict:
+    """
+    Generate recipes for the inventory buckets below their target stock.
+
+    The other parameters of a bucket are sampled with the WEIGHTS_* tables. Buckets are filled concurrently,
+    one recipe at a time each, and the stock is counted again before every recipe, so runs overlapping
+    on a bucket add at most one recipe too many each.
+
+    :param buckets: list: The buckets to fill, None for all buckets of inventory_targets.
+    :param concurrency: int: Maximum number of recipes generated at the same time.
+    :return: dict: The number of recipes added by bucket.
+    """
+    targets = inventory_targets()
+    if buckets is not None:
+        targets = {bucket: targets[bucket] for bucket in buckets if bucket in targets}
+    semaphore = asyncio.Semaphore(concurrency)
+    added = {bucket: 0 for bucket in targets}
+
+    async def fill(bucket, target):
+        while True:
+            async with async_session() as session:
+                if (await inventory_stock(session, [bucket])).get(bucket, 0) >= target:
+                    return
+            async with semaphore:
+                try:
+                    params = await generate_random_recipe_values(bucket_params(bucket), use_weights=True)
+                    with task_budget():
+                        recipe = await generate_valid_recipe(params, candidates=GENERATION_CANDIDATES,
+                                                             deadline=GENERATION_DEADLINE)
+                except Exception as e:
+                    logger.error("Error generating a recipe for the %s inventory: %s", bucket, e)
+                    return
+            async with async_session() as session:
+                with observe_stage("save"):
+                    await add_inventory_recipes(session, [inventory_row(recipe, params)])
+            added[bucket] += 1
+
+    await asyncio.gather(*(fill(bucket, target) for bucket, target in targets.items()))
+    logger.info("Inventory replenished with %s recipes.", sum(added.values()))
+    return added
+
+
+async def generate_valid_recipe(params: Recipe, candidates: int = 1, deadline: float | None = None,
+                                pipeline_mode: str = PIPELINE_MODE,
+                                max_candidates: int = GENERATION_MAX_CANDIDATES) -> dict:
+    """
+    Generate recipes until one passes validation.
+
+    Keeps `candidates` generate → nutrition → validate passes in flight at once.
+    The first accepted recipe is returned and the passes still running are cancelled.
+    With a single candidate this is the plain sequential retry loop. It ends with RetryBudgetExceeded
+    once the LLM attempts of the task_budget the caller runs in are used up, and with RetryExhausted after
+    `max_candidates` rejected candidates, which also bounds rejections that use no LLM attempt.
+
+    :param params: Recipe: The filled recipe parameters.
+    :param candidates: int: Number of passes running concurrently.
+    :param deadline: float: Overall time limit in seconds, None for no limit.
+    :param pipeline_mode: str: "classic" for separate generation, nutrition and validation calls,
+        "fused" for one call returning all three.
+    :param max_candidates: int: Number of candidates started at most.
+    :return: dict: The accepted recipe.
+    """
+    if pipeline_mode not in PIPELINE_MODES:
+        raise ValueError(f"Invalid pipeline mode {pipeline_mode!r}. Must be one of: {PIPELINE_MODES}")
+    candidate = generate_fused_candidate if pipeline_mode == "fused" else generate_candidate
+    try:
+        return await asyncio.wait_for(_first_valid_candidate(params, max(candidates, 1), candidate,
+                                                             max_candidates), timeout=deadline)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"No valid recipe generated within {deadline} seconds.")
+
+
+async def _first_valid_candidate(params: Recipe, candidates: int, candidate, max_candidates: int) -> dict:
+    pending = set()
+    started = 0
+    try:
+        while True:
+            while len(pending) < candidates and started < max_candidates:
+                pending.add(asyncio.create_task(candidate(params)))
+                started += 1
+            if not pending:
+                raise RetryExhausted(f"No valid recipe among {started} candidates.")
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                recipe = task.result()
+                if recipe is not None:
+                    CANDIDATES_PER_RECIPE.observe(started)
+                    return recipe
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def generate_candidate(params: Recipe) -> dict | None:
+    """
+    Run a single generate → pre-validate → nutrition → validate pass.
+
+    While the recipe streams, each completed member is pre-validated so a recipe that can't pass is
+    abandoned mid-generation, and the nutrition calculation starts as soon as the ingredients are known.
+
+    :param params: Recipe: The filled recipe parameters.
+    :return: dict | None: The recipe if it passed validation, None if it was rejected.
+    """
+    early_nutrition = {}
+
+    async def on_value(key, value):
+        if PREVALIDATION_ENABLED:
+            prevalidation = prevalidate_member(key, value, params)
+            if not prevalidation.passed:
+                raise RecipeRejected(prevalidation)
+        if key == "Ingredients":
+            if "task" in early_nutrition:
+                early_nutrition["task"].cancel()
+            early_nutrition["ingredients"] = value
+            # Only the table is used this early: an LLM answer for the ingredients alone would be cached
+            # and reused for the whole recipe.
+            early_nutrition["task"] = asyncio.create_task(
+                calculate_nutrition({"Ingredients": value}, use_cache=LLM_CACHE_ENABLED, local_only=True)
+            )
+
+    try:
+        logger.info("Generating recipe with parameters: %s", params)
+        with observe_stage("generate"):
+            try:
+                generated_recipe = await generate_single_recipe(params, on_value=on_value)
+            except RecipeRejected as e:
+                count_outcome("prevalidate", "rejected")
+                logger.info("Recipe rejected by pre-validation while streaming, retrying: %s", e)
+                return None
+        logger.info("Recipe generated: %s", generated_recipe)
+
+        if not await screen_recipe(generated_recipe, params):
+            return None
+
+        logger.debug("Calculating nutrition for the generated recipe...")
+        with observe_stage("nutrition"):
+            task = early_nutrition.pop("task", None)
+            nutritious = None
+            if task is not None and early_nutrition["ingredients"] == generated_recipe.get("Ingredients"):
+                nutritious = await task
+            elif task is not None:
+                task.cancel()
+            if nutritious is None:
+                nutritious = await calculate_nutrition(generated_recipe, use_cache=LLM_CACHE_ENABLED)
+    finally:
+        if "task" in early_nutrition:
+            early_nutrition["task"].cancel()
+
+    logger.debug("Combining the recipe and nutrition information...")
+    recipe = await combine(generated_recipe, nutritious)
+
+    logger.debug("Validating the generated recipe...")
+    if isinstance(recipe.get("ingredients"), dict):
+        recipe["ingredients"] = await convert_ingredients_to_list(recipe["ingredients"])
+        logger.debug("Converted ingredients to list.")
+
+    with observe_stage("validate"):
+        validate = await validate_recipe(recipe, use_cache=LLM_CACHE_ENABLED)
+    logger.debug("Validation result: %s", validate)
+
+    if "Yes" in validate:
+        count_outcome("validate", "accepted")
+        return recipe
+
+    count_outcome("validate", "rejected")
+    logger.info("Recipe is not realistic, retrying.")
+    return None
+
+
+async def generate_fused_candidate(params: Recipe, confirm: bool | None = None) -> dict | None:
+    """
+    Run a single fused pass: one call returns the recipe, its nutrition and the model's check of it.
+
+    The recipe is pre-validated while it streams like in the classic pass. Generated nutrition that can't be
+    read is calculated instead. With `confirm`, a recipe the model found realistic is validated once more by
+    FUSED_CONFIRMATION_MODEL.
+
+    :param params: Recipe: The filled recipe parameters.
+    :param confirm: bool: Confirm the self-check with a validation call, defaults to FUSED_CONFIRMATION.
+    :return: dict | None: The recipe if it passed its checks, None if it was rejected.
+    """
+    if confirm is None:
+        confirm = FUSED_CONFIRMATION
+
+    async def on_value(key, value):
+        if PREVALIDATION_ENABLED:
+            prevalidation = prevalidate_member(key, value, params)
+            if not prevalidation.passed:
+                raise RecipeRejected(prevalidation)
+
+    logger.info("Generating fused recipe with parameters: %s", params)
+    with observe_stage("generate"):
+        try:
+            generated_recipe = await generate_fused_recipe(params, on_value=on_value)
+        except RecipeRejected as e:
+            count_outcome("prevalidate", "rejected")
+            logger.info("Recipe rejected by pre-validation while streaming, retrying: %s", e)
+            return None
+    self_check = generated_recipe.pop("SelfCheck", None)
+    nutrition = parse_nutrition(generated_recipe.pop("nutrition", None))
+    logger.info("Recipe generated: %s", generated_recipe)
+
+    if not isinstance(self_check, dict) or "Yes" not in str(self_check.get("realistic")):
+        count_outcome("selfcheck", "rejected")
+        issues = self_check.get("issues") if isinstance(self_check, dict) else self_check
+        logger.info("Recipe rejected by its self-check, retrying: %s", issues)
+        return None
+
+    if not await screen_recipe(generated_recipe, params):
+        return None
+
+    if nutrition is None:
+        logger.debug("Generated nutrition is unusable, calculating it.")
+        with observe_stage("nutrition"):
+            nutrition = await calculate_nutrition(generated_recipe, use_cache=LLM_CACHE_ENABLED)
+    recipe = await combine(generated_recipe, nutrition)
+
+    if confirm:
+        with observe_stage("validate"):
+            validate = await validate_recipe(recipe, use_cache=LLM_CACHE_ENABLED, model=FUSED_CONFIRMATION_MODEL)
+        if "Yes" not in validate:
+            count_outcome("validate", "rejected")
+            logger.info("Self-checked recipe not confirmed, retrying.")
+            return None
+
+    count_outcome("validate", "accepted")
+    return recipe
+
+
+async def screen_recipe(recipe: dict, params: Recipe) -> bool:
+    """
+    Run the checks that need no LLM call on a generated recipe: pre-validation and near-duplicate lookup.
+
+    :param recipe: dict: The generated recipe.
+    :param params: Recipe: The filled recipe parameters.
+    :return: bool: True if the recipe passed, rejections are counted and logged.
+    """
+    if PREVALIDATION_ENABLED:
+        with observe_stage("prevalidate"):
+            prevalidation = prevalidate_recipe(recipe, params)
+        if not prevalidation.passed:
+            count_outcome("prevalidate", "rejected")
+            logger.info("Recipe rejected by pre-validation, retrying: %s", prevalidation.reason)
+            return False
+
+    if DEDUP_ENABLED:
+        with observe_stage("dedup"):
+            duplicates = await find_duplicates(recipe)
+        if duplicates:
+            count_outcome("dedup", "rejected")
+            recipe_id, score = duplicates[0]
+            logger.info("Recipe is a near-duplicate of %s (similarity %.2f), retrying.", recipe_id, score)
+            return False
+    return True
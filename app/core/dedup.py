@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, List
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import DEDUP_BATCH_SIZE, DEDUP_THRESHOLD
+from app.core.recipe_cache import get_recipe_cache
+from app.core.similarity import SimilarityIndex, get_minhasher, recipe_shingles
+from app.db.crud import delete_recipes, stream_recipes, write_signatures
+from app.db.database import AsyncSessionLocal, engine
+from app.db.models import Recipe, RecipeLSHBand, RecipeMinHash, RecipeStatus
+from app.logging_config import logger
+from app.schemas.recipe_schemas import RecipeFilters
+
+DEDUP_ACTIONS = ("delete", "freeze")
+
+
+async def dedup_recipes(db: AsyncSession, threshold: float = DEDUP_THRESHOLD, action: str = "delete",
+                        dry_run: bool = False, batch_size: int = DEDUP_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Remove the near-duplicates from the recipes table and rebuild the near-duplicate index.
+
+    Recipes are read in ID order from a server-side cursor and hashed `batch_size` at a time. A recipe at
+    least `threshold` similar to one kept before it is a duplicate of that recipe. Duplicates are deleted
+    or, with action="freeze", set to FROZEN. The index is rewritten with the kept recipes, which also
+    indexes recipes saved before it existed.
+
+    :param db: AsyncSession: The database session.
+    :param threshold: float: The lowest estimated Jaccard similarity of a near-duplicate.
+    :param action: str: "delete" or "freeze".
+    :param dry_run: bool: Only report the duplicates.
+    :param batch_size: int: Number of recipes hashed at a time.
+    :return: Dict[str, Any]: The counts, and the duplicate pairs as [duplicate ID, kept ID, similarity].
+    """
+    if action not in DEDUP_ACTIONS:
+        raise ValueError(f"Invalid action {action!r}. Must be one of: {DEDUP_ACTIONS}")
+
+    hasher = get_minhasher()
+    index = SimilarityIndex(threshold)
+    kept_ids: List[UUID] = []
+    kept_signatures: List[np.ndarray] = []
+    pairs = []
+
+    def process(batch):
+        signatures = hasher.signatures([recipe_shingles(recipe.name, recipe.ingredients) for recipe in batch])
+        for recipe, signature, buckets in zip(batch, signatures, index.buckets(signatures)):
+            matches = index.query(signature, buckets)
+            if matches:
+                pairs.append([str(recipe.id), str(matches[0][0]), round(matches[0][1], 3)])
+            else:
+                index.add(recipe.id, signature, buckets)
+                kept_ids.append(recipe.id)
+                kept_signatures.append(signature)
+
+    batch = []
+    async for recipe in stream_recipes(db, RecipeFilters(), fields=("id", "name", "ingredients"),
+                                       batch_size=batch_size):
+        batch.append(recipe)
+        if len(batch) >= batch_size:
+            process(batch)
+            batch = []
+    if batch:
+        process(batch)
+
+    if not dry_run:
+        duplicate_ids = [UUID(duplicate) for duplicate, _, _ in pairs]
+        for start in range(0, len(duplicate_ids), batch_size):
+            chunk = duplicate_ids[start:start + batch_size]
+            if action == "delete":
+                await delete_recipes(db, chunk)
+            else:
+                # Their stored responses are dropped, then encoded and stored again when next read.
+                await db.execute(update(Recipe).where(Recipe.id.in_(chunk))
+                                 .values(status=RecipeStatus.FROZEN, response_json=None, etag=None))
+
+        await db.execute(delete(RecipeLSHBand))
+        await db.execute(delete(RecipeMinHash))
+        for start in range(0, len(kept_ids), batch_size):
+            await write_signatures(db, kept_ids[start:start + batch_size],
+                                   np.stack(kept_signatures[start:start + batch_size]))
+        await db.commit()
+        await get_recipe_cache().invalidate(duplicate_ids)
+
+    logger.info("Dedup scanned %s recipes and found %s near-duplicates%s.", len(kept_ids) + len(pairs), len(pairs),
+                " (dry run)" if dry_run else f", action {action}")
+    return {"scanned": len(kept_ids) + len(pairs), "kept": len(kept_ids), "duplicates": len(pairs),
+            "action": action, "dry_run": dry_run, "pairs": pairs}
+
+
+async def main(threshold: float, action: str, dry_run: bool):
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await dedup_recipes(db, threshold, action, dry_run)
+    finally:
+        await engine.dispose()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove near-duplicate recipes and rebuild the near-duplicate index.")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD,
+                        help="Lowest Jaccard similarity of a near-duplicate.")
+    parser.add_argument("--action", choices=DEDUP_ACTIONS, default="delete",
+                        help="Delete the duplicates or set them to FROZEN.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the duplicates.")
+    args = parser.parse_args()
+    asyncio.run(main(args.threshold, args.action, args.dry_run))
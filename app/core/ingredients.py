@@ -0,0 +1,134 @@
+import re
+from typing import Any, Dict, Iterable, List, Set
+
+from app.config import ALLERGEN_KEYWORDS, ALLERGEN_EXCEPTIONS, DIET_KEYWORDS, DIET_EXCEPTIONS
+
+STOP_WORDS = {
+    "a", "an", "and", "or", "of", "the", "to", "for", "with", "in", "fresh", "freshly", "chopped", "diced", "sliced",
+    "minced", "grated", "large", "small", "medium", "whole", "optional", "taste", "finely", "roughly", "cup", "cups",
+}
+
+
+def normalize_ingredient_name(name: str) -> str:
+    """
+    Lowercase an ingredient name and reduce it to words separated by single spaces.
+
+    :param name: str: The ingredient name as generated.
+    :return: str: The normalized name.
+    """
+    return " ".join(re.findall(r"[a-z]+(?:-[a-z]+)*", name.lower()))
+
+
+def singularize(word: str) -> str:
+    """
+    Naive English singular form, good enough to match "chickpeas" with "chickpea".
+
+    :param word: str: A lowercase word.
+    :return: str: The singular form.
+    """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith("oes"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def ingredient_terms(name: str) -> Set[str]:
+    """
+    Split an ingredient name into the singular search terms it is indexed under.
+
+    :param name: str: The ingredient name.
+    :return: Set[str]: The search terms.
+    """
+    words = normalize_ingredient_name(name).replace("-", " ").split()
+    return {singularize(word) for word in words if word not in STOP_WORDS}
+
+
+def ingredient_allergens(name: str) -> Set[str]:
+    """
+    Find the allergens of ALLERGEN_KEYWORDS an ingredient contains.
+
+    :param name: str: The ingredient name.
+    :return: Set[str]: The allergens.
+    """
+    return matching_categories(name, ALLERGEN_KEYWORDS, ALLERGEN_EXCEPTIONS)
+
+
+def ingredient_diet_violations(name: str) -> Set[str]:
+    """
+    Find the diets of DIET_KEYWORDS an ingredient is not allowed in.
+
+    :param name: str: The ingredient name.
+    :return: Set[str]: The violated diets.
+    """
+    return matching_categories(name, DIET_KEYWORDS, DIET_EXCEPTIONS)
+
+
+def matching_categories(name: str, keywords: Dict[str, List[str]], exceptions: Dict[str, List[str]]) -> Set[str]:
+    """
+    Find the categories with a keyword among the terms of an ingredient, unless the name contains
+    one of the exception phrases of the category.
+
+    :param name: str: The ingredient name.
+    :param keywords: Dict[str, List[str]]: Keywords by category.
+    :param exceptions: Dict[str, List[str]]: Exception phrases by category.
+    :return: Set[str]: The matching categories.
+    """
+    normalized = normalize_ingredient_name(name)
+    terms = ingredient_terms(name)
+    return {
+        category for category, category_keywords in keywords.items()
+        if terms.intersection(category_keywords)
+        and not any(exception in normalized for exception in exceptions.get(category, []))
+    }
+
+
+def ingredient_names(ingredients: Any) -> List[str]:
+    """
+    Extract the ingredient names from the generated ingredients, given as a list of dicts with a "Name",
+    a list of strings or a dict keyed by name.
+
+    :param ingredients: Any: The ingredients of a recipe.
+    :return: List[str]: The ingredient names.
+    """
+    if isinstance(ingredients, dict):
+        return [str(name) for name in ingredients]
+
+    names = []
+    for ingredient in ingredients or []:
+        if isinstance(ingredient, dict):
+            name = ingredient.get("Name") or ingredient.get("name")
+            if name:
+                names.append(str(name))
+        elif isinstance(ingredient, str):
+            names.append(ingredient)
+    return names
+
+
+def index_ingredients(ingredients: Any) -> Dict[str, Set[str]]:
+    """
+    Collect the search terms and allergens of all ingredients of a recipe.
+
+    :param ingredients: Any: The ingredients of a recipe.
+    :return: Dict[str, Set[str]]: The "terms" and "allergens" of the recipe.
+    """
+    terms, allergens = set(), set()
+    for name in ingredient_names(ingredients):
+        terms |= ingredient_terms(name)
+        allergens |= ingredient_allergens(name)
+    return {"terms": terms, "allergens": allergens}
+
+
+def search_terms(queries: Iterable[str]) -> Set[str]:
+    """
+    Turn ingredient search queries into the terms that all have to match.
+
+    :param queries: Iterable[str]: The searched ingredients.
+    :return: Set[str]: The search terms.
+    """
+    terms = set()
+    for query in queries:
+        terms |= ingredient_terms(query)
+    return terms
@@ -0,0 +1,157 @@
+import threading
+from collections import Counter
+from typing import Dict, Tuple
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import (
+    POSSIBLE_CUISINES,
+    POSSIBLE_DIET_REQUIREMENTS,
+    POSSIBLE_DISH_TYPES,
+    WEIGHTS_CUISINES,
+    WEIGHTS_DISH_TYPES,
+    INVENTORY_MATCH_CANDIDATES,
+    INVENTORY_STOCK,
+    INVENTORY_TOTAL_STOCK,
+)
+from app.core.ingredients import ingredient_allergens, ingredient_diet_violations, ingredient_names
+from app.core.metrics import INVENTORY_REQUESTS
+from app.core.prevalidator import check_allergens
+from app.core.utils import parse_cooking_minutes
+from app.db.crud import claim_inventory_recipe, find_inventory_recipes, save_recipe
+from app.db.models import InventoryRecipe, Recipe as RecipeModel
+from app.logging_config import logger
+from app.schemas.recipe_schemas import Recipe
+
+
+def bucket_key(dish_type: str | None, cuisine: str | None) -> str:
+    """
+    :return: str: The inventory bucket of a dish type and cuisine, e.g. "main:Italian".
+    """
+    return f"{dish_type or 'any'}:{cuisine or 'any'}"
+
+
+def bucket_params(bucket: str) -> Recipe:
+    """
+    :param bucket: str: An inventory bucket.
+    :return: Recipe: The parameters fixed by the bucket, the others are left to be sampled.
+    """
+    dish_type, cuisine = bucket.split(":", 1)
+    return Recipe(dishType=None if dish_type == "any" else dish_type,
+                  cuisineList=None if cuisine == "any" else [cuisine])
+
+
+def inventory_targets(total: int = INVENTORY_TOTAL_STOCK, overrides: Dict[str, int] = INVENTORY_STOCK) -> Dict[str, int]:
+    """
+    Target stock per bucket.
+
+    `total` is split over the dish type × cuisine buckets by the product of their WEIGHTS_*, so the popular
+    buckets get the most recipes and buckets below one recipe get none. `overrides` sets the stock of
+    single buckets, 0 disables a bucket.
+
+    :param total: int: The stock of all buckets together.
+    :param overrides: Dict[str, int]: Stock by bucket, e.g. {"main:Italian": 20}.
+    :return: Dict[str, int]: Stock by bucket, most popular first.
+    """
+    weights = {
+        bucket_key(dish_type, cuisine): dish_weight * cuisine_weight
+        for dish_type, dish_weight in zip(POSSIBLE_DISH_TYPES, WEIGHTS_DISH_TYPES)
+        for cuisine, cuisine_weight in zip(POSSIBLE_CUISINES, WEIGHTS_CUISINES)
+    }
+    weight_sum = sum(weights.values())
+    targets = {bucket: round(total * weight / weight_sum)
+               for bucket, weight in sorted(weights.items(), key=lambda item: -item[1])}
+    targets.update(overrides)
+    return {bucket: int(stock) for bucket, stock in targets.items() if stock > 0}
+
+
+def inventory_row(recipe: dict, params: Recipe) -> dict:
+    """
+    Map a validated recipe and the parameters it was generated with to the columns of the inventory.
+
+    :param recipe: dict: The generated recipe, with its nutrition.
+    :param params: Recipe: The filled parameters.
+    :return: dict: The InventoryRecipe column values.
+    """
+    allergens, violated_diets = set(), set()
+    for name in ingredient_names(recipe.get("Ingredients")):
+        allergens |= ingredient_allergens(name)
+        violated_diets |= ingredient_diet_violations(name)
+    cuisine = params.cuisineList[0] if params.cuisineList else None
+    return {
+        "id": uuid4(),
+        "bucket": bucket_key(params.dishType, cuisine),
+        "dish_type": params.dishType,
+        "cuisine": cuisine,
+        "amount_of_persons": params.amountOfPersons,
+        "cooking_minutes": parse_cooking_minutes(recipe.get("CookingTime")),
+        "allergens": sorted(allergens),
+        "diets": [diet for diet in POSSIBLE_DIET_REQUIREMENTS if diet not in violated_diets],
+        "params": params.model_dump(),
+        "recipe": recipe,
+    }
+
+
+def satisfies(item: InventoryRecipe, params: Recipe) -> bool:
+    """
+    Check the allergies and diets of a request against an inventory recipe.
+
+    The stored allergens only cover ALLERGEN_KEYWORDS, so the ingredients are checked like the prevalidator
+    does, which also matches allergies such as "sesame" against the ingredient names.
+
+    :param item: InventoryRecipe: The inventory recipe.
+    :param params: Recipe: The requested parameters.
+    :return: bool: True if the recipe has none of the allergens and fits all diets.
+    """
+    return (not check_allergens(item.recipe, params)
+            and set(params.dietRequirements or ()).issubset(item.diets))
+
+
+async def serve_from_inventory(db: AsyncSession, params: Recipe, recipe_id: str,
+                               candidates: int = INVENTORY_MATCH_CANDIDATES) -> Tuple[RecipeModel, str] | None:
+    """
+    Save the oldest inventory recipe satisfying a request as the recipe `recipe_id`.
+
+    :param db: AsyncSession: The database session.
+    :param params: Recipe: The requested parameters, None for any value.
+    :param recipe_id: str: The ID of the requested recipe.
+    :param candidates: int: Number of inventory recipes checked.
+    :return: Tuple[RecipeModel, str] | None: The saved recipe and the bucket it came from, None on a miss.
+    """
+    for item in await find_inventory_recipes(db, params, candidates):
+        if satisfies(item, params) and await claim_inventory_recipe(db, item.id):
+            recipe = await save_recipe(db, item.recipe, recipe_id, Recipe(**item.params))
+            count_request("hit")
+            logger.info("Recipe %s served from the %s inventory.", recipe_id, item.bucket)
+            return recipe, item.bucket
+
+    count_request("miss")
+    return None
+
+
+_requests: Counter = Counter()
+_requests_lock = threading.Lock()
+
+
+def count_request(outcome: str):
+    """
+    Count a request served from the inventory ("hit") or not ("miss").
+    """
+    with _requests_lock:
+        _requests[outcome] += 1
+    INVENTORY_REQUESTS.labels(outcome).inc()
+
+
+def inventory_stats() -> Dict[str, float]:
+    """
+    :return: Dict[str, float]: The hits, misses and hit rate of this process.
+    """
+    with _requests_lock:
+        hits, misses = _requests["hit"], _requests["miss"]
+    return {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+
+
+def reset_inventory_stats():
+    with _requests_lock:
+        _requests.clear()
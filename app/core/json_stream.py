@@ -0,0 +1,188 @@
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+PREAMBLE_CHARS = set(" \t\r\n`jsonJSON")
+SCALAR_START_CHARS = set("-0123456789tfn")
+SCALAR_CHARS = set("+-.0123456789eEtruefalsn")
+WHITESPACE = set(" \t\r\n")
+
+
+class StreamAborted(Exception):
+    """
+    Raised as soon as a streamed completion can no longer become the expected JSON object.
+    """
+
+
+class _Frame:
+    __slots__ = ("kind", "phase", "key")
+
+    def __init__(self, kind: str, phase: str):
+        self.kind = kind
+        self.phase = phase
+        self.key = None
+
+
+class IncrementalJSONParser:
+    """
+    Validates a JSON object while it is streamed, one chunk at a time.
+
+    The structure is checked on every character, so a completion that starts with prose, closes the wrong
+    bracket or puts a value where a key belongs is rejected after the offending token rather than at the end.
+    Each top-level member is decoded as soon as its value is complete and returned by `feed`, so callers can
+    act on e.g. "Ingredients" while the directions are still being generated. Text after the closing brace
+    is ignored, a ```json fence around the object is allowed.
+    """
+
+    def __init__(self, required_keys: Iterable[str] = (), max_chars: int | None = None):
+        """
+        :param required_keys: Iterable[str]: Top-level keys the object must have.
+        :param max_chars: int: Abort when the object grows longer than this, None for no limit.
+        """
+        self.required_keys = tuple(required_keys)
+        self.max_chars = max_chars
+        self.text = ""
+        self.partial: Dict[str, Any] = {}
+        self.result: Dict[str, Any] | None = None
+        self._stack: List[_Frame] = []
+        self._root_start: int | None = None
+        self._value_start: int | None = None
+        self._string_start: int | None = None
+        self._scalar_start: int | None = None
+        self._escape = False
+        self._pos = 0
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Parse the next chunk of the completion.
+
+        :param chunk: str: The new text.
+        :return: List[Tuple[str, Any]]: The top-level members completed by this chunk.
+        :raises StreamAborted: If the text can't be the expected JSON object.
+        """
+        if self.done:
+            return []
+        self.text += chunk
+        completed = []
+        while self._pos < len(self.text) and not self.done:
+            self._step(self.text[self._pos], completed)
+            self._pos += 1
+        if not self.done and self.max_chars is not None and self._root_start is not None \
+                and len(self.text) - self._root_start > self.max_chars:
+            raise StreamAborted(f"The JSON object is longer than {self.max_chars} characters.")
+        return completed
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        :return: Dict[str, Any]: The complete object.
+        :raises StreamAborted: If the stream ended before the object was complete.
+        """
+        if not self.done:
+            raise StreamAborted("The stream ended before the JSON object was complete.")
+        return self.result
+
+    def _step(self, char: str, completed: List[Tuple[str, Any]]):
+        if self._string_start is not None:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._end_string(completed)
+            return
+
+        if self._root_start is None:
+            if char == "{":
+                self._root_start = self._pos
+                self._stack.append(_Frame("object", "key_or_end"))
+            elif char not in PREAMBLE_CHARS:
+                raise StreamAborted(f"Expected a JSON object, got {char!r}.")
+            return
+
+        if self._scalar_start is not None:
+            if char in SCALAR_CHARS:
+                return
+            self._end_scalar(completed)
+
+        if char in WHITESPACE:
+            return
+
+        frame = self._stack[-1]
+        expects_value = frame.phase in ("value", "value_or_end")
+        if char in "{[":
+            self._expect(expects_value, char)
+            self._start_value()
+            self._stack.append(_Frame("object", "key_or_end") if char == "{" else _Frame("array", "value_or_end"))
+        elif char == "}":
+            self._expect(frame.kind == "object" and frame.phase in ("key_or_end", "comma"), char)
+            self._close(completed)
+        elif char == "]":
+            self._expect(frame.kind == "array" and frame.phase in ("value_or_end", "comma"), char)
+            self._close(completed)
+        elif char == ",":
+            self._expect(frame.phase == "comma", char)
+            frame.phase = "key" if frame.kind == "object" else "value"
+        elif char == ":":
+            self._expect(frame.phase == "colon", char)
+            frame.phase = "value"
+        elif char == '"':
+            self._expect(expects_value or frame.phase in ("key", "key_or_end"), char)
+            if expects_value:
+                self._start_value()
+            self._string_start = self._pos
+        elif char in SCALAR_START_CHARS:
+            self._expect(expects_value, char)
+            self._start_value()
+            self._scalar_start = self._pos
+        else:
+            self._expect(False, char)
+
+    def _expect(self, condition: bool, char: str):
+        if not condition:
+            raise StreamAborted(f"Unexpected {char!r} at position {self._pos - (self._root_start or 0)}.")
+
+    def _start_value(self):
+        if len(self._stack) == 1:
+            self._value_start = self._pos
+
+    def _end_string(self, completed: List[Tuple[str, Any]]):
+        start, self._string_start = self._string_start, None
+        frame = self._stack[-1]
+        if frame.kind == "object" and frame.phase in ("key", "key_or_end"):
+            frame.key = self._decode(start, self._pos + 1)
+            frame.phase = "colon"
+        else:
+            self._value_done(completed, self._pos + 1)
+
+    def _end_scalar(self, completed: List[Tuple[str, Any]]):
+        start, self._scalar_start = self._scalar_start, None
+        self._decode(start, self._pos)
+        self._value_done(completed, self._pos)
+
+    def _close(self, completed: List[Tuple[str, Any]]):
+        self._stack.pop()
+        if self._stack:
+            self._value_done(completed, self._pos + 1)
+            return
+
+        self.result = self._decode(self._root_start, self._pos + 1)
+        missing = [key for key in self.required_keys if key not in self.result]
+        if missing:
+            raise StreamAborted(f"The JSON object is missing {', '.join(missing)}.")
+
+    def _value_done(self, completed: List[Tuple[str, Any]], end: int):
+        frame = self._stack[-1]
+        frame.phase = "comma"
+        if len(self._stack) == 1:
+            value = self._decode(self._value_start, end)
+            self.partial[frame.key] = value
+            completed.append((frame.key, value))
+
+    def _decode(self, start: int, end: int) -> Any:
+        try:
+            return json.loads(self.text[start:end])
+        except json.JSONDecodeError as e:
+            raise StreamAborted(f"Invalid JSON value: {e}")
@@ -1,25 +1,299 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import httpx
+import openai
+from openai import AsyncOpenAI
 
+from app.core.json_stream import IncrementalJSONParser, StreamAborted
+from app.core.llm_cache import get_llm_cache
+from app.core.metrics import record_llm_usage
+from app.core.prevalidator import RecipeRejected
+from app.core.retry import (
+    CircuitOpenError,
+    RetryPolicy,
+    count_outcome,
+    current_budget,
+    get_circuit_breaker,
+    is_rate_limit,
+    retry,
+)
 
-async def chat_completion(message, model="gpt-4o"):
+from app.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    LLM_MODEL,
+    LLM_TIMEOUT,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_STREAM_MAX_CHARS,
+)
+from app.logging_config import logger
+
+
+class LLMClient:
+    """
+    Async OpenAI client with a shared HTTP connection pool and a limit on in-flight requests.
+    """
+
+    def __init__(self, api_key: str | None = OPENAI_API_KEY, base_url: str | None = OPENAI_BASE_URL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_connections: int = LLM_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS, timeout: float = LLM_TIMEOUT,
+                 max_retries: int = 0):
+        """
+        :param api_key: str: The OpenAI API key.
+        :param base_url: str: Base URL of the OpenAI-compatible API, None for the default endpoint.
+        :param max_concurrency: int: Maximum number of requests in flight at the same time.
+        :param max_connections: int: Size of the HTTP connection pool.
+        :param max_keepalive_connections: int: Number of idle connections kept open for reuse.
+        :param timeout: float: Default per-call timeout in seconds.
+        :param max_retries: int: Number of retries the OpenAI SDK makes itself. Off by default,
+            chat_completion retries under the shared RetryPolicy instead.
+        """
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections),
+            timeout=timeout,
+        )
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self._http_client,
+                                   timeout=timeout, max_retries=max_retries)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def chat_completion(self, message: str, model: str = LLM_MODEL, timeout: float | None = None) -> str:
+        """
+        Send a single user message to the chat completion API.
+
+        :param message: str: The message to send to the model.
+        :param model: str: The model to use for the completion.
+        :param timeout: float: Timeout for this call in seconds, defaults to the client timeout.
+        :return: str: The content of the first completion choice.
+        """
+        async with self._semaphore:
+            started = time.perf_counter()
+            response = await self._client.chat.completions.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": message
+                    }
+                ],
+                timeout=self.timeout if timeout is None else timeout,
+            )
+            record_llm_usage(model, time.perf_counter() - started, response.usage)
+
+        return response.choices[0].message.content.strip()
+
+    async def chat_completion_stream(self, message: str, model: str = LLM_MODEL,
+                                     timeout: float | None = None) -> AsyncIterator[str]:
+        """
+        Send a single user message and yield the content of the completion as it is generated.
+
+        Closing the generator early closes the HTTP stream, so the remaining tokens are not generated.
+
+        :param message: str: The message to send to the model.
+        :param model: str: The model to use for the completion.
+        :param timeout: float: Timeout for this call in seconds, defaults to the client timeout.
+        :return: AsyncIterator[str]: The content deltas.
+        """
+        async with self._semaphore:
+            started = time.perf_counter()
+            usage = None
+            stream = await self._client.chat.completions.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": message
+                    }
+                ],
+                timeout=self.timeout if timeout is None else timeout,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+                record_llm_usage(model, time.perf_counter() - started, usage)
+
+    async def aclose(self):
+        """
+        Close the underlying HTTP connection pool.
+        """
+        await self._client.close()
+
+
+# Errors worth retrying: the endpoint is unreachable, too slow, overloaded or rate limiting.
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+# Errors after which the endpoint is known to be up: it refused the request (4xx), or the stream was closed because
+# the completion was malformed or rejected by the caller. Any other error counts as a failure of the endpoint.
+ANSWERED_ERRORS = (openai.APIStatusError, StreamAborted, RecipeRejected)
+LLM_RETRY_POLICY = RetryPolicy()
+
+_client: LLMClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+# Closings of replaced clients scheduled on the running loop, referenced until they finish.
+_closing: set = set()
+
+
+def get_llm_client() -> LLMClient:
+    """
+    Return the shared LLM client for the running event loop.
+
+    Connections and the concurrency semaphore are bound to the loop they were created on,
+    so a new client is built when the function is called from a different loop, and the
+    previous one is closed.
+
+    :return: LLMClient: The shared client.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        if _client is not None:
+            _discard_client(_client, _client_loop)
+        _client = LLMClient()
+        _client_loop = loop
+    return _client
+
+
+def _discard_client(client: LLMClient, loop: asyncio.AbstractEventLoop):
+    # A loop still running in another thread closes its own connections. Otherwise the pool is closed
+    # here, its connections may already be gone with their loop.
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        return
+    task = asyncio.get_running_loop().create_task(_close_quietly(client))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+async def _close_quietly(client: LLMClient):
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.debug("Could not close the LLM client of a previous event loop: %s", e)
+
+
+async def close_llm_client():
+    """
+    Close the shared LLM client, if one was created.
+    """
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+async def chat_completion(message, model=LLM_MODEL, timeout=None, cache_key=None):
     """A helper function to interact with OpenAI's chat completion API.
 
+    The request goes through call_llm, which retries transient errors.
+
+    :param message: str: The message to send to the model.
+    :param model: str: The model to use for the completion.
+    :param timeout: float: Timeout for this call in seconds, defaults to LLM_TIMEOUT.
+    :param cache_key: str: Key from LLMCache.make_key; when given, the response cache is consulted first.
+    """
+    if cache_key is not None:
+        cached = await get_llm_cache().get(cache_key)
+        if cached is not None:
+            return cached
+
+    client = get_llm_client()
+    content = await call_llm(lambda: client.chat_completion(message, model=model, timeout=timeout))
+
+    if cache_key is not None:
+        await get_llm_cache().set(cache_key, content)
+    return content
+
+
+async def stream_chat_json(message: str, required_keys: Iterable[str] = (),
+                           on_value: Callable[[str, Any], Awaitable[None]] | None = None,
+                           model: str = LLM_MODEL, timeout: float | None = None) -> Dict[str, Any]:
+    """
+    Stream a completion that should be a JSON object and parse it as the tokens arrive.
+
+    The stream is closed as soon as the text can't become a JSON object with `required_keys`, so a broken
+    answer stops costing tokens, or once the object is complete. `on_value` is awaited with every top-level
+    member as soon as it is complete; exceptions it raises abort the stream and propagate.
+
     :param message: str: The message to send to the model.
+    :param required_keys: Iterable[str]: Top-level keys the object must have.
+    :param on_value: Callable[[str, Any], Awaitable[None]]: Called with each completed member.
     :param model: str: The model to use for the completion.
+    :param timeout: float: Timeout for this call in seconds, defaults to LLM_TIMEOUT.
+    :return: Dict[str, Any]: The parsed object.
+    :raises StreamAborted: If the completion isn't the expected JSON object.
     """
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {
-                "role": "user",
-                "content": message
-            }
-        ]
-    )
-
-    return response.choices[0].message.content.strip()
+    client = get_llm_client()
+
+    async def stream():
+        parser = IncrementalJSONParser(required_keys, max_chars=LLM_STREAM_MAX_CHARS)
+        async with aclosing(client.chat_completion_stream(message, model=model, timeout=timeout)) as chunks:
+            try:
+                async for chunk in chunks:
+                    for key, value in parser.feed(chunk):
+                        if on_value is not None:
+                            await on_value(key, value)
+                    if parser.done:
+                        break
+            except StreamAborted as e:
+                count_outcome("llm_stream", "aborted")
+                logger.error("Aborted the completion stream after %s characters: %s", len(parser.text), e)
+                raise
+        return parser.finish()
+
+    return await call_llm(stream)
+
+
+async def call_llm(operation: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Make an LLM request under the shared retry policy, task budget and circuit breaker.
+
+    Transient errors are retried under LLM_RETRY_POLICY. Every attempt counts against the retry budget
+    of the running task and goes through the process-wide circuit breaker.
+
+    :param operation: Callable[[], Awaitable[Any]]: Makes one request.
+    :return: Any: The result of the request.
+    """
+    breaker = get_circuit_breaker()
+
+    async def attempt():
+        budget = current_budget()
+        if budget is not None:
+            budget.spend()
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            count_outcome("llm", "circuit_open")
+            raise
+        try:
+            result = await operation()
+        except TRANSIENT_ERRORS as e:
+            # A rate limit means the endpoint is up, it must not open the circuit.
+            if is_rate_limit(e):
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            raise
+        except ANSWERED_ERRORS:
+            breaker.record_success()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return result
+
+    return await retry("llm", attempt, LLM_RETRY_POLICY, retry_on=TRANSIENT_ERRORS)
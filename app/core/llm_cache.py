@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+from app.config import (
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_MEMORY_ENTRIES,
+    LLM_CACHE_MAX_DISK_ENTRIES,
+)
+
+
+class LLMCache:
+    """
+    Content-addressed cache for LLM responses.
+
+    Lookups go to an in-memory LRU first and then to a SQLite file on disk.
+    Both tiers expire entries after `ttl` seconds and evict the least recently used
+    entries once they grow past their size limit.
+    """
+
+    def __init__(self, path: str | None = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_memory_entries: int = LLM_CACHE_MAX_MEMORY_ENTRIES,
+                 max_disk_entries: int = LLM_CACHE_MAX_DISK_ENTRIES,
+                 clock: Callable[[], float] = time.time):
+        """
+        :param path: str: Path of the SQLite file, None to keep the cache in memory only.
+        :param ttl: float: Lifetime of an entry in seconds.
+        :param max_memory_entries: int: Maximum number of entries in the in-memory tier.
+        :param max_disk_entries: int: Maximum number of entries in the SQLite tier.
+        :param clock: Callable: Source of the current time, in seconds.
+        """
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.clock = clock
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, template: str, payload: Any) -> str:
+        """
+        Build the cache key for a prompt.
+
+        The payload is canonicalized (sorted keys, no whitespace) so equal recipes
+        map to the same key regardless of key order.
+
+        :param model: str: The model the prompt is sent to.
+        :param template: str: The prompt template, before the payload is substituted.
+        :param payload: Any: The JSON-serializable data substituted into the template.
+        :return: str: The hex digest identifying the request.
+        """
+        canonical = json.dumps({"model": model, "template": template, "payload": payload},
+                               sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        """
+        Return the cached response for the key, or None on a miss.
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                created_at, value = row
+                with self._lock:
+                    self.counters["disk_hits"] += 1
+                    self._memory_set(key, value, created_at)
+                return value
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """
+        Store a response in both tiers.
+        """
+        now = self.clock()
+        with self._lock:
+            self.counters["sets"] += 1
+            self._memory_set(key, value, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, now)
+
+    async def delete(self, key: str):
+        """
+        Drop a response from both tiers, e.g. when it turned out to be unusable.
+        """
+        with self._lock:
+            self._memory.pop(key, None)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_delete, key)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the hit/miss counters together with the overall hit rate.
+        """
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _memory_set(self, key: str, value: str, created_at: float):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _disk_get(self, key: str, now: float) -> tuple[float, str] | None:
+        with self._lock:
+            row = self._db.execute("SELECT created_at, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[0] >= self.ttl:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row
+
+    def _disk_set(self, key: str, value: str, now: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._db.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+            excess = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_disk_entries
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                )
+                self.counters["evictions"] += excess
+            self._db.commit()
+
+    def _disk_delete(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+
+_cache: LLMCache | None = None
+
+
+def get_llm_cache() -> LLMCache:
+    """
+    Return the process-wide LLM response cache.
+
+    :return: LLMCache: The shared cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = LLMCache()
+    return _cache
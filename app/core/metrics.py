@@ -0,0 +1,181 @@
+import os
+import socket
+import threading
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, pushadd_to_gateway
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import METRICS_PUSHGATEWAY_URL, METRICS_PUSH_INTERVAL
+from app.logging_config import logger
+
+registry = CollectorRegistry()
+
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_LATENCY = Histogram(
+    "recipe_stage_duration_seconds", "Duration of the recipe pipeline stages.",
+    ["stage"], buckets=LLM_BUCKETS, registry=registry,
+)
+STAGE_OUTCOMES = Counter(
+    "recipe_stage_outcomes_total", "Outcomes of the recipe pipeline stages: successes, retries, rejections, errors.",
+    ["stage", "outcome"], registry=registry,
+)
+CANDIDATES_PER_RECIPE = Histogram(
+    "recipe_candidates_per_recipe", "Candidates generated until one passed validation.",
+    buckets=(1, 2, 3, 4, 5, 7, 10, 15, 20, 30), registry=registry,
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "Duration of chat completion requests.",
+    ["model"], buckets=LLM_BUCKETS, registry=registry,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens used by chat completions, from the response usage.",
+    ["model", "kind"], registry=registry,
+)
+QUEUE_WAIT = Histogram(
+    "celery_queue_wait_seconds", "Time between publishing a task and a worker starting it.",
+    ["task"], buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600), registry=registry,
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Duration of database statements.",
+    ["operation"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    registry=registry,
+)
+INVENTORY_REQUESTS = Counter(
+    "recipe_inventory_requests_total", "Recipe requests served from the inventory (hit) or generated (miss).",
+    ["outcome"], registry=registry,
+)
+RECIPE_CACHE_REQUESTS = Counter(
+    "recipe_cache_requests_total", "Recipe and recipe page reads by the cache tier that answered them, or miss.",
+    ["kind", "outcome"], registry=registry,
+)
+CIRCUIT_OPEN = Gauge("llm_circuit_open", "1 while the LLM circuit breaker is open.", registry=registry)
+
+
+def observe_stage(stage: str):
+    """
+    Time a pipeline stage, e.g. `with observe_stage("validate"): ...`.
+
+    :param stage: str: The stage name.
+    """
+    return STAGE_LATENCY.labels(stage).time()
+
+
+def record_llm_usage(model: str, duration: float, usage) -> None:
+    """
+    Record the latency and token usage of a chat completion.
+
+    :param model: str: The model of the request.
+    :param duration: float: Seconds the request took.
+    :param usage: CompletionUsage | None: The usage of the response.
+    """
+    LLM_LATENCY.labels(model).observe(duration)
+    if usage is not None:
+        LLM_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels(model, "completion").inc(usage.completion_tokens or 0)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Time every statement executed on the engine by its operation (SELECT, INSERT, ...).
+
+    :param engine: AsyncEngine: The engine to instrument.
+    """
+    sync_engine = engine.sync_engine
+    if getattr(sync_engine, "_metrics_instrumented", False):
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+    sync_engine._metrics_instrumented = True
+
+
+def render_metrics() -> bytes:
+    """
+    :return: bytes: All metrics in the Prometheus text format.
+    """
+    return generate_latest(registry)
+
+
+class MetricsPusher:
+    """
+    Pushes the metrics of a Celery worker process to a Prometheus Pushgateway from a background thread.
+
+    Worker processes serve no HTTP endpoint to scrape, so each one pushes under its own instance label.
+    """
+
+    def __init__(self, gateway: str, interval: float = METRICS_PUSH_INTERVAL, job: str = "recipe_worker"):
+        """
+        :param gateway: str: Address of the Pushgateway.
+        :param interval: float: Seconds between pushes.
+        :param job: str: The job label of the pushed metrics.
+        """
+        self.gateway = gateway
+        self.interval = interval
+        self.job = job
+        self.grouping_key = {"instance": f"{socket.gethostname()}-{os.getpid()}"}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-pusher", daemon=True)
+
+    def start(self) -> "MetricsPusher":
+        self._thread.start()
+        return self
+
+    def push(self):
+        try:
+            pushadd_to_gateway(self.gateway, job=self.job, registry=registry, grouping_key=self.grouping_key)
+        except Exception as e:
+            logger.error("Error pushing metrics to %s: %s", self.gateway, e)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.push()
+
+    def stop(self):
+        """
+        Stop the thread and push the final values.
+        """
+        self._stopped.set()
+        self._thread.join()
+        self.push()
+
+
+_pusher: MetricsPusher | None = None
+
+
+def start_metrics_pusher() -> MetricsPusher | None:
+    """
+    Start pushing metrics if METRICS_PUSHGATEWAY_URL is set.
+
+    :return: MetricsPusher | None: The pusher, None when pushing is disabled.
+    """
+    global _pusher
+    if METRICS_PUSHGATEWAY_URL and _pusher is None:
+        _pusher = MetricsPusher(METRICS_PUSHGATEWAY_URL).start()
+    return _pusher
+
+
+def stop_metrics_pusher():
+    """
+    Stop the metrics pusher, if it is running.
+    """
+    global _pusher
+    pusher, _pusher = _pusher, None
+    if pusher is not None:
+        pusher.stop()
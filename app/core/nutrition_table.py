@@ -0,0 +1,241 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from app.config import NUTRITION_TABLE_PATH
+from app.core.ingredients import STOP_WORDS, ingredient_names, ingredient_terms, normalize_ingredient_name, singularize
+from app.core.utils import parse_number
+
+NUTRIENTS = ("calories", "protein", "fat", "carbohydrates")
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "nutrients.json")
+
+# Grams per unit for the measurements the recipe prompt asks for. Liquids are taken at the density of water.
+UNIT_GRAMS = {
+    "grams": 1.0, "gram": 1.0, "g": 1.0,
+    "ml": 1.0, "milliliters": 1.0,
+    "tablespoons": 15.0, "tablespoon": 15.0, "tbsp": 15.0,
+    "teaspoons": 5.0, "teaspoon": 5.0, "tsp": 5.0,
+    "cups": 240.0, "cup": 240.0,
+}
+PIECE_UNITS = ("piece", "pieces")
+# Words naming a portion of the food before them, skipped when looking for the head noun ("garlic cloves").
+PORTION_WORDS = {"clove", "leaf", "leave", "sprig", "slice", "piece", "stalk", "fillet", "bunch", "pinch", "dash", "can"}
+
+
+def head_noun(name: str) -> str | None:
+    """
+    The word an ingredient name is about: its last search term before any comma or parenthesis, skipping
+    portion words, so "green pepper" is a pepper, "red pepper flakes" are flakes and "garlic cloves" is garlic.
+
+    :param name: str: The ingredient name.
+    :return: str | None: The singular head noun, None if the name has no search terms.
+    """
+    words = normalize_ingredient_name(re.split(r"[,(]", name, maxsplit=1)[0]).replace("-", " ").split()
+    terms = [singularize(word) for word in words if word not in STOP_WORDS]
+    while len(terms) > 1 and terms[-1] in PORTION_WORDS:
+        terms.pop()
+    return terms[-1] if terms else None
+
+
+class NutritionTable:
+    """
+    Per-100g nutrient values of common ingredients, held as a NumPy matrix with one row per food.
+
+    Ingredient names are matched to the food whose terms they contain and that has the same head noun,
+    preferring the most specific one, so "extra virgin olive oil" resolves to "olive oil" and "canned chickpeas"
+    to "chickpea", but "red pepper flakes" does not resolve to "black pepper" nor "ice cream" to "cream".
+    Values learned for unknown ingredients are added to the table and saved to `learned_path`.
+    """
+
+    def __init__(self, foods: Dict[str, Sequence[float]], piece_grams: Dict[str, float] | None = None,
+                 learned_path: str | None = None):
+        self.learned_path = learned_path
+        self.piece_grams = {}
+        self._names: List[str] = []
+        self._terms: List[frozenset] = []
+        self._heads: List[str | None] = []
+        self._index: Dict[str, int] = {}
+        self._resolved: Dict[str, int | None] = {}
+        self._learned: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.matrix = np.zeros((0, len(NUTRIENTS)), dtype=np.float64)
+        self._add(foods)
+        for name, grams in (piece_grams or {}).items():
+            self.piece_grams[normalize_ingredient_name(name)] = float(grams)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_TABLE_PATH, learned_path: str | None = NUTRITION_TABLE_PATH) -> "NutritionTable":
+        """
+        Load the bundled table and the values learned in earlier runs.
+
+        :param path: str: The JSON file with the "foods" and "piece_grams" tables.
+        :param learned_path: str: The JSON file learned values are read from and saved to, None to keep them in memory.
+        :return: NutritionTable: The table.
+        """
+        with open(path) as file:
+            data = json.load(file)
+        table = cls(data["foods"], data.get("piece_grams"), learned_path)
+        if learned_path and os.path.exists(learned_path):
+            with open(learned_path) as file:
+                learned = json.load(file)
+            table._add(learned)
+            table._learned.update(learned)
+        return table
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _add(self, foods: Dict[str, Sequence[float]]):
+        rows = []
+        for name, values in foods.items():
+            name = normalize_ingredient_name(name)
+            if not name:
+                continue
+            if name in self._index:
+                self.matrix[self._index[name]] = values
+                continue
+            self._index[name] = len(self._names)
+            self._names.append(name)
+            self._terms.append(frozenset(ingredient_terms(name)))
+            self._heads.append(head_noun(name))
+            rows.append([float(value) for value in values])
+        if rows:
+            self.matrix = np.vstack([self.matrix, np.asarray(rows, dtype=np.float64)])
+        self._resolved = {name: index for name, index in self._resolved.items() if index is not None}
+
+    def resolve(self, name: str) -> int | None:
+        """
+        Find the table row of an ingredient.
+
+        :param name: str: The ingredient name as generated.
+        :return: int | None: The row index, or None if the ingredient is unknown.
+        """
+        normalized = normalize_ingredient_name(name)
+        if normalized in self._resolved:
+            return self._resolved[normalized]
+
+        index = self._index.get(normalized)
+        if index is None:
+            terms = ingredient_terms(name)
+            head = head_noun(name)
+            best = 0
+            for row, food_terms in enumerate(self._terms):
+                if food_terms and len(food_terms) > best and food_terms <= terms and self._heads[row] == head:
+                    index, best = row, len(food_terms)
+        self._resolved[normalized] = index
+        return index
+
+    def grams(self, ingredient: Any, name: str) -> float | None:
+        """
+        Convert the measurements of a generated ingredient to grams.
+
+        :param ingredient: Any: The ingredient measurements, e.g. {"Name": "Onion", "grams": 110, "piece": 1}.
+        :param name: str: The ingredient name.
+        :return: float | None: The weight in grams, or None if no measurement can be converted.
+        """
+        if not isinstance(ingredient, dict):
+            return None
+        measurements = {str(key).lower(): value for key, value in ingredient.items()}
+        for unit, factor in UNIT_GRAMS.items():
+            amount = parse_number(measurements.get(unit))
+            if amount is not None and amount > 0:
+                return amount * factor
+        for unit in PIECE_UNITS:
+            amount = parse_number(measurements.get(unit))
+            index = self.resolve(name)
+            if amount is not None and amount > 0 and index is not None:
+                piece_grams = self.piece_grams.get(self._names[index])
+                if piece_grams is not None:
+                    return amount * piece_grams
+        return None
+
+    def quantities(self, ingredients: Any) -> List[Tuple[str, float | None]]:
+        """
+        Pair every ingredient of a recipe with its weight in grams.
+
+        :param ingredients: Any: The ingredients as generated, a list of dicts or a dict keyed by name.
+        :return: List[Tuple[str, float | None]]: The ingredient names and weights.
+        """
+        if isinstance(ingredients, dict):
+            return [(str(name), self.grams(details, str(name))) for name, details in ingredients.items()]
+
+        quantities = []
+        for ingredient in ingredients or []:
+            names = ingredient_names([ingredient])
+            if names:
+                quantities.append((names[0], self.grams(ingredient, names[0])))
+        return quantities
+
+    def unknown(self, names: Iterable[str]) -> List[str]:
+        """
+        :param names: Iterable[str]: Ingredient names.
+        :return: List[str]: The names that don't resolve to a table row, without duplicates.
+        """
+        return list(dict.fromkeys(name for name in names if self.resolve(name) is None))
+
+    def learn(self, foods: Dict[str, Sequence[float]]):
+        """
+        Add per-100g values for new ingredients to the table, in memory. `save` writes them to the learned table.
+
+        :param foods: Dict[str, Sequence[float]]: Values in NUTRIENTS order keyed by ingredient name.
+        """
+        with self._lock:
+            foods = {normalize_ingredient_name(name): [float(value) for value in values]
+                     for name, values in foods.items() if normalize_ingredient_name(name)}
+            self._add(foods)
+            self._learned.update(foods)
+
+    def save(self):
+        """
+        Write the learned values to `learned_path`, if set.
+
+        This blocks on disk I/O, so the async pipeline calls it with asyncio.to_thread.
+        """
+        if not self.learned_path:
+            return
+        with self._save_lock:
+            with self._lock:
+                learned = dict(self._learned)
+            temporary_path = f"{self.learned_path}.tmp"
+            with open(temporary_path, "w") as file:
+                json.dump(learned, file, indent=1, sort_keys=True)
+            os.replace(temporary_path, self.learned_path)
+
+    def compute(self, quantities: List[Tuple[str, float | None]]) -> Dict[str, float] | None:
+        """
+        Sum the nutrients of a recipe as a single weights × matrix product.
+
+        :param quantities: List[Tuple[str, float | None]]: Ingredient names and weights in grams.
+        :return: Dict[str, float] | None: The nutrients and "totalWeight", or None if an ingredient is unknown
+            or has no usable weight.
+        """
+        indices = [self.resolve(name) for name, _ in quantities]
+        if not quantities or any(index is None for index in indices) or any(grams is None for _, grams in quantities):
+            return None
+
+        weights = np.fromiter((grams for _, grams in quantities), dtype=np.float64, count=len(quantities))
+        totals = weights @ self.matrix[np.asarray(indices)] / 100.0
+        nutrition = {nutrient: round(float(value), 1) for nutrient, value in zip(NUTRIENTS, totals)}
+        nutrition["calories"] = round(nutrition["calories"])
+        nutrition["totalWeight"] = round(float(weights.sum()))
+        return nutrition
+
+
+_nutrition_table: NutritionTable | None = None
+
+
+def get_nutrition_table() -> NutritionTable:
+    """
+    Return the process-wide nutrition table, loading it on first use.
+
+    :return: NutritionTable: The shared table.
+    """
+    global _nutrition_table
+    if _nutrition_table is None:
+        _nutrition_table = NutritionTable.load()
+    return _nutrition_table
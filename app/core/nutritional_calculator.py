@@ -1,18 +1,16 @@
+import asyncio
+from typing import Any, Dict, List
+
+from app.config import LLM_MODEL, NUTRITION_ENGINE
 from app.core.llm import chat_completion
-from app.core.utils import parse_gpt_response
+from app.core.llm_cache import LLMCache, get_llm_cache
+from app.core.nutrition_table import NUTRIENTS, get_nutrition_table
+from app.core.retry import CircuitOpenError, RetryBudgetExceeded, RetryPolicy, retry
+from app.core.utils import parse_gpt_response, parse_number
 from app.logging_config import logger
 from app.schemas.recipe_schemas import Recipe
 
-
-async def calculate_nutrition(recipe: Recipe, retry_after_failure=10):
-    """
-    Calculate the nutritional values of the given recipe.
-
-    :param recipe: RecipeCreate: The recipe to calculate nutritional values for.
-    :param retry_after_failure: int: Number of retries after a failed attempt.
-    :return: dict: The nutritional values.
-    """
-    prompt = f"""
+NUTRITION_PROMPT = """
     You are food technologist.
     The recipe is defined between <recipe> and </recipe>.
     Calculate the weight of this dish, the number of servings,
@@ -28,10 +26,136 @@ async def calculate_nutrition(recipe: Recipe, retry_after_failure=10):
     </recipe>
     """
 
-    for _ in range(retry_after_failure):
-        nutrition_json = await chat_completion(prompt)
+INGREDIENT_NUTRITION_PROMPT = """
+    You are food technologist.
+    The ingredients are listed between <ingredients> and </ingredients>.
+    Give the nutritional values of 100 grams of each ingredient.
+    Your output should be in format defined between <format> and </format>.
+    You are not asking questions, just responding with JSON.
+    <format>
+    1. Your answer is a JSON object with one key per ingredient, named exactly as listed
+    2. Each value is a JSON object with numeric "calories", "protein", "fat", "carbohydrates"
+    </format>
+    <ingredients>
+    {ingredients}
+    </ingredients>
+    """
+
+
+async def calculate_nutrition(recipe: Recipe, retry_after_failure=10, use_cache: bool = False,
+                              local_only: bool = False):
+    """
+    Calculate the nutritional values of the given recipe.
+
+    With the "local" NUTRITION_ENGINE the values are computed from the nutrition table and the LLM is only
+    asked about ingredients missing from it. The whole recipe goes to the LLM when the local calculation
+    is not possible, e.g. when an ingredient has no measurement that converts to grams.
+
+    :param recipe: RecipeCreate: The recipe to calculate nutritional values for.
+    :param retry_after_failure: int: Number of retries after a failed attempt.
+    :param use_cache: bool: If True, reuse the response cached for an identical recipe.
+    :param local_only: bool: If True, return None instead of asking the LLM about the whole recipe, e.g. for
+        a recipe that is still being generated.
+    :return: dict: The nutritional values.
+    """
+    if NUTRITION_ENGINE == "local" and isinstance(recipe, dict):
+        try:
+            nutrition = await calculate_local_nutrition(recipe, use_cache=use_cache)
+        except (RetryBudgetExceeded, CircuitOpenError):
+            raise
+        except Exception as e:
+            logger.error("Local nutrition calculation failed: %s", e)
+            nutrition = None
+        if nutrition is not None:
+            return nutrition
+        if local_only:
+            return None
+        logger.debug("Recipe not covered by the nutrition table, asking the LLM.")
+    if local_only:
+        return None
+
+    prompt = NUTRITION_PROMPT.format(recipe=recipe)
+    cache_key = LLMCache.make_key(LLM_MODEL, NUTRITION_PROMPT, recipe) if use_cache else None
+
+    async def attempt():
+        nutrition_json = await chat_completion(prompt, cache_key=cache_key)
         parsed_response = await parse_gpt_response(nutrition_json)
-        if parsed_response is not None:
-            return parsed_response
-        logger.error("Failed to calculate nutrition, retrying...")
-    raise Exception("Failed to calculate nutrition after 10 attempts.")
\ No newline at end of file
+        if parsed_response is None:
+            if cache_key is not None:
+                await get_llm_cache().delete(cache_key)
+            logger.error("Failed to calculate nutrition, retrying...")
+        return parsed_response
+
+    return await retry("nutrition", attempt, RetryPolicy(max_attempts=retry_after_failure))
+
+
+def parse_nutrition(nutrition: Any) -> Dict[str, float] | None:
+    """
+    Read the nutritional values the model generated along with a recipe.
+
+    :param nutrition: Any: The "nutrition" member of a fused answer.
+    :return: Dict[str, float] | None: The NUTRIENTS and "totalWeight" when given, None unless all NUTRIENTS
+        are non-negative numbers.
+    """
+    if not isinstance(nutrition, dict):
+        return None
+    values = {nutrient: parse_number(nutrition.get(nutrient)) for nutrient in NUTRIENTS}
+    if any(value is None or value < 0 for value in values.values()):
+        return None
+    total_weight = parse_number(nutrition.get("totalWeight"))
+    if total_weight is not None and total_weight > 0:
+        values["totalWeight"] = total_weight
+    return values
+
+
+async def calculate_local_nutrition(recipe: dict, use_cache: bool = False) -> dict | None:
+    """
+    Calculate the nutritional values of a generated recipe from the nutrition table.
+
+    :param recipe: dict: The generated recipe.
+    :param use_cache: bool: If True, reuse cached LLM answers for unknown ingredients.
+    :return: dict | None: The nutritional values, or None if the table can't cover the recipe.
+    """
+    table = get_nutrition_table()
+    quantities = table.quantities(recipe.get("Ingredients") or recipe.get("ingredients"))
+    if not quantities:
+        return None
+
+    unknown = table.unknown(name for name, _ in quantities)
+    if unknown:
+        learned = await lookup_ingredient_nutrition(unknown, use_cache=use_cache)
+        if learned:
+            table.learn(learned)
+            await asyncio.to_thread(table.save)
+            logger.info("Learned nutrition of %s ingredients: %s", len(learned), ', '.join(learned))
+
+    return table.compute(table.quantities(recipe.get("Ingredients") or recipe.get("ingredients")))
+
+
+async def lookup_ingredient_nutrition(names: List[str], use_cache: bool = False) -> Dict[str, List[float]]:
+    """
+    Ask the LLM for the per-100g nutritional values of ingredients missing from the table.
+
+    :param names: List[str]: The unknown ingredient names.
+    :param use_cache: bool: If True, reuse the response cached for the same ingredients.
+    :return: Dict[str, List[float]]: Values in NUTRIENTS order for the ingredients answered with all of them.
+    """
+    names = sorted(names)
+    prompt = INGREDIENT_NUTRITION_PROMPT.format(ingredients="\n".join(names))
+    cache_key = LLMCache.make_key(LLM_MODEL, INGREDIENT_NUTRITION_PROMPT, names) if use_cache else None
+
+    response = await parse_gpt_response(await chat_completion(prompt, cache_key=cache_key))
+    if not isinstance(response, dict):
+        if cache_key is not None:
+            await get_llm_cache().delete(cache_key)
+        logger.error("Failed to look up ingredient nutrition.")
+        return {}
+
+    learned = {}
+    for name, values in response.items():
+        if not isinstance(values, dict):
+            continue
+        numbers = [parse_number(values.get(nutrient)) for nutrient in NUTRIENTS]
+        if all(number is not None and number >= 0 for number in numbers):
+            learned[name] = numbers
+    return learned
@@ -0,0 +1,148 @@
+from typing import Any, List
+
+from app.config import PREVALIDATION_MAX_GRAMS_PER_PERSON
+from app.core.ingredients import (
+    ingredient_allergens,
+    ingredient_diet_violations,
+    ingredient_names,
+    ingredient_terms,
+    singularize,
+)
+from app.core.nutrition_table import get_nutrition_table
+from app.core.utils import parse_cooking_minutes, parse_number
+from app.schemas.recipe_schemas import PrevalidationIssue, PrevalidationResult, Recipe
+
+
+class RecipeRejected(Exception):
+    """
+    Raised to stop generating a recipe that already failed pre-validation.
+    """
+
+    def __init__(self, result: PrevalidationResult):
+        super().__init__(result.reason)
+        self.result = result
+
+
+def prevalidate_recipe(recipe: dict, params: Recipe,
+                       max_grams_per_person: float = PREVALIDATION_MAX_GRAMS_PER_PERSON) -> PrevalidationResult:
+    """
+    Check a generated recipe against the requested parameters without calling the LLM.
+
+    Rejects recipes without steps or ingredients, over the maxCooking limit, containing an ingredient
+    from allergiesList or not allowed by dietRequirements, or with negative or absurdly large quantities.
+    Checks that can't be decided, e.g. an unparseable cooking time, are left to the LLM validator.
+
+    :param recipe: dict: The generated recipe.
+    :param params: Recipe: The parameters the recipe was generated for.
+    :param max_grams_per_person: float: Largest total ingredient weight allowed per person.
+    :return: PrevalidationResult: Whether the recipe passed and the issues found.
+    """
+    issues = (
+        check_steps(recipe)
+        + check_ingredients(recipe)
+        + check_cooking_time(recipe, params)
+        + check_allergens(recipe, params)
+        + check_diet(recipe, params)
+        + check_quantities(recipe, params, max_grams_per_person)
+    )
+    return PrevalidationResult(passed=not issues, issues=issues)
+
+
+def prevalidate_member(key: str, value: Any, params: Recipe,
+                       max_grams_per_person: float = PREVALIDATION_MAX_GRAMS_PER_PERSON) -> PrevalidationResult:
+    """
+    Run the checks that only need one top-level member of a recipe that is still being streamed.
+
+    :param key: str: The member name, e.g. "Ingredients".
+    :param value: Any: The member value.
+    :param params: Recipe: The parameters the recipe is generated for.
+    :param max_grams_per_person: float: Largest total ingredient weight allowed per person.
+    :return: PrevalidationResult: Whether the member passed and the issues found.
+    """
+    recipe = {key: value}
+    if key == "CookingTime":
+        issues = check_cooking_time(recipe, params)
+    elif key == "Ingredients":
+        issues = (check_ingredients(recipe) + check_allergens(recipe, params) + check_diet(recipe, params)
+                  + check_quantities(recipe, params, max_grams_per_person))
+    elif key == "Step-by-step directions":
+        issues = check_steps(recipe)
+    else:
+        issues = []
+    return PrevalidationResult(passed=not issues, issues=issues)
+
+
+def recipe_ingredients(recipe: dict) -> Any:
+    return recipe.get("Ingredients") or recipe.get("ingredients")
+
+
+def check_steps(recipe: dict) -> List[PrevalidationIssue]:
+    steps = recipe.get("Step-by-step directions") or recipe.get("steps")
+    if isinstance(steps, str):
+        steps = [steps]
+    if not steps or not any(str(step).strip() for step in steps):
+        return [PrevalidationIssue(rule="steps", detail="The recipe has no steps.")]
+    return []
+
+
+def check_ingredients(recipe: dict) -> List[PrevalidationIssue]:
+    if not ingredient_names(recipe_ingredients(recipe)):
+        return [PrevalidationIssue(rule="ingredients", detail="The recipe has no ingredients.")]
+    return []
+
+
+def check_cooking_time(recipe: dict, params: Recipe) -> List[PrevalidationIssue]:
+    minutes = parse_cooking_minutes(recipe.get("CookingTime") or recipe.get("cooking_time"))
+    if params.maxCooking and minutes is not None and minutes > params.maxCooking:
+        return [PrevalidationIssue(rule="cooking_time",
+                                   detail=f"Cooking time of {minutes} minutes exceeds {params.maxCooking} minutes.")]
+    return []
+
+
+def check_allergens(recipe: dict, params: Recipe) -> List[PrevalidationIssue]:
+    allergies = {allergy.lower() for allergy in params.allergiesList or []}
+    issues = []
+    for name in ingredient_names(recipe_ingredients(recipe)):
+        # Allergies outside ALLERGEN_KEYWORDS, e.g. "sesame", are matched against the ingredient terms directly.
+        found = ingredient_allergens(name) | {
+            allergy for allergy in allergies if singularize(allergy) in ingredient_terms(name)
+        }
+        for allergen in sorted(found & allergies):
+            issues.append(PrevalidationIssue(rule="allergen", ingredient=name,
+                                             detail=f"{name} contains {allergen}."))
+    return issues
+
+
+def check_diet(recipe: dict, params: Recipe) -> List[PrevalidationIssue]:
+    diets = {diet.lower() for diet in params.dietRequirements or []}
+    issues = []
+    for name in ingredient_names(recipe_ingredients(recipe)):
+        for diet in sorted(ingredient_diet_violations(name) & diets):
+            issues.append(PrevalidationIssue(rule="diet", ingredient=name, detail=f"{name} is not {diet}."))
+    return issues
+
+
+def check_quantities(recipe: dict, params: Recipe, max_grams_per_person: float) -> List[PrevalidationIssue]:
+    ingredients = recipe_ingredients(recipe)
+    if isinstance(ingredients, dict):
+        ingredients = [{"Name": name, **details} for name, details in ingredients.items() if isinstance(details, dict)]
+
+    issues = []
+    for ingredient in ingredients or []:
+        if not isinstance(ingredient, dict):
+            continue
+        name = ingredient.get("Name") or ingredient.get("name")
+        amounts = [parse_number(value) for key, value in ingredient.items() if key not in ("Name", "name")]
+        # Zero is allowed: the units that don't apply to an ingredient are often given as 0.
+        if any(amount is not None and amount < 0 for amount in amounts):
+            issues.append(PrevalidationIssue(rule="quantity", ingredient=name,
+                                             detail=f"{name} has a negative quantity."))
+
+    table = get_nutrition_table()
+    total_grams = sum(grams for _, grams in table.quantities(ingredients) if grams is not None)
+    limit = max_grams_per_person * (params.amountOfPersons or 1)
+    if total_grams > limit:
+        issues.append(PrevalidationIssue(
+            rule="quantity", detail=f"Ingredients weigh {total_grams:.0f} g, more than {limit:.0f} g "
+                                    f"for {params.amountOfPersons or 1} persons."))
+    return issues
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Tuple
+from uuid import UUID
+
+import orjson
+import redis.asyncio as redis
+
+from app.config import (
+    REDIS_URL,
+    RECIPE_CACHE_ENABLED,
+    RECIPE_CACHE_MAX_ENTRIES,
+    RECIPE_CACHE_LOCAL_TTL,
+    RECIPE_CACHE_REDIS,
+    RECIPE_CACHE_TTL,
+)
+from app.core.metrics import RECIPE_CACHE_REQUESTS
+from app.logging_config import logger
+
+
+# Written over invalidated recipes in Redis for TOMBSTONE_TTL seconds, so that a read that loaded the recipe before
+# the change and stores it after the invalidation can't put the old version back: values are only set if absent.
+TOMBSTONE = b""
+TOMBSTONE_TTL = 30
+OUTCOMES = {"local_hits": "local_hit", "redis_hits": "redis_hit", "misses": "miss"}
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    next_cursor: str | None = None
+
+
+class RecipeCache:
+    """
+    Read-through cache of the encoded responses of single recipes and of recipe list pages.
+
+    Lookups go to an in-process LRU first and then, when a Redis client is given, to Redis, which all API
+    processes share. A changed recipe is dropped from both tiers. List pages are keyed by a generation number
+    that every change increments instead, because a change can move a recipe into or out of any page.
+    Entries of the in-process tier live `local_ttl` seconds, which bounds how long a change made by another
+    process goes unnoticed, and the generation is read from Redis at most that often. Redis entries live `ttl`
+    seconds. A value loaded while an invalidation ran in this process is returned but not cached, and Redis
+    keeps a tombstone of invalidated recipes for the loads running in other processes. Redis errors are logged
+    and the database is read instead.
+    """
+
+    def __init__(self, enabled: bool = RECIPE_CACHE_ENABLED, max_entries: int = RECIPE_CACHE_MAX_ENTRIES,
+                 local_ttl: float = RECIPE_CACHE_LOCAL_TTL, ttl: float = RECIPE_CACHE_TTL,
+                 redis_client: Any = None, prefix: str = "recipe_cache", clock: Callable[[], float] = time.monotonic):
+        """
+        :param enabled: bool: False to always read the database.
+        :param max_entries: int: Maximum number of entries in the in-process tier.
+        :param local_ttl: float: Lifetime of an in-process entry in seconds.
+        :param ttl: float: Lifetime of a Redis entry in seconds.
+        :param redis_client: redis.Redis: Client of the shared tier, returning bytes, None for no shared tier.
+        :param prefix: str: Prefix of the Redis keys.
+        :param clock: Callable: Source of the current time, in seconds.
+        """
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self.redis = redis_client
+        self.prefix = prefix
+        self.clock = clock
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._memory: OrderedDict[str, Tuple[float, CachedResponse]] = OrderedDict()
+        self._generation = 0
+        self._generation_read_at: float | None = None
+        self._invalidated = 0
+        self._lock = threading.Lock()
+
+    async def get_recipe(self, recipe_id: UUID,
+                         load: Callable[[], Awaitable[Tuple[bytes, str] | None]]) -> CachedResponse | None:
+        """
+        :param recipe_id: UUID: The recipe ID.
+        :param load: Callable: Reads the response and ETag of the recipe from the database, None if it is missing.
+        :return: CachedResponse | None: The response, None if the recipe does not exist.
+        """
+        return await self._read_through("recipe", f"{self.prefix}:recipe:{recipe_id}", load)
+
+    async def get_page(self, query: Dict[str, Any], load: Callable[[], Awaitable[CachedResponse]]) -> CachedResponse:
+        """
+        :param query: Dict[str, Any]: Everything the page depends on: endpoint, filters, limit and cursor.
+        :param load: Callable: Reads and encodes the page from the database.
+        :return: CachedResponse: The page.
+        """
+        digest = hashlib.sha256(json.dumps(query, sort_keys=True, default=str).encode()).hexdigest()[:32]
+        generation = await self._list_generation()
+        return await self._read_through("page", f"{self.prefix}:page:{generation}:{digest}", load)
+
+    async def invalidate(self, recipe_ids: Iterable[UUID] = ()):
+        """
+        Drop changed recipes and all list pages, after the change is committed.
+
+        :param recipe_ids: Iterable[UUID]: The changed recipes, none when recipes were only added.
+        """
+        keys = [f"{self.prefix}:recipe:{recipe_id}" for recipe_id in recipe_ids]
+        with self._lock:
+            for key in keys:
+                self._memory.pop(key, None)
+            self._generation += 1
+            self._invalidated += 1
+            self.counters["invalidations"] += 1
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(key, TOMBSTONE, ex=TOMBSTONE_TTL)
+                pipe.incr(f"{self.prefix}:generation")
+                *_, generation = await pipe.execute()
+            with self._lock:
+                self._generation = max(self._generation, generation)
+                self._generation_read_at = self.clock()
+        except Exception as e:
+            logger.error("Error invalidating the shared recipe cache: %s", e)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        :return: Dict[str, float]: The hit, miss and invalidation counters of this process and the hit rate.
+        """
+        with self._lock:
+            stats = dict(self.counters)
+            stats["local_entries"] = len(self._memory)
+        lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["local_hits"] + stats["redis_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+    async def _read_through(self, kind: str, key: str, load: Callable[[], Awaitable]) -> CachedResponse | None:
+        if not self.enabled:
+            loaded = await load()
+            return CachedResponse(*loaded) if loaded is not None else None
+
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.local_ttl:
+                    self._memory.move_to_end(key)
+                    self._count(kind, "local_hits")
+                    return entry[1]
+                del self._memory[key]
+
+        if self.redis is not None:
+            try:
+                packed = await self.redis.get(key)
+            except Exception as e:
+                logger.error("Error reading the shared recipe cache: %s", e)
+                packed = None
+            if packed is not None and packed != TOMBSTONE:
+                value = unpack(packed)
+                with self._lock:
+                    self._count(kind, "redis_hits")
+                    self._memory_set(key, value, now)
+                return value
+
+        with self._lock:
+            self._count(kind, "misses")
+            invalidated = self._invalidated
+        loaded = await load()
+        if loaded is None:
+            return None
+        value = CachedResponse(*loaded)
+        with self._lock:
+            if self._invalidated != invalidated:
+                return value
+            self._memory_set(key, value, now)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, pack(value), ex=max(1, int(self.ttl)), nx=True)
+            except Exception as e:
+                logger.error("Error writing the shared recipe cache: %s", e)
+        return value
+
+    async def _list_generation(self) -> int:
+        if self.redis is None:
+            return self._generation
+        now = self.clock()
+        if self._generation_read_at is not None and now - self._generation_read_at < self.local_ttl:
+            return self._generation
+        try:
+            generation = int(await self.redis.get(f"{self.prefix}:generation") or 0)
+        except Exception as e:
+            logger.error("Error reading the shared recipe cache generation: %s", e)
+            return self._generation
+        with self._lock:
+            self._generation = generation
+            self._generation_read_at = now
+        return generation
+
+    def _count(self, kind: str, counter: str):
+        self.counters[counter] += 1
+        RECIPE_CACHE_REQUESTS.labels(kind, OUTCOMES[counter]).inc()
+
+    def _memory_set(self, key: str, value: CachedResponse, created_at: float):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+
+def pack(value: CachedResponse) -> bytes:
+    return orjson.dumps([value.etag, value.next_cursor]) + b"\n" + value.body
+
+
+def unpack(packed: bytes) -> CachedResponse:
+    header, body = packed.split(b"\n", 1)
+    etag, next_cursor = orjson.loads(header)
+    return CachedResponse(body, etag, next_cursor)
+
+
+_cache: RecipeCache | None = None
+
+
+def get_recipe_cache() -> RecipeCache:
+    """
+    :return: RecipeCache: The recipe cache of this process, with a Redis tier when RECIPE_CACHE_REDIS is set.
+    """
+    global _cache
+    if _cache is None:
+        _cache = RecipeCache(redis_client=redis.from_url(REDIS_URL) if RECIPE_CACHE_REDIS else None)
+    return _cache
+
+
+async def close_recipe_cache():
+    """
+    Close the Redis client of the recipe cache, if it was created.
+    """
+    global _cache
+    cache, _cache = _cache, None
+    if cache is not None:
+        await cache.close()
@@ -1,33 +1,84 @@
-from app.core.llm import chat_completion
+from typing import Any, Awaitable, Callable, Tuple
+
+from app.config import LLM_STREAMING
+from app.core.json_stream import StreamAborted
+from app.core.llm import chat_completion, stream_chat_json
+from app.core.retry import RetryPolicy, retry
 from app.core.utils import parse_gpt_response
 from app.logging_config import logger
 from app.schemas.recipe_schemas import Recipe
 
 
-async def generate_recipe(params: Recipe, retry_after_failure = 10):
+REQUIRED_RECIPE_KEYS = ("Name", "Ingredients", "Step-by-step directions")
+REQUIRED_FUSED_KEYS = REQUIRED_RECIPE_KEYS + ("nutrition", "SelfCheck")
+
+RECIPE_OUTPUT_FORMAT = """
+    1. Each of your answers is a JSON, consisting of few main parameters "Name",
+    "CookingTime", "RequiredTools", "Ingredients", "Step-by-step directions"
+    2. Each ingredient should contain main parameters "Name",
+    3. For each ingredient you should display measurements in few units "grams" , "ml",
+    "cups", "teaspoons", "tablespoons", "piece" 
+    4. JSON should contain only one recipe
+    """
+
+FUSED_OUTPUT_FORMAT = RECIPE_OUTPUT_FORMAT.rstrip() + """
+    5. After "Step-by-step directions" add "nutrition": the nutritional values of the whole dish, a JSON with
+    numeric "calories", "protein", "fat", "carbohydrates", "totalWeight"
+    6. Last add "SelfCheck": acting as a professional chef, check the ratio of ingredients, that the directions
+    are clear and precise and that the flavour pairings are harmonious. It is a JSON with "realistic", only
+    "Yes" or "No", and "issues", a list of the problems found
+    """
+
+
+async def generate_recipe(params: Recipe, retry_after_failure = 10,
+                          on_value: Callable[[str, Any], Awaitable[None]] | None = None):
     """
     Generate a recipe based on the given parameters.
 
+    With LLM_STREAMING the completion is parsed while it streams: a malformed answer, or one without
+    REQUIRED_RECIPE_KEYS, is abandoned as soon as that is clear, and `on_value` receives each top-level
+    member (e.g. "Ingredients") as soon as it is complete.
+
     :param params: RecipeCreate: The recipe parameters.
     :param retry_after_failure: int: Number of retries after a failed attempt.
+    :param on_value: Callable[[str, Any], Awaitable[None]]: Called with each streamed member, may raise to abort.
     :return: dict: The generated recipe.
     """
+    prompt = recipe_prompt(params, RECIPE_OUTPUT_FORMAT)
+    return await _generate(prompt, REQUIRED_RECIPE_KEYS, retry_after_failure, on_value)
+
+
+async def generate_fused_recipe(params: Recipe, retry_after_failure = 10,
+                                on_value: Callable[[str, Any], Awaitable[None]] | None = None):
+    """
+    Generate a recipe together with its nutritional values and the model's own check of it, in one call.
+
+    The answer has the members of a generated recipe plus "nutrition" and "SelfCheck", so a single completion
+    replaces the generation, nutrition and validation calls of the classic pipeline.
+
+    :param params: Recipe: The recipe parameters.
+    :param retry_after_failure: int: Number of retries after a failed attempt.
+    :param on_value: Callable[[str, Any], Awaitable[None]]: Called with each streamed member, may raise to abort.
+    :return: dict: The generated recipe, with its "nutrition" and "SelfCheck".
+    """
+    prompt = recipe_prompt(params, FUSED_OUTPUT_FORMAT)
+    return await _generate(prompt, REQUIRED_FUSED_KEYS, retry_after_failure, on_value)
+
+
+def recipe_prompt(params: Recipe, output_format: str) -> str:
+    """
+    :param params: Recipe: The recipe parameters.
+    :param output_format: str: The description of the expected JSON.
+    :return: str: The generation prompt.
+    """
     amount_of_persons = params.amountOfPersons
     dish_type = params.dishType
     max_cooking = params.maxCooking
     allergies_list = params.allergiesList
     diet_requirements = params.dietRequirements
     cuisine_list = params.cuisineList
-    output_format = """
-    1. Each of your answers is a JSON, consisting of few main parameters "Name",
-    "CookingTime", "RequiredTools", "Ingredients", "Step-by-step directions"
-    2. Each ingredient should contain main parameters "Name",
-    3. For each ingredient you should display measurements in few units "grams" , "ml",
-    "cups", "teaspoons", "tablespoons", "piece" 
-    4. JSON should contain only one recipe
-    """
 
-    prompt = f"""
+    return f"""
     Hey, ChatGPT, generate me a meal recipe for {amount_of_persons} and {dish_type}
     with cooking time under {max_cooking} minutes,
     good for people with allergies to {allergies_list},
@@ -37,11 +88,22 @@ async def generate_recipe(params: Recipe, retry_after_failure = 10):
     just responding with recipe.
     """
 
-    for _ in range(retry_after_failure):
-        recipe_json = await chat_completion(prompt)
-        parsed_response = await parse_gpt_response(recipe_json)
-        if parsed_response is not None:
-            parsed_response["status"] = "ACTIVE"
-            return parsed_response
-        logger.error(f"Failed to generate recipe from response {recipe_json}")
-    raise Exception("Failed to generate recipe after 10 attempts.")
\ No newline at end of file
+
+async def _generate(prompt: str, required_keys: Tuple[str, ...], retry_after_failure: int,
+                    on_value: Callable[[str, Any], Awaitable[None]] | None) -> dict | None:
+    async def attempt():
+        if LLM_STREAMING:
+            try:
+                parsed_response = await stream_chat_json(prompt, required_keys, on_value)
+            except StreamAborted:
+                return None
+        else:
+            recipe_json = await chat_completion(prompt)
+            parsed_response = await parse_gpt_response(recipe_json)
+            if parsed_response is None:
+                logger.error("Failed to generate recipe from response %s", recipe_json)
+                return None
+        parsed_response["status"] = "ACTIVE"
+        return parsed_response
+
+    return await retry("generate", attempt, RetryPolicy(max_attempts=retry_after_failure))
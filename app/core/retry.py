@@ -0,0 +1,323 @@
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Tuple, Type
+
+from app.config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    RETRY_TASK_MAX_ATTEMPTS,
+    RETRY_TASK_TIMEOUT,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_RESET_TIMEOUT,
+)
+from app.core.metrics import CIRCUIT_OPEN, STAGE_OUTCOMES
+from app.logging_config import logger
+
+
+class RetryExhausted(Exception):
+    """
+    Raised when a stage failed on every attempt its retry policy allows.
+    """
+
+
+class RetryBudgetExceeded(Exception):
+    """
+    Raised when a task has used up its total number of LLM attempts or its wall-clock time.
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling the LLM while the circuit breaker is open.
+    """
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    The delay before retry N is drawn uniformly from [0, min(max_delay, base_delay * multiplier ** N)],
+    and is never shorter than a Retry-After given by the server.
+    """
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, multiplier: float = 2.0, rng: random.Random | None = None):
+        """
+        :param max_attempts: int: Number of attempts, including the first one.
+        :param base_delay: float: Upper bound of the first delay in seconds.
+        :param max_delay: float: Upper bound of any backoff delay in seconds.
+        :param multiplier: float: Growth factor of the upper bound per attempt.
+        :param rng: random.Random: Source of the jitter.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        :param attempt: int: Number of the failed attempt, starting at 0.
+        :param retry_after: float: Seconds the server asked to wait, if any.
+        :return: float: Seconds to wait before the next attempt.
+        """
+        backoff = self._rng.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+class RetryBudget:
+    """
+    Total number of LLM attempts and wall-clock time a task may spend, shared by all of its stages.
+    """
+
+    def __init__(self, max_attempts: int | None = RETRY_TASK_MAX_ATTEMPTS, timeout: float | None = RETRY_TASK_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param max_attempts: int: Maximum number of LLM attempts, None for no limit.
+        :param timeout: float: Maximum wall-clock time in seconds, None for no limit.
+        :param clock: Callable[[], float]: Time source, replaceable in tests.
+        """
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.attempts = 0
+        self._clock = clock
+        self._started = clock()
+
+    def remaining_time(self) -> float | None:
+        if self.timeout is None:
+            return None
+        return self.timeout - (self._clock() - self._started)
+
+    def spend(self):
+        """
+        Account for one more attempt.
+
+        :raises RetryBudgetExceeded: If the attempts or the time are used up.
+        """
+        remaining = self.remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise RetryBudgetExceeded(f"Task exceeded its time budget of {self.timeout} seconds.")
+        if self.max_attempts is not None and self.attempts >= self.max_attempts:
+            raise RetryBudgetExceeded(f"Task exceeded its budget of {self.max_attempts} LLM attempts.")
+        self.attempts += 1
+
+    def allows_delay(self, delay: float) -> bool:
+        remaining = self.remaining_time()
+        return remaining is None or delay < remaining
+
+
+_budget: ContextVar[RetryBudget | None] = ContextVar("retry_budget", default=None)
+
+
+@contextmanager
+def task_budget(max_attempts: int | None = RETRY_TASK_MAX_ATTEMPTS,
+                timeout: float | None = RETRY_TASK_TIMEOUT) -> Iterator[RetryBudget]:
+    """
+    Give the current task a retry budget. Coroutines and asyncio tasks started inside the block share it.
+
+    :param max_attempts: int: Maximum number of LLM attempts, None for no limit.
+    :param timeout: float: Maximum wall-clock time in seconds, None for no limit.
+    :return: Iterator[RetryBudget]: The budget.
+    """
+    budget = RetryBudget(max_attempts, timeout)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+def current_budget() -> RetryBudget | None:
+    """
+    :return: RetryBudget | None: The budget of the running task, None outside of task_budget.
+    """
+    return _budget.get()
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive failures of the LLM endpoint.
+
+    While open, calls raise CircuitOpenError. After `reset_timeout` seconds a single trial call is let through
+    (half-open); its success closes the circuit and its failure opens it again. A trial that never reports back,
+    e.g. because it was cancelled, is replaced by another one after `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_BREAKER_RESET_TIMEOUT, clock: Callable[[], float] = time.monotonic):
+        """
+        :param failure_threshold: int: Consecutive failures that open the circuit.
+        :param reset_timeout: float: Seconds the circuit stays open before a trial call.
+        :param clock: Callable[[], float]: Time source, replaceable in tests.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_started: float | None = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """
+        :raises CircuitOpenError: If the circuit is open, or half-open with the trial call still running.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_started = None
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN or (self._trial_started is not None
+                                            and now - self._trial_started < self.reset_timeout):
+                raise CircuitOpenError("The LLM endpoint is unhealthy, failing fast.")
+            self._trial_started = now
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.error("Circuit breaker opened after %s consecutive LLM failures.", self.failures)
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_started = None
+
+
+_circuit_breaker = CircuitBreaker()
+CIRCUIT_OPEN.set_function(lambda: get_circuit_breaker().state == CircuitBreaker.OPEN)
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    :return: CircuitBreaker: The process-wide circuit breaker of the LLM endpoint.
+    """
+    return _circuit_breaker
+
+
+_outcomes: Counter = Counter()
+_outcomes_lock = threading.Lock()
+
+
+def count_outcome(stage: str, outcome: str):
+    """
+    Count an outcome of a pipeline stage, e.g. ("llm", "rate_limited") or ("validate", "rejected").
+    """
+    with _outcomes_lock:
+        _outcomes[(stage, outcome)] += 1
+    STAGE_OUTCOMES.labels(stage, outcome).inc()
+
+
+def retry_stats() -> Dict[str, Dict[str, int]]:
+    """
+    :return: Dict[str, Dict[str, int]]: Outcome counts by stage.
+    """
+    stats = {}
+    with _outcomes_lock:
+        for (stage, outcome), count in sorted(_outcomes.items()):
+            stats.setdefault(stage, {})[outcome] = count
+    return stats
+
+
+def reset_retry_stats():
+    with _outcomes_lock:
+        _outcomes.clear()
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """
+    Read the Retry-After delay of a rate-limited API response.
+
+    :param error: Exception: The error raised by the API client.
+    :return: float | None: Seconds to wait, or None if the server didn't say.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def is_rate_limit(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+async def retry(stage: str, operation: Callable[[], Awaitable[Any]], policy: RetryPolicy | None = None,
+                retry_on: Tuple[Type[Exception], ...] = ()) -> Any:
+    """
+    Run an operation under a retry policy.
+
+    The operation is retried when it returns None or raises one of `retry_on`; any other exception is raised
+    immediately. Rate-limit errors wait at least their Retry-After. Retries stop early, with
+    RetryBudgetExceeded, when the next delay doesn't fit in the time left to the task.
+
+    :param stage: str: Name of the stage, used for the outcome counters and logs.
+    :param operation: Callable[[], Awaitable[Any]]: Makes one attempt.
+    :param policy: RetryPolicy: The policy, defaults to RetryPolicy().
+    :param retry_on: Tuple[Type[Exception], ...]: Exceptions that are retried.
+    :return: Any: The first result that is not None.
+    """
+    policy = policy or RetryPolicy()
+    last_error = None
+    for attempt in range(policy.max_attempts):
+        retry_after = None
+        try:
+            result = await operation()
+        except retry_on as e:
+            last_error = e
+            if is_rate_limit(e):
+                retry_after = retry_after_seconds(e)
+                count_outcome(stage, "rate_limited")
+            else:
+                count_outcome(stage, "error")
+            logger.error("%s attempt %s of %s failed: %s", stage, attempt + 1, policy.max_attempts, e)
+        else:
+            if result is not None:
+                count_outcome(stage, "success")
+                return result
+            count_outcome(stage, "invalid")
+
+        if attempt + 1 == policy.max_attempts:
+            break
+        delay = policy.delay(attempt, retry_after)
+        budget = current_budget()
+        if budget is not None and not budget.allows_delay(delay):
+            count_outcome(stage, "budget_exceeded")
+            raise RetryBudgetExceeded(f"{stage} can't be retried within the task time budget.")
+        count_outcome(stage, "retry")
+        await asyncio.sleep(delay)
+
+    count_outcome(stage, "exhausted")
+    raise RetryExhausted(f"{stage} failed after {policy.max_attempts} attempts.") from last_error
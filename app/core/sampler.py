@@ -0,0 +1,181 @@
+import threading
+from typing import Any, Dict, List, NamedTuple
+
+import numpy as np
+
+from app.config import (
+    POSSIBLE_AMOUNT_OF_PERSONS,
+    WEIGHTS_AMOUNT_OF_PERSONS,
+    POSSIBLE_DISH_TYPES,
+    WEIGHTS_DISH_TYPES,
+    POSSIBLE_MAX_COOKING_TIMES,
+    WEIGHTS_MAX_COOKING_TIMES,
+    POSSIBLE_ALLERGIES,
+    WEIGHTS_ALLERGIES,
+    POSSIBLE_DIET_REQUIREMENTS,
+    WEIGHTS_DIET_REQUIREMENTS,
+    POSSIBLE_CUISINES,
+    WEIGHTS_CUISINES,
+    RANDOMIZATION_TYPES,
+    SAMPLER_SEED,
+)
+from app.schemas.recipe_schemas import Recipe
+
+# Recipe field: (possible values, configured weights, whether the field is a list of distinct values)
+PARAMETER_SPACE = {
+    "amountOfPersons": (POSSIBLE_AMOUNT_OF_PERSONS, WEIGHTS_AMOUNT_OF_PERSONS, False),
+    "dishType": (POSSIBLE_DISH_TYPES, WEIGHTS_DISH_TYPES, False),
+    "maxCooking": (POSSIBLE_MAX_COOKING_TIMES, WEIGHTS_MAX_COOKING_TIMES, False),
+    "allergiesList": (POSSIBLE_ALLERGIES, WEIGHTS_ALLERGIES, True),
+    "dietRequirements": (POSSIBLE_DIET_REQUIREMENTS, WEIGHTS_DIET_REQUIREMENTS, True),
+    "cuisineList": (POSSIBLE_CUISINES, WEIGHTS_CUISINES, True),
+}
+
+
+class Distribution(NamedTuple):
+    options: List[Any]
+    weights: np.ndarray
+    p: np.ndarray
+    multiple: bool
+
+
+class ParameterSampler:
+    """
+    Fills the missing recipe parameters of many requests at once from a seeded NumPy generator.
+
+    "random" draws every value uniformly, "weighted" with the WEIGHTS_* tables and "stratified" spreads the
+    draws evenly over the dish type × cuisine combinations and weights the other fields. List fields get a
+    uniformly drawn number of distinct values, picked with their weights. The distributions are computed once,
+    and a sampler with the same seed draws the same parameters.
+    """
+
+    def __init__(self, randomization_type: str | None = None, weights: Dict[str, float] | None = None,
+                 seed: int | np.random.Generator | None = None):
+        """
+        :param randomization_type: str: One of RANDOMIZATION_TYPES, None for "random".
+        :param weights: Dict[str, float]: Weights replacing those of single values, keyed by the value
+            ("Italian", "4") or by field and value ("amountOfPersons:4"). 0 excludes a value.
+        :param seed: int | np.random.Generator: Seed or generator of the draws, None for a random seed.
+        """
+        self.randomization_type = randomization_type or "random"
+        if self.randomization_type not in RANDOMIZATION_TYPES:
+            raise ValueError(f"Invalid randomization_type. Must be one of: {RANDOMIZATION_TYPES}")
+
+        field_weights = {
+            field: np.array(configured if self.randomization_type != "random" else [1] * len(options), dtype=float)
+            for field, (options, configured, _) in PARAMETER_SPACE.items()
+        }
+        for key, weight in (weights or {}).items():
+            field, index = self._resolve(key)
+            if weight < 0:
+                raise ValueError(f"Weight of {key!r} must not be negative")
+            field_weights[field][index] = weight
+
+        self.distributions: Dict[str, Distribution] = {}
+        for field, (options, _, multiple) in PARAMETER_SPACE.items():
+            field_weight = field_weights[field]
+            if field_weight.sum() <= 0:
+                raise ValueError(f"All values of {field} have a weight of 0")
+            self.distributions[field] = Distribution(list(options), field_weight, field_weight / field_weight.sum(),
+                                                     multiple)
+
+        self.rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _resolve(key: str) -> tuple:
+        field, _, value = key.rpartition(":")
+        if field and field not in PARAMETER_SPACE:
+            raise ValueError(f"Unknown parameter {field!r} in weight {key!r}")
+        matches = [(name, index) for name in ([field] if field else PARAMETER_SPACE)
+                   for index, option in enumerate(PARAMETER_SPACE[name][0]) if str(option) == value]
+        if len(matches) != 1:
+            raise ValueError(f"Weight {key!r} does not name exactly one parameter value")
+        return matches[0]
+
+    def sample(self, params: Recipe, n: int = 1) -> List[Recipe]:
+        """
+        Draw `n` complete parameter sets, keeping the values given in `params`.
+
+        :param params: Recipe: The requested parameters, None for the values to draw.
+        :param n: int: Number of parameter sets.
+        :return: List[Recipe]: The filled parameters.
+        """
+        with self._lock:
+            columns = self._stratify(params, n) if self.randomization_type == "stratified" else {}
+            for field, distribution in self.distributions.items():
+                if field in columns or getattr(params, field) is not None:
+                    continue
+                columns[field] = self._draw_lists(distribution, n) if distribution.multiple \
+                    else self.rng.choice(len(distribution.options), size=n, p=distribution.p)
+
+        filled = []
+        for row in range(n):
+            values = {}
+            for field, column in columns.items():
+                options = self.distributions[field].options
+                if self.distributions[field].multiple:
+                    values[field] = [options[index] for index in column[row]]
+                else:
+                    values[field] = options[column[row]]
+            filled.append(params.model_copy(update=values, deep=True))
+        return filled
+
+    def _draw_lists(self, distribution: Distribution, n: int) -> np.ndarray:
+        """
+        Weighted draws without replacement for n rows at once: each value gets the key log(u) / weight and
+        the values with the highest keys are taken (Efraimidis-Spirakis), the same distribution as picking
+        them one by one.
+
+        :return: np.ndarray: Object array of n index arrays.
+        """
+        positive = int((distribution.weights > 0).sum())
+        sizes = self.rng.integers(0, positive + 1, size=n)
+        with np.errstate(divide="ignore"):
+            keys = np.log(1.0 - self.rng.random((n, len(distribution.options)))) / distribution.weights
+        order = np.argsort(-keys, axis=1)
+        column = np.empty(n, dtype=object)
+        for row in range(n):
+            column[row] = order[row, :sizes[row]]
+        return column
+
+    def _stratify(self, params: Recipe, n: int) -> Dict[str, np.ndarray]:
+        """
+        Assign the n draws to the dish type × cuisine combinations with a positive weight, each combination
+        getting n // combinations draws and a random subset of them one more. A requested dish type or
+        cuisine list is kept and only the other one is spread.
+
+        :return: Dict[str, np.ndarray]: Option indexes of dishType, and one-cuisine index arrays of cuisineList.
+        """
+        axes = {field: np.flatnonzero(self.distributions[field].weights > 0)
+                for field in ("dishType", "cuisineList") if getattr(params, field) is None}
+        if not axes:
+            return {}
+        grids = np.meshgrid(*axes.values(), indexing="ij")
+        combinations = np.stack([grid.ravel() for grid in grids], axis=1)
+        count = len(combinations)
+        assigned = np.concatenate((np.tile(np.arange(count), n // count),
+                                   self.rng.choice(count, size=n % count, replace=False)))
+        assigned = combinations[self.rng.permutation(assigned)]
+        columns = {field: assigned[:, position] for position, field in enumerate(axes)}
+        if "cuisineList" in columns:
+            cuisines = np.empty(n, dtype=object)
+            for row, cuisine in enumerate(columns["cuisineList"]):
+                cuisines[row] = [cuisine]
+            columns["cuisineList"] = cuisines
+        return columns
+
+
+_samplers: Dict[str, ParameterSampler] = {}
+_samplers_lock = threading.Lock()
+
+
+def get_sampler(randomization_type: str = "random") -> ParameterSampler:
+    """
+    :param randomization_type: str: One of RANDOMIZATION_TYPES.
+    :return: ParameterSampler: The sampler of this process for the type, seeded with SAMPLER_SEED.
+    """
+    with _samplers_lock:
+        if randomization_type not in _samplers:
+            _samplers[randomization_type] = ParameterSampler(randomization_type, seed=SAMPLER_SEED)
+        return _samplers[randomization_type]
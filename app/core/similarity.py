@@ -0,0 +1,181 @@
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.config import DEDUP_BATCH_SIZE, DEDUP_NUM_PERM, DEDUP_THRESHOLD
+from app.core.ingredients import STOP_WORDS, ingredient_names, ingredient_terms, normalize_ingredient_name, singularize
+
+# Largest prime below 2**32: with hashes and coefficients below it, a * x + b fits in uint64 without overflow.
+PRIME = np.uint64((1 << 32) - 5)
+# Changing the seed or DEDUP_NUM_PERM changes every signature, the stored index then has to be rebuilt.
+MINHASH_SEED = 20240917
+
+
+def recipe_shingles(name: str | None, ingredients: Any) -> Set[str]:
+    """
+    The features two recipes are compared on: their normalized ingredient names, and the words and word pairs
+    of their titles. "2 fresh Tomatoes" and "tomato" give the same ingredient shingle.
+
+    :param name: str: The recipe title.
+    :param ingredients: Any: The ingredients of the recipe.
+    :return: Set[str]: The shingles.
+    """
+    shingles = set()
+    for ingredient in ingredient_names(ingredients):
+        terms = ingredient_terms(ingredient)
+        if terms:
+            shingles.add("ingredient:" + " ".join(sorted(terms)))
+
+    words = [singularize(word) for word in normalize_ingredient_name(name or "").replace("-", " ").split()
+             if word not in STOP_WORDS]
+    shingles.update(f"title:{word}" for word in words)
+    shingles.update(f"title:{first} {second}" for first, second in zip(words, words[1:]))
+    return shingles
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of shingle sets, many sets per NumPy operation.
+
+    Each of the `num_perm` hash functions is a random universal hash (a * x + b) mod PRIME of the CRC32 of
+    the shingles. The share of equal positions in two signatures estimates the Jaccard similarity of the sets.
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, seed: int = MINHASH_SEED,
+                 batch_size: int = DEDUP_BATCH_SIZE):
+        """
+        :param num_perm: int: Number of hash functions, the length of a signature.
+        :param seed: int: Seed of the hash functions, equal seeds give comparable signatures.
+        :param batch_size: int: Number of sets hashed per NumPy operation.
+        """
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.batch_size = batch_size
+        self.a = rng.integers(1, PRIME, num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, PRIME, num_perm, dtype=np.uint64)[:, None]
+
+    def signatures(self, shingle_sets: Sequence[Set[str]]) -> np.ndarray:
+        """
+        :param shingle_sets: Sequence[Set[str]]: The shingles of each recipe.
+        :return: np.ndarray: uint32 array of shape (len(shingle_sets), num_perm). Rows of empty sets are all PRIME.
+        """
+        signatures = np.full((len(shingle_sets), self.num_perm), PRIME, dtype=np.uint64)
+        for start in range(0, len(shingle_sets), self.batch_size):
+            batch = shingle_sets[start:start + self.batch_size]
+            lengths = np.fromiter((len(shingles) for shingles in batch), dtype=np.int64, count=len(batch))
+            if not lengths.any():
+                continue
+            hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingles in batch for shingle in shingles),
+                                 dtype=np.uint64, count=int(lengths.sum())) % PRIME
+            permuted = (self.a * hashes + self.b) % PRIME
+            non_empty = np.flatnonzero(lengths)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))[non_empty]
+            signatures[start + non_empty] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return signatures.astype(np.uint32)
+
+
+def lsh_bands(threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM) -> Tuple[int, int]:
+    """
+    Split signatures into bands so that pairs above `threshold` very likely share a band.
+
+    Two signatures share a band of `rows` positions with probability s**rows at Jaccard similarity s, and the
+    curve 1 - (1 - s**rows)**bands rises steeply around (1 / bands)**(1 / rows). The split with the highest
+    such point not above the threshold is used, so misses stay rare and false candidates are filtered out
+    by comparing signatures.
+
+    :param threshold: float: The Jaccard similarity of near-duplicates.
+    :param num_perm: int: The signature length.
+    :return: Tuple[int, int]: The number of bands and of rows per band.
+    """
+    splits = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+    below = [(bands, rows) for bands, rows in splits if (1 / bands) ** (1 / rows) <= threshold]
+    return max(below or splits[:1], key=lambda split: (1 / split[0]) ** (1 / split[1]))
+
+
+LSH_BANDS, LSH_ROWS = lsh_bands()
+
+# Odd multipliers of the band hashes, fixed so that the stored buckets stay comparable.
+_BAND_MULTIPLIERS = np.random.default_rng(MINHASH_SEED + 1).integers(
+    1, 1 << 62, DEDUP_NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+def band_buckets(signatures: np.ndarray, bands: int = LSH_BANDS, rows: int = LSH_ROWS) -> np.ndarray:
+    """
+    Hash each band of the signatures to a bucket, recipes in the same bucket of a band are candidates.
+
+    :param signatures: np.ndarray: Signatures of shape (n, num_perm).
+    :param bands: int: Number of bands.
+    :param rows: int: Signature positions per band.
+    :return: np.ndarray: int64 array of shape (n, bands).
+    """
+    banded = signatures[:, :bands * rows].astype(np.uint64).reshape(len(signatures), bands, rows)
+    with np.errstate(over="ignore"):
+        return (banded * _BAND_MULTIPLIERS[:rows]).sum(axis=2, dtype=np.uint64).view(np.int64)
+
+
+def similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """
+    :param signature: np.ndarray: A signature.
+    :param others: np.ndarray: Signatures of shape (n, num_perm).
+    :return: np.ndarray: The estimated Jaccard similarity of the signature with each of the others.
+    """
+    return (others == signature).mean(axis=1)
+
+
+def is_empty(signature: np.ndarray) -> bool:
+    """
+    :return: bool: True for the signature of a recipe without shingles, which is never a duplicate.
+    """
+    return bool((signature == PRIME).all())
+
+
+class SimilarityIndex:
+    """
+    In-memory LSH index of signatures, for deduplicating many recipes at once.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self._buckets: List[Dict[int, List[Hashable]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def buckets(self, signatures: np.ndarray) -> np.ndarray:
+        return band_buckets(signatures, self.bands, self.rows)
+
+    def add(self, key: Hashable, signature: np.ndarray, buckets: Iterable[int]):
+        self._signatures[key] = signature
+        for band, bucket in enumerate(buckets):
+            self._buckets[band][int(bucket)].append(key)
+
+    def query(self, signature: np.ndarray, buckets: Iterable[int]) -> List[Tuple[Hashable, float]]:
+        """
+        :return: List[Tuple[Hashable, float]]: The indexed keys at least `threshold` similar, most similar first.
+        """
+        if is_empty(signature):
+            return []
+        candidates = list(dict.fromkeys(key for band, bucket in enumerate(buckets)
+                                        for key in self._buckets[band].get(int(bucket), ())))
+        if not candidates:
+            return []
+        scores = similarity(signature, np.stack([self._signatures[key] for key in candidates]))
+        matches = [(key, float(score)) for key, score in zip(candidates, scores) if score >= self.threshold]
+        return sorted(matches, key=lambda match: -match[1])
+
+
+_minhasher: MinHasher | None = None
+
+
+def get_minhasher() -> MinHasher:
+    """
+    :return: MinHasher: The hasher of the stored signatures.
+    """
+    global _minhasher
+    if _minhasher is None:
+        _minhasher = MinHasher()
+    return _minhasher
@@ -0,0 +1,197 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Set
+
+import redis.asyncio as redis
+from fastapi.encoders import jsonable_encoder
+
+from app.config import REDIS_URL, TASK_EVENTS_CHANNEL, TASK_EVENTS_RECONNECT_DELAY
+from app.logging_config import logger
+
+TERMINAL_STATES = ("SUCCESS", "FAILURE")
+
+# Put on every listener queue after the subscription was re-established: events published while it was down
+# are lost, so listeners should read the task state again.
+RESYNC = {"status": "RESYNC"}
+
+_redis: redis.Redis | None = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    :return: redis.Redis: The Redis client of this process, created on first use.
+    """
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(REDIS_URL, decode_responses=True)
+    return _redis
+
+
+async def close_redis():
+    """
+    Close the Redis client of this process, if it was created.
+    """
+    global _redis
+    client, _redis = _redis, None
+    if client is not None:
+        await client.aclose()
+
+
+async def publish_task_event(recipe_id: str, status: str, recipe: Any = None, error: str | None = None,
+                             channel: str = TASK_EVENTS_CHANNEL) -> None:
+    """
+    Publish a state transition of a recipe generation task.
+
+    Publishing is best effort: a failure is logged and never fails the task, listeners fall back to
+    reading the task state.
+
+    :param recipe_id: str: The ID of the recipe, which is also the task ID.
+    :param status: str: The new state, e.g. "STARTED" or "SUCCESS".
+    :param recipe: Any: The saved recipe, sent with the SUCCESS event.
+    :param error: str: The error message, sent with the FAILURE event.
+    :param channel: str: The pub/sub channel.
+    """
+    event = {"recipe_id": str(recipe_id), "status": status}
+    if recipe is not None:
+        event["recipe"] = recipe
+    if error is not None:
+        event["error"] = error
+    try:
+        await get_redis().publish(channel, json.dumps(jsonable_encoder(event)))
+    except Exception as e:
+        logger.error("Error publishing %s event of task %s: %s", status, recipe_id, e)
+
+
+class TaskEventHub:
+    """
+    Fans the task events of one pub/sub subscription out to the listeners of this process.
+
+    The subscription is opened with the first listener and shared by all of them, so the number of
+    connected clients doesn't change the load on Redis. Each listener gets the events of one task
+    on its own queue. A lost subscription is re-established and the listeners are sent RESYNC.
+    """
+
+    def __init__(self, redis_factory: Callable[[], redis.Redis] = get_redis, channel: str = TASK_EVENTS_CHANNEL,
+                 reconnect_delay: float = TASK_EVENTS_RECONNECT_DELAY):
+        """
+        :param redis_factory: Callable[[], redis.Redis]: Returns the client to subscribe with.
+        :param channel: str: The pub/sub channel.
+        :param reconnect_delay: float: Seconds to wait before re-subscribing after an error.
+        """
+        self.redis_factory = redis_factory
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._reader: asyncio.Task | None = None
+        self._subscribed: asyncio.Event | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def listener_count(self) -> int:
+        return sum(len(queues) for queues in self._listeners.values())
+
+    @asynccontextmanager
+    async def listen(self, recipe_id: str) -> AsyncIterator[asyncio.Queue]:
+        """
+        Receive the events of a task, e.g. `async with hub.listen(recipe_id) as events: await events.get()`.
+
+        The subscription is active when the block is entered, so the task state read inside it can't miss
+        a transition.
+
+        :param recipe_id: str: The ID of the recipe.
+        :return: asyncio.Queue: Queue of the event dicts of the task.
+        """
+        queue = asyncio.Queue()
+        self._listeners.setdefault(str(recipe_id), set()).add(queue)
+        try:
+            await self._ensure_subscribed()
+            yield queue
+        finally:
+            queues = self._listeners.get(str(recipe_id))
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._listeners[str(recipe_id)]
+
+    async def _ensure_subscribed(self):
+        async with self._lock:
+            if self._reader is None or self._reader.done():
+                self._subscribed = asyncio.Event()
+                self._reader = asyncio.create_task(self._read())
+            subscribed = self._subscribed
+        await subscribed.wait()
+
+    async def _read(self):
+        connected_before = False
+        while True:
+            pubsub = self.redis_factory().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if connected_before:
+                    self._broadcast(RESYNC)
+                connected_before = True
+                self._subscribed.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Task event subscription to %s failed, reconnecting: %s", self.channel, e)
+                # Don't keep listeners waiting: they read the task state now and get RESYNC once connected.
+                connected_before = True
+                self._subscribed.set()
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception as e:
+                    logger.debug("Error closing the task event subscription: %s", e)
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _dispatch(self, data: str | bytes):
+        try:
+            event = json.loads(data)
+        except ValueError:
+            logger.error("Ignoring malformed task event: %r", data)
+            return
+        for queue in self._listeners.get(str(event.get("recipe_id")), ()):
+            queue.put_nowait(event)
+
+    def _broadcast(self, event: dict):
+        for queues in self._listeners.values():
+            for queue in queues:
+                queue.put_nowait(event)
+
+    async def close(self):
+        """
+        Drop the subscription.
+        """
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+
+_hub: TaskEventHub | None = None
+
+
+def get_task_event_hub() -> TaskEventHub:
+    """
+    :return: TaskEventHub: The hub of this process, created on first use.
+    """
+    global _hub
+    if _hub is None:
+        _hub = TaskEventHub()
+    return _hub
+
+
+async def close_task_event_hub():
+    """
+    Drop the subscription of the hub and close the Redis client.
+    """
+    global _hub
+    hub, _hub = _hub, None
+    if hub is not None:
+        await hub.close()
+    await close_redis()
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import enum
+import json
+import sys
+import time
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import TRANSFER_BATCH_SIZE, TRANSFER_COMMIT_SIZE
+from app.core.recipe_cache import get_recipe_cache
+from app.db.crud import derived_columns, index_recipes, materialize_response, stream_recipe_rows, upsert_recipes
+from app.db import init_db
+from app.db.database import AsyncSessionLocal, engine
+from app.db.models import RecipeStatus
+from app.logging_config import logger
+from app.schemas.recipe_schemas import RecipeFilters
+
+# The stored columns of a recipe. The cooking minutes and nutrition columns are derived again on import.
+EXPORT_COLUMNS = ("id", "name", "cooking_time", "required_tools", "ingredients", "steps", "nutrition", "status",
+                  "cuisine", "dish_type")
+REQUIRED_COLUMNS = ("id", "name", "ingredients")
+GZIP_MAGIC = b"\x1f\x8b"
+READ_SIZE = 1 << 20
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def export_recipes(db: AsyncSession, filters: RecipeFilters | None = None,
+                         batch_size: int = TRANSFER_BATCH_SIZE, compresslevel: int = 6) -> AsyncIterator[bytes]:
+    """
+    Stream the recipes table as gzip-compressed NDJSON, one recipe per line in ID order.
+
+    Rows are read `batch_size` at a time from a server-side cursor and compressed batch by batch, so memory use
+    does not grow with the table.
+
+    :param db: AsyncSession: The database session.
+    :param filters: RecipeFilters: The recipes to export, None for all.
+    :param batch_size: int: Number of rows fetched and compressed at a time.
+    :param compresslevel: int: The gzip compression level.
+    :return: AsyncIterator[bytes]: The pieces of the gzip file.
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+    lines = []
+    exported = 0
+    async for row in stream_recipe_rows(db, filters or RecipeFilters(), EXPORT_COLUMNS, batch_size):
+        lines.append(json.dumps(dict(row), default=_encode, separators=(",", ":")))
+        if len(lines) >= batch_size:
+            exported += len(lines)
+            chunk = compressor.compress(("\n".join(lines) + "\n").encode())
+            lines = []
+            if chunk:
+                yield chunk
+    if lines:
+        exported += len(lines)
+        yield compressor.compress(("\n".join(lines) + "\n").encode())
+    yield compressor.flush()
+    logger.info("Exported %s recipes.", exported)
+
+
+async def ndjson_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Split a stream of NDJSON bytes into lines, decompressing it first if it is gzip.
+
+    :param chunks: AsyncIterable[bytes]: The file, in pieces of any size.
+    :return: AsyncIterator[bytes]: The non-empty lines.
+    """
+    decompressor = None
+    pending = b""
+    first = True
+    async for chunk in chunks:
+        if first and chunk:
+            first = False
+            if chunk[:2] == GZIP_MAGIC:
+                decompressor = zlib.decompressobj(31)
+        data = decompressor.decompress(chunk) if decompressor is not None else chunk
+        *lines, pending = (pending + data).split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if decompressor is not None:
+        pending += decompressor.flush()
+    if pending.strip():
+        yield pending
+
+
+def record_row(record: Dict[str, Any]) -> dict:
+    """
+    Map an exported recipe back to the column values of the recipes table.
+
+    :param record: Dict[str, Any]: A decoded NDJSON line.
+    :return: dict: The column values, with the derived columns and the stored response recomputed.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if record.get(column) is None]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    row = {column: record.get(column) for column in EXPORT_COLUMNS}
+    row["id"] = UUID(str(row["id"]))
+    row["status"] = RecipeStatus(row["status"] or RecipeStatus.ACTIVE.value)
+    row.update(derived_columns(row["cooking_time"], row["nutrition"]))
+    row.update(materialize_response(row))
+    return row
+
+
+async def import_recipes(db: AsyncSession, lines: AsyncIterable[bytes], update: bool = True,
+                         batch_size: int = TRANSFER_BATCH_SIZE, commit_size: int = TRANSFER_COMMIT_SIZE) -> dict:
+    """
+    Load NDJSON recipes into the recipes table.
+
+    Rows are written `batch_size` at a time with multi-row upserts and committed every `commit_size` rows,
+    together with their search and near-duplicate index entries. Lines that are not valid recipes are skipped
+    and counted.
+
+    :param db: AsyncSession: The database session.
+    :param lines: AsyncIterable[bytes]: The NDJSON lines, see ndjson_lines.
+    :param update: bool: Overwrite recipes whose ID exists, otherwise skip them.
+    :param batch_size: int: Number of rows per insert statement.
+    :param commit_size: int: Number of rows per transaction.
+    :return: dict: The numbers of lines read, recipes written, existing recipes skipped and invalid lines.
+    """
+    counts = {"read": 0, "written": 0, "skipped": 0, "invalid": 0}
+    batch: List[dict] = []
+    uncommitted_ids: List[UUID] = []
+    uncommitted = 0
+    started = time.perf_counter()
+
+    async def commit():
+        nonlocal uncommitted, uncommitted_ids
+        await db.commit()
+        await get_recipe_cache().invalidate(uncommitted_ids)
+        uncommitted = 0
+        uncommitted_ids = []
+
+    async def write():
+        nonlocal batch, uncommitted
+        written = set(await upsert_recipes(db, batch, update))
+        await index_recipes(db, [row for row in batch if row["id"] in written], replace=True)
+        counts["written"] += len(written)
+        counts["skipped"] += len(batch) - len(written)
+        uncommitted += len(batch)
+        uncommitted_ids.extend(written)
+        batch = []
+        if uncommitted >= commit_size:
+            await commit()
+            logger.info("Imported %s recipes (%.0f lines/s).", counts["written"],
+                        counts["read"] / (time.perf_counter() - started))
+
+    try:
+        async for line in lines:
+            counts["read"] += 1
+            try:
+                row = record_row(json.loads(line))
+            except (ValueError, TypeError, AttributeError) as e:
+                counts["invalid"] += 1
+                logger.warning("Skipping invalid recipe on line %s: %s", counts["read"], e)
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await write()
+        if batch:
+            await write()
+        await commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    logger.info("Import finished: %s", counts)
+    return counts
+
+
+async def read_file(path: str) -> AsyncIterator[bytes]:
+    """
+    :param path: str: The file to read, "-" for the standard input.
+    :return: AsyncIterator[bytes]: The file in pieces of READ_SIZE bytes.
+    """
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(stream.read, READ_SIZE):
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+async def main(args: argparse.Namespace):
+    try:
+        async with AsyncSessionLocal() as db:
+            if args.command == "export":
+                filters = RecipeFilters(status=args.status, cuisine=args.cuisine, dish_type=args.dish_type)
+                output = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+                try:
+                    async for chunk in export_recipes(db, filters):
+                        output.write(chunk)
+                finally:
+                    if output is not sys.stdout.buffer:
+                        output.close()
+            else:
+                await init_db()
+                result = await import_recipes(db, ndjson_lines(read_file(args.path)),
+                                              update=args.on_conflict == "update")
+                print(json.dumps(result, indent=2))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import the recipes table as gzip NDJSON.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write the recipes to a gzip NDJSON file.")
+    export_parser.add_argument("path", help="Output file, - for the standard output.")
+    export_parser.add_argument("--status", choices=[status.value for status in RecipeStatus])
+    export_parser.add_argument("--cuisine")
+    export_parser.add_argument("--dish-type")
+    import_parser = commands.add_parser("import", help="Load recipes from an NDJSON file, gzip or not.")
+    import_parser.add_argument("path", help="Input file, - for the standard input.")
+    import_parser.add_argument("--on-conflict", choices=("update", "skip"), default="update",
+                               help="Overwrite or keep recipes whose ID already exists.")
+    asyncio.run(main(parser.parse_args()))
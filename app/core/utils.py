@@ -1,21 +1,9 @@
 import json
-import random
+import re
 from typing import List, Dict, Any
 from app.logging_config import logger
 from app.schemas.recipe_schemas import Recipe
-from app.config import (
-    WEIGHTS_DISH_TYPES,
-    WEIGHTS_ALLERGIES,
-    WEIGHTS_DIET_REQUIREMENTS,
-    WEIGHTS_CUISINES,
-    POSSIBLE_AMOUNT_OF_PERSONS,
-    WEIGHTS_AMOUNT_OF_PERSONS,
-    POSSIBLE_DISH_TYPES,
-    POSSIBLE_CUISINES,
-    POSSIBLE_DIET_REQUIREMENTS,
-    POSSIBLE_ALLERGIES, POSSIBLE_MAX_COOKING_TIMES, WEIGHTS_MAX_COOKING_TIMES
-)
-import numpy as np
+from app.core.sampler import get_sampler
 
 
 async def combine(recipe: Recipe, nutrition_info: Dict[str, Any]) -> Recipe:
@@ -43,7 +31,7 @@ async def parse_gpt_response(content: str) -> Recipe | None:
     try:
         return json.loads(content)
     except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON: {e}")
+        logger.error("Failed to parse JSON: %s", e)
         return None
 
 
@@ -53,35 +41,48 @@ async def generate_random_recipe_values(params: Recipe, use_weights: bool = Fals
 
     :param params: Recipe: The recipe parameters.
     :param use_weights: bool: If True, apply weights to generate the parameters.
-    :return: Recipe: The updated recipe parameters.
+    :return: Recipe: The filled copy of the recipe parameters.
     """
-    if params.amountOfPersons is None:
-        params.amountOfPersons = random.choices(
-            POSSIBLE_AMOUNT_OF_PERSONS, weights=WEIGHTS_AMOUNT_OF_PERSONS if use_weights else None, k=1)[0]
+    return get_sampler("weighted" if use_weights else "random").sample(params)[0]
 
-    if params.dishType is None:
-        params.dishType = random.choices(
-            POSSIBLE_DISH_TYPES, weights=WEIGHTS_DISH_TYPES if use_weights else None, k=1)[0]
 
-    if params.maxCooking is None:
-        params.maxCooking = random.choices(
-            POSSIBLE_MAX_COOKING_TIMES, weights=WEIGHTS_MAX_COOKING_TIMES if use_weights else None, k=1)[0]
+def parse_cooking_minutes(cooking_time: Any) -> int | None:
+    """
+    Parse a cooking time such as 45, "45 minutes", "1 hour 30 minutes" or "1.5 hours" into minutes.
 
-    if params.allergiesList is None:
-        params.allergiesList = np.random.choice(POSSIBLE_ALLERGIES, size=random.randint(0, len(POSSIBLE_ALLERGIES)),
-                                                replace=False, p=normalize_weights(WEIGHTS_ALLERGIES) if use_weights else None).tolist()
+    :param cooking_time: Any: The cooking time of a generated recipe.
+    :return: int | None: The cooking time in minutes, or None if it cannot be parsed.
+    """
+    if isinstance(cooking_time, (int, float)):
+        return int(cooking_time)
+    if not isinstance(cooking_time, str):
+        return None
 
-    if params.dietRequirements is None:
-        params.dietRequirements = np.random.choice(POSSIBLE_DIET_REQUIREMENTS,
-                                                   size=random.randint(0, len(POSSIBLE_DIET_REQUIREMENTS)),
-                                                   replace=False,
-                                                   p=normalize_weights(WEIGHTS_DIET_REQUIREMENTS) if use_weights else None).tolist()
+    text = cooking_time.lower()
+    hours = re.search(r"(\d+(?:\.\d+)?)\s*(?:h|hr|hrs|hour|hours)\b", text)
+    minutes = re.search(r"(\d+(?:\.\d+)?)\s*(?:m|min|mins|minute|minutes)\b", text)
+    if hours or minutes:
+        return round(float(hours.group(1)) * 60 if hours else 0) + round(float(minutes.group(1)) if minutes else 0)
 
-    if params.cuisineList is None:
-        params.cuisineList = np.random.choice(POSSIBLE_CUISINES, size=random.randint(0, len(POSSIBLE_CUISINES)),
-                                              replace=False, p=normalize_weights(WEIGHTS_CUISINES) if use_weights else None).tolist()
+    number = re.search(r"\d+(?:\.\d+)?", text)
+    return round(float(number.group())) if number else None
 
-    return params
+
+def parse_number(value: Any) -> float | None:
+    """
+    Parse a generated quantity such as 450, "450 kcal" or "25.5g" into a number.
+
+    :param value: Any: The quantity.
+    :return: float | None: The number, or None if it cannot be parsed.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    number = re.search(r"-?\d+(?:\.\d+)?", value.replace(",", ""))
+    return float(number.group()) if number else None
 
 
 async def convert_ingredients_to_list(ingredients_dict: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -93,13 +94,3 @@ async def convert_ingredients_to_list(ingredients_dict: Dict[str, Dict[str, Any]
     :return: List[Dict[str, Any]]: Ingredients converted to a list format.
     """
     return [{"Name": name, **details} for name, details in ingredients_dict.items()]
-
-def normalize_weights(weights: List[int]) -> List[float]:
-    """
-    Normalize a list of weights so they sum up to 1.
-
-    :param weights: List[int]: The list of weights.
-    :return: List[float]: The normalized weights.
-    """
-    w = np.array(weights, dtype=float)
-    return w / w.sum()
\ No newline at end of file
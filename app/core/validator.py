@@ -1,15 +1,9 @@
+from app.config import LLM_MODEL
 from app.core.llm import chat_completion
+from app.core.llm_cache import LLMCache
 from app.schemas.recipe_schemas import Recipe
 
-
-async def validate_recipe(recipe: Recipe):
-    """
-    Validates the recipe generated by the model.
-
-    :param recipe: RecipeCreate: The recipe to validate.
-    :return: str: The validation response.
-    """
-    prompt = f"""
+VALIDATION_PROMPT = """
     You are a professional chef. The recipe is defined between <recipe> and </recipe>.
     Check if it is realistic or not.
     Check all the recipe parameters: the ratio of ingredients;
@@ -21,4 +15,17 @@ async def validate_recipe(recipe: Recipe):
     </recipe>
     """
 
-    return await chat_completion(prompt)
+
+async def validate_recipe(recipe: Recipe, use_cache: bool = False, model: str = LLM_MODEL):
+    """
+    Validates the recipe generated by the model.
+
+    :param recipe: RecipeCreate: The recipe to validate.
+    :param use_cache: bool: If True, reuse the verdict cached for an identical recipe.
+    :param model: str: The model asked, e.g. a cheaper one to confirm a self-checked recipe.
+    :return: str: The validation response.
+    """
+    prompt = VALIDATION_PROMPT.format(recipe=recipe)
+    cache_key = LLMCache.make_key(model, VALIDATION_PROMPT, recipe) if use_cache else None
+
+    return await chat_completion(prompt, model=model, cache_key=cache_key)
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from typing import Any, Coroutine
+
+from app.core.llm import close_llm_client
+from app.core.recipe_cache import close_recipe_cache
+from app.core.task_events import close_redis
+from app.db.database import engine
+from app.logging_config import logger
+
+
+class WorkerLoop:
+    """
+    Long-lived event loop running in a background thread of a Celery worker process.
+
+    Tasks submit their coroutines to it instead of calling asyncio.run, so the DB engine pool
+    and the LLM client connections, which are bound to the loop, are reused across tasks.
+    Several tasks can run on the loop concurrently when the worker uses a thread pool.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="worker-event-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Coroutine, timeout: float | None = None) -> Any:
+        """
+        Run a coroutine on the loop and wait for its result from the calling thread.
+
+        :param coro: Coroutine: The coroutine to run.
+        :param timeout: float: Seconds to wait for the result, None to wait indefinitely.
+        :return: Any: The result of the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        """
+        Release the loop-bound resources, then stop the loop and its thread.
+        """
+        try:
+            self.run(_close_resources(), timeout=30)
+        except Exception as e:
+            logger.error("Error closing worker resources: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+async def _close_resources():
+    await close_llm_client()
+    await close_redis()
+    await close_recipe_cache()
+    await engine.dispose()
+
+
+_worker_loop: WorkerLoop | None = None
+_worker_loop_lock = threading.Lock()
+
+
+def start_worker_loop() -> WorkerLoop:
+    """
+    Start the worker event loop, discarding a loop inherited from a parent process.
+
+    :return: WorkerLoop: The new loop.
+    """
+    global _worker_loop
+    with _worker_loop_lock:
+        _worker_loop = WorkerLoop()
+        logger.info("Worker event loop started.")
+        return _worker_loop
+
+
+def get_worker_loop() -> WorkerLoop:
+    """
+    Return the worker event loop, starting it on first use.
+
+    :return: WorkerLoop: The shared loop.
+    """
+    global _worker_loop
+    with _worker_loop_lock:
+        if _worker_loop is None:
+            _worker_loop = WorkerLoop()
+            logger.info("Worker event loop started.")
+        return _worker_loop
+
+
+def stop_worker_loop():
+    """
+    Stop the worker event loop, if it is running.
+    """
+    global _worker_loop
+    with _worker_loop_lock:
+        worker_loop, _worker_loop = _worker_loop, None
+    if worker_loop is not None:
+        worker_loop.stop()
+        logger.info("Worker event loop stopped.")
+
+
+def run_in_worker_loop(coro: Coroutine, timeout: float | None = None) -> Any:
+    """
+    Run a coroutine on the worker event loop and return its result.
+
+    :param coro: Coroutine: The coroutine to run.
+    :param timeout: float: Seconds to wait for the result, None to wait indefinitely.
+    :return: Any: The result of the coroutine.
+    """
+    return get_worker_loop().run(coro, timeout)
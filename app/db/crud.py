@@ -1,41 +1,380 @@
+import hashlib
+from typing import AsyncIterator, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+from sqlalchemy import Select, Update, and_, bindparam, delete, exists, func, insert, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import load_only
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.db.models import Recipe
+from app.config import DEDUP_THRESHOLD, RECIPES_STREAM_BATCH_SIZE
+from app.core.ingredients import index_ingredients, search_terms
+from app.core.recipe_cache import get_recipe_cache
+from app.core.similarity import band_buckets, get_minhasher, is_empty, recipe_shingles, similarity
+from app.core.utils import parse_cooking_minutes, parse_number
+from app.db.models import (
+    Recipe,
+    RecipeStatus,
+    RecipeIngredient,
+    RecipeAllergen,
+    RecipeMinHash,
+    RecipeLSHBand,
+    InventoryRecipe,
+)
+from app.schemas.recipe_schemas import Recipe as RecipeParams, RecipeFilters, RecipeSearch
 from fastapi import HTTPException
 from uuid import UUID
 from app.logging_config import logger
 
+MATERIALIZED_COLUMNS = ("response_json", "etag")
+RECIPE_FIELDS = tuple(column.key for column in Recipe.__table__.columns if column.key not in MATERIALIZED_COLUMNS)
+RECIPE_SUMMARY_FIELDS = ("id", "name", "status", "cooking_time", "cuisine", "dish_type")
+# The columns to load for serving the stored responses, see recipe_responses.
+MATERIALIZED_FIELDS = ("id", *MATERIALIZED_COLUMNS)
+NUTRITION_COLUMNS = ("calories", "protein", "fat", "carbohydrates")
+
 
-async def save_recipe(db: AsyncSession, recipe_data: dict | Recipe, recipe_id: str) -> Recipe | dict:
+async def save_recipe(db: AsyncSession, recipe_data: dict | Recipe, recipe_id: str,
+                      params: RecipeParams | None = None) -> Recipe | dict:
     """
     Save the recipe data to the database
 
     :param db: AsyncSession: The database session
     :param recipe_data: dict: The recipe data
     :param recipe_id: str: The recipe ID
+    :param params: Recipe: The parameters the recipe was generated with
     :return: Recipe: The saved recipe
     """
-    logger.info(f"Creating recipe with data: {recipe_data} and ID: {recipe_id}")
-    recipe = Recipe(
-        id=UUID(recipe_id),
-        name=recipe_data["Name"],
-        cooking_time=recipe_data["CookingTime"],
-        required_tools=recipe_data["RequiredTools"],
-        ingredients=recipe_data["Ingredients"],
-        steps=recipe_data["Step-by-step directions"],
-        nutrition=recipe_data["nutrition"],
-        status=recipe_data["status"]
-    )
-    logger.debug(f"Recipe created with ID: {recipe_id}")
+    logger.info("Creating recipe with data: %s and ID: %s", recipe_data, recipe_id)
+    row = recipe_row(recipe_data, recipe_id, params)
+    recipe = Recipe(**row)
+    logger.debug("Recipe created with ID: %s", recipe_id)
     db.add(recipe)
-    logger.debug(f"Recipe added to the session")
+    await db.flush()
+    await index_recipes(db, [row])
+    logger.debug("Recipe added to the session")
     await db.commit()
-    logger.debug(f"Recipe saved to the database")
+    await get_recipe_cache().invalidate([row["id"]])
+    logger.debug("Recipe saved to the database")
     await db.refresh(recipe)
-    logger.debug(f"Recipe refreshed")
+    logger.debug("Recipe refreshed")
     return recipe
 
 
+async def save_recipes(db: AsyncSession, rows: List[dict]) -> int:
+    """
+    Insert many recipes in a single multi-row statement and commit them as one transaction
+
+    :param db: AsyncSession: The database session
+    :param rows: List[dict]: Column values built with recipe_row
+    :return: int: The number of inserted recipes
+    """
+    if not rows:
+        return 0
+    await db.execute(insert(Recipe), rows)
+    await index_recipes(db, rows)
+    await db.commit()
+    await get_recipe_cache().invalidate([row["id"] for row in rows])
+    logger.debug("Inserted %s recipes", len(rows))
+    return len(rows)
+
+
+def recipe_row(recipe_data: dict, recipe_id: str, params: RecipeParams | None = None) -> dict:
+    """
+    Map a generated recipe to the column values of the recipes table
+
+    :param recipe_data: dict: The generated recipe
+    :param recipe_id: str: The recipe ID
+    :param params: Recipe: The parameters the recipe was generated with
+    :return: dict: The column values
+    """
+    cuisines = params.cuisineList if params is not None else None
+    row = {
+        "id": UUID(recipe_id),
+        "name": recipe_data["Name"],
+        "cooking_time": recipe_data["CookingTime"],
+        "required_tools": recipe_data["RequiredTools"],
+        "ingredients": recipe_data["Ingredients"],
+        "steps": recipe_data["Step-by-step directions"],
+        "nutrition": recipe_data["nutrition"],
+        "status": recipe_data["status"],
+        "cuisine": cuisines[0] if cuisines else None,
+        "dish_type": params.dishType if params is not None else None,
+        **derived_columns(recipe_data["CookingTime"], recipe_data["nutrition"]),
+    }
+    row.update(materialize_response(row))
+    return row
+
+
+def derived_columns(cooking_time, nutrition) -> dict:
+    """
+    Compute the indexed numeric columns from the cooking time and the nutrition JSON of a recipe
+
+    :param cooking_time: Any: The cooking time, e.g. "45 minutes"
+    :param nutrition: dict: The nutritional values, e.g. {"calories": "450 kcal"}
+    :return: dict: The cooking_minutes and nutrition column values
+    """
+    values = {str(key).lower(): value for key, value in nutrition.items()} if isinstance(nutrition, dict) else {}
+    return {
+        "cooking_minutes": parse_cooking_minutes(cooking_time),
+        **{column: parse_number(values.get(column)) for column in NUTRITION_COLUMNS},
+    }
+
+
+def materialize_response(values: Mapping) -> dict:
+    """
+    Encode the JSON response of a recipe once, to be stored with it and served as is
+
+    :param values: Mapping: The column values of the recipe
+    :return: dict: The response_json and etag column values, the ETag being a hash of the response
+    """
+    response = {field: values.get(field) for field in RECIPE_FIELDS}
+    # SQLite returns whole REAL values as integers from UPDATE ... RETURNING, encode them as they are selected.
+    response.update({column: float(response[column]) for column in NUTRITION_COLUMNS if response[column] is not None})
+    body = orjson.dumps(response)
+    return {"response_json": body, "etag": hashlib.blake2b(body, digest_size=16).hexdigest()}
+
+
+async def index_recipes(db: AsyncSession, rows: List[dict], replace: bool = False):
+    """
+    Write the ingredient terms, allergens and near-duplicate signatures of recipes to the indexes, without committing
+
+    :param db: AsyncSession: The database session
+    :param rows: List[dict]: The recipes, each with its "id", "name" and "ingredients"
+    :param replace: bool: Remove the existing index entries of the recipes first
+    """
+    recipe_ids = [row["id"] for row in rows]
+    if replace:
+        await db.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id.in_(recipe_ids)))
+        await db.execute(delete(RecipeAllergen).where(RecipeAllergen.recipe_id.in_(recipe_ids)))
+    await index_signatures(db, rows, replace)
+
+    term_rows, allergen_rows = [], []
+    for row in rows:
+        index = index_ingredients(row["ingredients"])
+        term_rows.extend({"recipe_id": row["id"], "term": term} for term in index["terms"])
+        allergen_rows.extend({"recipe_id": row["id"], "allergen": allergen} for allergen in index["allergens"])
+    if term_rows:
+        await db.execute(insert(RecipeIngredient.__table__), term_rows)
+    if allergen_rows:
+        await db.execute(insert(RecipeAllergen.__table__), allergen_rows)
+
+
+async def index_signatures(db: AsyncSession, rows: List[dict], replace: bool = False):
+    """
+    Write the MinHash signatures and LSH band buckets of recipes to the near-duplicate index, without committing
+
+    :param db: AsyncSession: The database session
+    :param rows: List[dict]: The recipes, each with its "id", "name" and "ingredients"
+    :param replace: bool: Remove the existing index entries of the recipes first
+    """
+    if replace:
+        recipe_ids = [row["id"] for row in rows]
+        await db.execute(delete(RecipeMinHash).where(RecipeMinHash.recipe_id.in_(recipe_ids)))
+        await db.execute(delete(RecipeLSHBand).where(RecipeLSHBand.recipe_id.in_(recipe_ids)))
+
+    signatures = get_minhasher().signatures([recipe_shingles(row.get("name"), row["ingredients"]) for row in rows])
+    await write_signatures(db, [row["id"] for row in rows], signatures)
+
+
+async def write_signatures(db: AsyncSession, recipe_ids: Sequence[UUID], signatures: np.ndarray):
+    """
+    Insert computed signatures and their LSH band buckets into the near-duplicate index, without committing
+
+    :param db: AsyncSession: The database session
+    :param recipe_ids: Sequence[UUID]: The IDs of the recipes
+    :param signatures: np.ndarray: Their signatures, recipes without shingles are skipped
+    """
+    signature_rows, band_rows = [], []
+    for recipe_id, signature, recipe_buckets in zip(recipe_ids, signatures, band_buckets(signatures)):
+        if is_empty(signature):
+            continue
+        signature_rows.append({"recipe_id": recipe_id, "signature": signature.tobytes()})
+        band_rows.extend({"recipe_id": recipe_id, "band": band, "bucket": int(bucket)}
+                         for band, bucket in enumerate(recipe_buckets))
+    if signature_rows:
+        await db.execute(insert(RecipeMinHash.__table__), signature_rows)
+        await db.execute(insert(RecipeLSHBand.__table__), band_rows)
+
+
+async def find_similar_recipes(db: AsyncSession, name: str | None, ingredients,
+                               threshold: float = DEDUP_THRESHOLD) -> List[Tuple[UUID, float]]:
+    """
+    Find stored recipes that are near-duplicates of a recipe, from the near-duplicate index
+
+    :param db: AsyncSession: The database session
+    :param name: str: The recipe title
+    :param ingredients: Any: The recipe ingredients
+    :param threshold: float: The lowest estimated Jaccard similarity of a near-duplicate
+    :return: List[Tuple[UUID, float]]: The IDs and similarities of the near-duplicates, most similar first
+    """
+    signatures = get_minhasher().signatures([recipe_shingles(name, ingredients)])
+    if is_empty(signatures[0]):
+        return []
+    buckets = band_buckets(signatures)[0]
+    candidates = select(RecipeLSHBand.recipe_id).where(or_(*(
+        and_(RecipeLSHBand.band == band, RecipeLSHBand.bucket == int(bucket)) for band, bucket in enumerate(buckets)
+    ))).distinct()
+    result = await db.execute(select(RecipeMinHash).where(RecipeMinHash.recipe_id.in_(candidates)))
+    stored = result.scalars().all()
+    if not stored:
+        return []
+
+    scores = similarity(signatures[0], np.stack([np.frombuffer(row.signature, dtype=np.uint32) for row in stored]))
+    matches = [(row.recipe_id, float(score)) for row, score in zip(stored, scores) if score >= threshold]
+    return sorted(matches, key=lambda match: -match[1])
+
+
+async def delete_recipes(db: AsyncSession, recipe_ids: Sequence[UUID]) -> int:
+    """
+    Delete recipes and their index entries, without committing
+
+    :param db: AsyncSession: The database session
+    :param recipe_ids: Sequence[UUID]: The IDs of the recipes
+    :return: int: The number of deleted recipes
+    """
+    for model in (RecipeIngredient, RecipeAllergen, RecipeMinHash, RecipeLSHBand):
+        await db.execute(delete(model).where(model.recipe_id.in_(recipe_ids)))
+    result = await db.execute(delete(Recipe).where(Recipe.id.in_(recipe_ids)))
+    return result.rowcount
+
+
+async def update_recipe(db: AsyncSession, recipe_id: UUID, values: dict) -> Tuple[bytes, str] | None:
+    """
+    Change some columns of a recipe with a single UPDATE ... RETURNING, without committing
+
+    The derived columns of changed cooking times and nutrition are set in the same statement. The returned row
+    is encoded and stored as the response of the recipe by store_responses, and the search index is refreshed
+    only when the name or the ingredients changed.
+
+    :param db: AsyncSession: The database session
+    :param recipe_id: UUID: The recipe ID
+    :param values: dict: The columns to change, only those given are written
+    :return: Tuple[bytes, str] | None: The new response and its ETag, None if the recipe does not exist
+    """
+    if not values:
+        return await get_recipe_response(db, recipe_id)
+    if values.get("status") is not None:
+        values = {**values, "status": RecipeStatus[values["status"].name]}
+    derived = derived_columns(values.get("cooking_time"), values.get("nutrition"))
+    if "cooking_time" in values:
+        values = {**values, "cooking_minutes": derived["cooking_minutes"]}
+    if "nutrition" in values:
+        values = {**values, **{column: derived[column] for column in NUTRITION_COLUMNS}}
+
+    result = await db.execute(update(Recipe).where(Recipe.id == recipe_id).values(**values)
+                              .returning(*(getattr(Recipe, field) for field in RECIPE_FIELDS))
+                              .execution_options(synchronize_session=False))
+    row = result.mappings().one_or_none()
+    if row is None:
+        return None
+    stored = await store_responses(db, [row])
+    if "name" in values or "ingredients" in values:
+        await index_recipes(db, [{"id": recipe_id, "name": row["name"], "ingredients": row["ingredients"]}],
+                            replace=True)
+    return stored[recipe_id]
+
+
+async def update_recipes_status(db: AsyncSession, status: RecipeStatus, recipe_ids: Sequence[UUID] | None = None,
+                                filters: RecipeFilters | None = None) -> List[UUID]:
+    """
+    Change the status of many recipes with a single UPDATE ... RETURNING, without committing
+
+    Recipes already in the status are left as they are. The changed rows are returned by the same statement and
+    their responses are encoded and stored again by store_responses.
+
+    :param db: AsyncSession: The database session
+    :param status: RecipeStatus: The new status
+    :param recipe_ids: Sequence[UUID]: The recipes to change, None to use the filters
+    :param filters: RecipeFilters: The recipes to change when no IDs are given
+    :return: List[UUID]: The IDs of the changed recipes
+    """
+    query = update(Recipe).where(Recipe.status != status)
+    if recipe_ids is not None:
+        query = query.where(Recipe.id.in_(recipe_ids))
+    else:
+        query = filter_recipes(query, filters or RecipeFilters())
+    result = await db.execute(query.values(status=status)
+                              .returning(*(getattr(Recipe, field) for field in RECIPE_FIELDS))
+                              .execution_options(synchronize_session=False))
+    return list(await store_responses(db, result.mappings().all()))
+
+
+async def store_responses(db: AsyncSession, rows: Sequence[Mapping], only_missing: bool = False) -> dict:
+    """
+    Encode the responses of recipes and store them with one executemany UPDATE, without committing
+
+    :param db: AsyncSession: The database session
+    :param rows: Sequence[Mapping]: The column values of the recipes, e.g. rows returned by an UPDATE
+    :param only_missing: bool: Write only responses that are still NULL, for storing responses encoded on read
+    :return: dict: The response and ETag of each recipe ID
+    """
+    stored = {}
+    for row in rows:
+        materialized = materialize_response(row)
+        stored[row["id"]] = materialized["response_json"], materialized["etag"]
+    if stored:
+        table = Recipe.__table__
+        query = update(table).where(table.c.id == bindparam("recipe_id"))
+        if only_missing:
+            query = query.where(table.c.response_json.is_(None))
+        await db.execute(query.values(response_json=bindparam("body"), etag=bindparam("body_etag")),
+                         [{"recipe_id": recipe_id, "body": body, "body_etag": etag}
+                          for recipe_id, (body, etag) in stored.items()])
+    return stored
+
+
+async def get_recipe_response(db: AsyncSession, recipe_id: UUID) -> Tuple[bytes, str] | None:
+    """
+    Get the encoded JSON response of a recipe, without loading or decoding its JSON columns
+
+    :param db: AsyncSession: The database session
+    :param recipe_id: UUID: The recipe ID
+    :return: Tuple[bytes, str] | None: The response and its ETag, None if the recipe does not exist
+    """
+    result = await db.execute(select(Recipe.response_json, Recipe.etag).where(Recipe.id == recipe_id))
+    row = result.one_or_none()
+    if row is None:
+        return None
+    if row.response_json is None:
+        return (await _materialize_missing(db, [recipe_id]))[recipe_id]
+    return row.response_json, row.etag
+
+
+async def recipe_responses(db: AsyncSession, recipes: Sequence[Recipe]) -> List[Tuple[bytes, str]]:
+    """
+    Get the encoded JSON responses of recipes loaded with only MATERIALIZED_FIELDS
+
+    :param db: AsyncSession: The database session
+    :param recipes: Sequence[Recipe]: The recipes
+    :return: List[Tuple[bytes, str]]: The response and ETag of each recipe
+    """
+    missing = [recipe.id for recipe in recipes if recipe.response_json is None]
+    encoded = await _materialize_missing(db, missing) if missing else {}
+    return [encoded.get(recipe.id) or (recipe.response_json, recipe.etag) for recipe in recipes]
+
+
+async def _materialize_missing(db: AsyncSession, recipe_ids: Sequence[UUID]) -> dict:
+    # Responses dropped by e.g. the dedup freeze are encoded once and written back, unless a change stored one
+    # meanwhile. Only read sessions get here, so committing does not publish anything else.
+    result = await db.execute(select(*(getattr(Recipe, field) for field in RECIPE_FIELDS))
+                              .where(Recipe.id.in_(recipe_ids)))
+    rows = result.mappings().all()
+    try:
+        encoded = await store_responses(db, rows, only_missing=True)
+        await db.commit()
+    except Exception as e:
+        logger.warning("Could not store the responses of %s recipes: %s", len(rows), e)
+        await db.rollback()
+        encoded = {}
+        for row in rows:
+            materialized = materialize_response(row)
+            encoded[row["id"]] = materialized["response_json"], materialized["etag"]
+    return encoded
+
+
 async def get_all_recipes(db: AsyncSession):
     """
     Get all recipes from the database
@@ -47,15 +386,204 @@ async def get_all_recipes(db: AsyncSession):
     return result.scalars().all()
 
 
-async def get_recipe_by_id(db: AsyncSession, recipe_id: UUID):
+def filter_recipes(query: Select | Update, filters: RecipeFilters) -> Select | Update:
+    """
+    Apply the listing filters to a recipe query
+
+    :param query: Select | Update: The query selecting or updating recipes
+    :param filters: RecipeFilters: The filters
+    :return: Select | Update: The filtered query
+    """
+    if filters.status is not None:
+        query = query.where(Recipe.status == RecipeStatus[filters.status.value])
+    if filters.cuisine is not None:
+        query = query.where(Recipe.cuisine == filters.cuisine)
+    if filters.dish_type is not None:
+        query = query.where(Recipe.dish_type == filters.dish_type)
+    if filters.max_cooking_time is not None:
+        query = query.where(Recipe.cooking_minutes <= filters.max_cooking_time)
+    return query
+
+
+def parse_recipe_fields(fields: str | None) -> tuple[str, ...] | None:
+    """
+    Parse a comma-separated list of recipe columns, or "summary" for RECIPE_SUMMARY_FIELDS
+
+    :param fields: str: The requested fields, None for all of them
+    :return: tuple[str, ...] | None: The column names, always including the ID, or None for all columns
+    """
+    if fields is None:
+        return None
+    if fields == "summary":
+        return RECIPE_SUMMARY_FIELDS
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in RECIPE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown fields: {unknown}. Must be among: {list(RECIPE_FIELDS)}")
+    return ("id", *[name for name in dict.fromkeys(names) if name != "id"])
+
+
+def select_recipes(fields: Sequence[str] | None = None) -> Select:
+    """
+    Select recipes, loading only the given columns
+
+    Columns that are not requested are deferred and raise on access instead of being loaded,
+    so their JSON is never fetched or decoded.
+
+    :param fields: Sequence[str]: The column names, None for all columns
+    :return: Select: The query
+    """
+    query = select(Recipe)
+    if fields is not None:
+        query = query.options(load_only(*(getattr(Recipe, name) for name in fields), raiseload=True))
+    return query
+
+
+def recipes_after(filters: RecipeFilters, after: UUID | None = None, fields: Sequence[str] | None = None) -> Select:
+    """
+    Build the keyset query for recipes ordered by ID, starting after the given ID
+
+    :param filters: RecipeFilters: The filters
+    :param after: UUID: The ID of the last recipe of the previous page
+    :param fields: Sequence[str]: The columns to load, None for all columns
+    :return: Select: The query
+    """
+    query = filter_recipes(select_recipes(fields), filters).order_by(Recipe.id)
+    if after is not None:
+        query = query.where(Recipe.id > after)
+    return query
+
+
+async def get_recipes_page(db: AsyncSession, filters: RecipeFilters, limit: int, after: UUID | None = None,
+                           fields: Sequence[str] | None = None) -> tuple[List[Recipe], UUID | None]:
+    """
+    Get one page of recipes using keyset pagination
+
+    :param db: AsyncSession: The database session
+    :param filters: RecipeFilters: The filters
+    :param limit: int: The page size
+    :param after: UUID: The ID of the last recipe of the previous page
+    :param fields: Sequence[str]: The columns to load, None for all columns
+    :return: tuple: The recipes of the page and the cursor of the next page, None on the last page
+    """
+    return await _get_page(db, recipes_after(filters, after, fields), limit)
+
+
+async def search_recipes(db: AsyncSession, search: RecipeSearch, filters: RecipeFilters, limit: int,
+                         after: UUID | None = None,
+                         fields: Sequence[str] | None = None) -> tuple[List[Recipe], UUID | None]:
+    """
+    Get one page of recipes matching an ingredient, allergen and nutrition search, answered from the indexes
+
+    :param db: AsyncSession: The database session
+    :param search: RecipeSearch: The search
+    :param filters: RecipeFilters: The listing filters
+    :param limit: int: The page size
+    :param after: UUID: The ID of the last recipe of the previous page
+    :param fields: Sequence[str]: The columns to load, None for all columns
+    :return: tuple: The recipes of the page and the cursor of the next page, None on the last page
+    """
+    query = recipes_after(filters, after, fields)
+    for term in search_terms(search.ingredients or []):
+        query = query.where(exists().where(RecipeIngredient.recipe_id == Recipe.id, RecipeIngredient.term == term))
+    if search.exclude_allergens:
+        query = query.where(~exists().where(RecipeAllergen.recipe_id == Recipe.id,
+                                            RecipeAllergen.allergen.in_(search.exclude_allergens)))
+    if search.max_calories is not None:
+        query = query.where(Recipe.calories <= search.max_calories)
+    if search.min_protein is not None:
+        query = query.where(Recipe.protein >= search.min_protein)
+    if search.max_fat is not None:
+        query = query.where(Recipe.fat <= search.max_fat)
+    if search.max_carbohydrates is not None:
+        query = query.where(Recipe.carbohydrates <= search.max_carbohydrates)
+    return await _get_page(db, query, limit)
+
+
+async def _get_page(db: AsyncSession, query: Select, limit: int) -> tuple[List[Recipe], UUID | None]:
+    result = await db.execute(query.limit(limit + 1))
+    recipes = list(result.scalars().all())
+    if len(recipes) > limit:
+        recipes = recipes[:limit]
+        return recipes, recipes[-1].id
+    return recipes, None
+
+
+async def stream_recipes(db: AsyncSession, filters: RecipeFilters, after: UUID | None = None,
+                         fields: Sequence[str] | None = None,
+                         batch_size: int = RECIPES_STREAM_BATCH_SIZE) -> AsyncIterator[Recipe]:
+    """
+    Stream recipes from a server-side cursor, fetching `batch_size` rows at a time
+
+    :param db: AsyncSession: The database session
+    :param filters: RecipeFilters: The filters
+    :param after: UUID: Only stream recipes after this ID
+    :param fields: Sequence[str]: The columns to load, None for all columns
+    :param batch_size: int: Number of rows fetched per round trip
+    :return: AsyncIterator[Recipe]: The recipes
+    """
+    query = recipes_after(filters, after, fields).execution_options(yield_per=batch_size)
+    recipes = await db.stream_scalars(query)
+    async for recipe in recipes:
+        yield recipe
+        db.expunge(recipe)
+
+
+async def stream_recipe_rows(db: AsyncSession, filters: RecipeFilters, columns: Sequence[str],
+                             batch_size: int = RECIPES_STREAM_BATCH_SIZE) -> AsyncIterator[dict]:
+    """
+    Stream the column values of recipes ordered by ID from a server-side cursor, without building ORM objects
+
+    :param db: AsyncSession: The database session
+    :param filters: RecipeFilters: The filters
+    :param columns: Sequence[str]: The column names
+    :param batch_size: int: Number of rows fetched per round trip
+    :return: AsyncIterator[dict]: The column values of each recipe
+    """
+    query = filter_recipes(select(*(getattr(Recipe, name) for name in columns)), filters).order_by(Recipe.id)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for row in result.mappings():
+        yield row
+
+
+async def upsert_recipes(db: AsyncSession, rows: List[dict], update: bool = True) -> List[UUID]:
+    """
+    Insert recipes in a single multi-row statement, updating or skipping the ones whose ID exists, without committing
+
+    :param db: AsyncSession: The database session
+    :param rows: List[dict]: Column values, all rows with the same columns
+    :param update: bool: Overwrite existing recipes, otherwise leave them unchanged
+    :return: List[UUID]: The IDs of the inserted or updated recipes
+    """
+    if not rows:
+        return []
+    table = Recipe.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table)
+    if update:
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={column: statement.excluded[column] for column in rows[0] if column != "id"},
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=[table.c.id])
+    # Executed with a list of rows, the statement is compiled once and sent as multi-row VALUES batches.
+    result = await db.execute(statement.returning(table.c.id), rows)
+    return list(result.scalars())
+
+
+async def get_recipe_by_id(db: AsyncSession, recipe_id: UUID, fields: Sequence[str] | None = None):
     """
     Get a recipe by its ID
 
     :param db: AsyncSession: The database session
     :param recipe_id: int: The recipe ID
+    :param fields: Sequence[str]: The columns to load, None for all columns
     :return: Recipe: The recipe
     """
-    query = select(Recipe).where(Recipe.id == recipe_id)
+    query = select_recipes(fields).where(Recipe.id == recipe_id)
     result = await db.execute(query)
     recipe = result.scalar_one_or_none()
 
@@ -63,3 +591,68 @@ async def get_recipe_by_id(db: AsyncSession, recipe_id: UUID):
         raise HTTPException(status_code=404, detail="Recipe not found")
 
     return recipe
+
+
+async def add_inventory_recipes(db: AsyncSession, rows: List[dict]) -> int:
+    """
+    Add pre-generated recipes to the inventory and commit
+
+    :param db: AsyncSession: The database session
+    :param rows: List[dict]: The InventoryRecipe column values
+    :return: int: The number of recipes added
+    """
+    if not rows:
+        return 0
+    await db.execute(insert(InventoryRecipe), rows)
+    await db.commit()
+    return len(rows)
+
+
+async def inventory_stock(db: AsyncSession, buckets: Sequence[str] | None = None) -> dict:
+    """
+    Count the inventory recipes per bucket
+
+    :param db: AsyncSession: The database session
+    :param buckets: Sequence[str]: The buckets to count, None for all
+    :return: dict: The number of recipes by bucket, buckets without recipes are left out
+    """
+    query = select(InventoryRecipe.bucket, func.count()).group_by(InventoryRecipe.bucket)
+    if buckets is not None:
+        query = query.where(InventoryRecipe.bucket.in_(buckets))
+    result = await db.execute(query)
+    return dict(result.all())
+
+
+async def find_inventory_recipes(db: AsyncSession, params: RecipeParams, limit: int) -> List[InventoryRecipe]:
+    """
+    Get the oldest inventory recipes matching the dish type, cuisines, persons and cooking time of a request.
+    Allergies and diets are checked by the caller
+
+    :param db: AsyncSession: The database session
+    :param params: Recipe: The requested parameters, None for any value
+    :param limit: int: The maximum number of recipes
+    :return: List[InventoryRecipe]: The candidate recipes
+    """
+    query = select(InventoryRecipe).order_by(InventoryRecipe.created_at).limit(limit)
+    if params.dishType is not None:
+        query = query.where(InventoryRecipe.dish_type == params.dishType)
+    if params.cuisineList:
+        query = query.where(InventoryRecipe.cuisine.in_(params.cuisineList))
+    if params.amountOfPersons is not None:
+        query = query.where(InventoryRecipe.amount_of_persons == params.amountOfPersons)
+    if params.maxCooking is not None:
+        query = query.where(InventoryRecipe.cooking_minutes <= params.maxCooking)
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def claim_inventory_recipe(db: AsyncSession, item_id: UUID) -> bool:
+    """
+    Remove a recipe from the inventory, without committing. Only one of concurrent claims succeeds
+
+    :param db: AsyncSession: The database session
+    :param item_id: UUID: The ID of the inventory recipe
+    :return: bool: True if this session claimed the recipe
+    """
+    result = await db.execute(delete(InventoryRecipe).where(InventoryRecipe.id == item_id))
+    return result.rowcount == 1
@@ -1,9 +1,91 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 
-DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+from app.core.metrics import instrument_engine
+from app.config import (
+    DATABASE_URL,
+    DB_ECHO,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    SQLITE_BUSY_TIMEOUT,
+)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str | URL) -> URL:
+    """
+    Use the async driver for URLs given without one, e.g. sqlite:///./test.db or postgresql://...
+
+    :param url: str | URL: The database URL.
+    :return: URL: The URL with an async driver.
+    """
+    url = make_url(url)
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url
+
+
+def build_engine(url: str | URL = DATABASE_URL, echo: bool = DB_ECHO, pool_size: int = DB_POOL_SIZE,
+                 max_overflow: int = DB_MAX_OVERFLOW, pool_timeout: float = DB_POOL_TIMEOUT,
+                 pool_recycle: int = DB_POOL_RECYCLE, pool_pre_ping: bool = DB_POOL_PRE_PING) -> AsyncEngine:
+    """
+    Create the async engine for the configured database.
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+    Server databases (Postgres via asyncpg) get a sized, pre-pinged and recycled connection pool.
+    File-based SQLite gets a connection pool too, plus WAL journaling and a busy timeout
+    so concurrent readers and a writer don't fail with "database is locked".
+
+    :param url: str | URL: The database URL.
+    :param echo: bool: Log every SQL statement.
+    :param pool_size: int: Number of connections kept in the pool.
+    :param max_overflow: int: Connections allowed above pool_size under load.
+    :param pool_timeout: float: Seconds to wait for a free connection.
+    :param pool_recycle: int: Seconds after which a connection is replaced.
+    :param pool_pre_ping: bool: Check server connections for liveness on checkout.
+    :return: AsyncEngine: The engine.
+    """
+    url = async_database_url(url)
+    options = {"echo": echo}
+
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"timeout": SQLITE_BUSY_TIMEOUT}
+        if url.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool
+        else:
+            options.update(poolclass=AsyncAdaptedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                           pool_timeout=pool_timeout)
+    else:
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout,
+                       pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping)
+
+    engine = create_async_engine(url, **options)
+    if url.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine)
+    return engine
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+engine = build_engine()
 Base = declarative_base()
 
 AsyncSessionLocal = async_sessionmaker(
@@ -18,12 +100,8 @@ async def get_db():
 
     :return: AsyncSession: The database session
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
     db = AsyncSessionLocal()
     try:
         yield db
     finally:
         await db.close()
-
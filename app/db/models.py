@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, JSON, Enum
+from sqlalchemy import Column, String, Integer, BigInteger, Float, JSON, Enum, ForeignKey, DateTime, LargeBinary, func
 from sqlalchemy.dialects.postgresql import UUID
 import enum
 import uuid
@@ -19,5 +19,79 @@ class Recipe(Base):
     ingredients = Column(JSON, nullable=False)
     steps = Column(JSON, nullable=True)
     nutrition = Column(JSON, nullable=True)
-    status = Column(Enum(RecipeStatus), default=RecipeStatus.ACTIVE, nullable=False)
+    status = Column(Enum(RecipeStatus), default=RecipeStatus.ACTIVE, nullable=False, index=True)
+    cuisine = Column(String(50), nullable=True, index=True)
+    dish_type = Column(String(50), nullable=True, index=True)
+    cooking_minutes = Column(Integer, nullable=True, index=True)
+    calories = Column(Float, nullable=True, index=True)
+    protein = Column(Float, nullable=True, index=True)
+    fat = Column(Float, nullable=True, index=True)
+    carbohydrates = Column(Float, nullable=True, index=True)
+    # The encoded JSON response of the recipe and its ETag, rewritten whenever the recipe changes.
+    # NULL when a bulk update changed the recipe, the response is then encoded on read.
+    response_json = Column(LargeBinary, nullable=True)
+    etag = Column(String(32), nullable=True)
 
+
+class RecipeIngredient(Base):
+    """
+    Search index entry: a recipe contains an ingredient with this (singular, lowercase) term in its name.
+    """
+    __tablename__ = "recipe_ingredients"
+
+    recipe_id = Column(UUID(as_uuid=True), ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(String(100), primary_key=True, index=True)
+
+
+class RecipeAllergen(Base):
+    """
+    Search index entry: a recipe contains an ingredient with this allergen.
+    """
+    __tablename__ = "recipe_allergens"
+
+    recipe_id = Column(UUID(as_uuid=True), ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    allergen = Column(String(50), primary_key=True, index=True)
+
+
+class RecipeMinHash(Base):
+    """
+    Near-duplicate index entry: the MinHash signature of the ingredients and title of a recipe.
+    """
+    __tablename__ = "recipe_minhashes"
+
+    recipe_id = Column(UUID(as_uuid=True), ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+
+
+class RecipeLSHBand(Base):
+    """
+    Near-duplicate index entry: the bucket of one band of a recipe signature.
+    Recipes sharing a bucket in any band are compared by their signatures.
+    """
+    __tablename__ = "recipe_lsh_bands"
+
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    recipe_id = Column(UUID(as_uuid=True), ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True,
+                       index=True)
+
+
+class InventoryRecipe(Base):
+    """
+    A validated recipe generated ahead of the requests for it, waiting in the warm pool of its bucket.
+    The columns are what a request is matched on: the parameters it was generated with, the allergens
+    its ingredients contain and the diets they allow.
+    """
+    __tablename__ = "recipe_inventory"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    bucket = Column(String(100), nullable=False, index=True)
+    dish_type = Column(String(50), nullable=True, index=True)
+    cuisine = Column(String(50), nullable=True, index=True)
+    amount_of_persons = Column(Integer, nullable=True)
+    cooking_minutes = Column(Integer, nullable=True)
+    allergens = Column(JSON, nullable=False)
+    diets = Column(JSON, nullable=False)
+    params = Column(JSON, nullable=False)
+    recipe = Column(JSON, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
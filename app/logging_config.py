@@ -1,20 +1,180 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Mapping
 
-os.makedirs("logs", exist_ok=True)
+from app.config import LOGGING_LEVEL, LOG_FORMAT, LOG_FILE, LOG_QUEUE_SIZE, LOG_MAX_ARG_CHARS, LOG_SAMPLE_RATES
 
-file_handler = RotatingFileHandler("logs/app.log", maxBytes=10**6, backupCount=5)
-file_handler.setLevel(logging.INFO)
+# Attributes every record has; the others were passed with `extra` and go into the JSON records.
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
 
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-file_handler.setFormatter(formatter)
 
-logger = logging.getLogger("app_logger")
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
+def truncate(value: Any, limit: int = LOG_MAX_ARG_CHARS) -> str:
+    """
+    :param value: Any: The value to log.
+    :param limit: int: Maximum number of characters, 0 for no limit.
+    :return: str: The value as text, cut after `limit` characters.
+    """
+    text = value if isinstance(value, str) else str(value)
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... ({len(text) - limit} more characters)"
+    return text
+
+
+def _cut(arg: Any, limit: int) -> Any:
+    if not limit or isinstance(arg, (int, float)):
+        return arg
+    text = str(arg)
+    return arg if len(text) <= limit else truncate(text, limit)
+
+
+def render_message(record: logging.LogRecord, limit: int = LOG_MAX_ARG_CHARS) -> str:
+    """
+    Format the message of a record, cutting arguments longer than `limit` characters, e.g. whole recipes.
+
+    :param record: logging.LogRecord: The record.
+    :param limit: int: Maximum number of characters per argument, 0 for no limit.
+    :return: str: The message.
+    """
+    message = str(record.msg)
+    args = record.args
+    if not args:
+        return message
+    # A single dict argument is stored on its own, it only fills "%(key)s" placeholders when there are any.
+    if isinstance(args, Mapping) and "%(" not in message:
+        args = (args,)
+    if isinstance(args, tuple):
+        args = tuple(_cut(arg, limit) for arg in args)
+    else:
+        args = {key: _cut(value, limit) for key, value in args.items()}
+    try:
+        return message % args
+    except (TypeError, ValueError):
+        return f"{message} {args}"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record with the time, level, logger, message, the `extra` fields and the traceback.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": render_message(record),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = truncate(value) if isinstance(value, str) else value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=truncate)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    The classic "time - logger - level - message" lines, with long arguments cut like in the JSON records.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.message = render_message(record)
+        record.asctime = self.formatTime(record, self.datefmt)
+        text = self.formatMessage(record)
+        if record.exc_info:
+            text = f"{text}\n{self.formatException(record.exc_info)}"
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a share of the records of chatty messages: `rates` maps message templates to the share kept, and a
+    single call can pass its own with `extra={"sample_rate": 0.1}`.
+    """
+
+    def __init__(self, rates: Dict[str, float] | None = None):
+        super().__init__()
+        self.rates = rates or {}
+        self._random = random.Random()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is None:
+            rate = self.rates.get(record.msg)
+        return rate is None or self._random.random() < rate
 
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue as they are, so their messages and arguments are only formatted by the
+    listener thread that writes them. Arguments must therefore not be changed after the logging call.
+    When the queue is full, records are dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogListener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def _build_handlers() -> list:
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else TextFormatter()
+    os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10**6, backupCount=5)
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+    return [file_handler, console_handler]
+
+
+def _start_listener():
+    """
+    Give the queue handler a fresh queue and a listener thread writing it to the file and the console.
+    Forked processes, e.g. Celery workers, inherit neither the thread nor a usable queue and call it again.
+    """
+    global listener
+    queue_handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    listener = LogListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+
+def stop_logging():
+    """
+    Write the queued records and stop the listener thread.
+    """
+    if listener._thread is not None:
+        listener.stop()
+
+
+handlers = _build_handlers()
+queue_handler = LazyQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATES))
+listener: LogListener
+_start_listener()
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_start_listener)
+
+logger = logging.getLogger("app_logger")
+logger.setLevel(LOGGING_LEVEL)
+logger.addHandler(queue_handler)
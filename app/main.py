@@ -1,10 +1,16 @@
 from fastapi import FastAPI
 from app.api.routes.recipe_routes import router as recipe_router
+from app.api.routes.metrics_routes import router as metrics_router
+from app.core.recipe_cache import close_recipe_cache
+from app.core.task_events import close_task_event_hub
 from app.db import init_db
 app = FastAPI()
 
 app.add_event_handler("startup", init_db)
+app.add_event_handler("shutdown", close_task_event_hub)
+app.add_event_handler("shutdown", close_recipe_cache)
 app.include_router(recipe_router)
+app.include_router(metrics_router)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from typing import List, Dict, Any
 from enum import Enum
 from uuid import UUID
@@ -23,14 +23,20 @@ class RecipeResponse(BaseModel):
     steps: List[str]
     nutrition: Dict[str, Any]
     status: RecipeStatus = RecipeStatus.ACTIVE
+    cuisine: str | None = None
+    dish_type: str | None = None
+    cooking_minutes: int | None = None
+    calories: float | None = None
+    protein: float | None = None
+    fat: float | None = None
+    carbohydrates: float | None = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class RecipeEdit(BaseModel):
     """
     Schema for editing a recipe.
-    Fields are optional to allow partial updates.
+    Fields are optional to allow partial updates, but cannot be set to null as every recipe response requires them.
     """
     name: str | None = None
     cooking_time: str | None = None
@@ -40,6 +46,13 @@ class RecipeEdit(BaseModel):
     nutrition: Dict[str, Any] | None = None
     status: RecipeStatus | None = None
 
+    @field_validator("*")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("cannot be null")
+        return value
+
 class RecipeChunkParams(BaseModel):
     """
     Schema for chunk generation parameters, including randomization options.
@@ -47,3 +60,61 @@ class RecipeChunkParams(BaseModel):
     params: Recipe
     randomization_type: str | None = None
     weights: Dict[str, float] | None = None
+    seed: int | None = Field(default=None, ge=0, description="Seed of the parameter draws")
+
+class RecipeFilters(BaseModel):
+    """
+    Schema for filtering recipe listings.
+    All filters are optional and combined with AND.
+    """
+    status: RecipeStatus | None = None
+    cuisine: str | None = None
+    dish_type: str | None = None
+    max_cooking_time: int | None = Field(default=None, ge=0, description="Maximum cooking time in minutes")
+
+class RecipeStatusUpdate(BaseModel):
+    """
+    Schema for changing the status of many recipes at once.
+    The recipes are selected either by their IDs or by listing filters, given at least one ID or one filter.
+    """
+    status: RecipeStatus
+    ids: List[UUID] | None = None
+    filters: RecipeFilters | None = None
+
+    @model_validator(mode="after")
+    def one_selection(self):
+        if (self.ids is None) == (self.filters is None):
+            raise ValueError("Give either 'ids' or 'filters'.")
+        if not (self.ids if self.ids is not None else self.filters.model_dump(exclude_none=True)):
+            raise ValueError("Give at least one ID or one filter.")
+        return self
+
+class RecipeSearch(BaseModel):
+    """
+    Schema for searching recipes by ingredients, allergens and nutritional values.
+    """
+    ingredients: List[str] | None = None
+    exclude_allergens: List[str] | None = None
+    max_calories: float | None = None
+    min_protein: float | None = None
+    max_fat: float | None = None
+    max_carbohydrates: float | None = None
+
+class PrevalidationIssue(BaseModel):
+    """
+    A rule a generated recipe breaks.
+    """
+    rule: str
+    detail: str
+    ingredient: str | None = None
+
+class PrevalidationResult(BaseModel):
+    """
+    Outcome of the rule-based checks that run before the LLM validator.
+    """
+    passed: bool
+    issues: List[PrevalidationIssue] = []
+
+    @property
+    def reason(self) -> str:
+        return "; ".join(f"{issue.rule}: {issue.detail}" for issue in self.issues)
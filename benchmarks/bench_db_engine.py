@@ -0,0 +1,119 @@
+"""
+Requests per second of the read endpoints with the legacy database setup vs the configured engine profile.
+
+The legacy setup is what app/db/database.py used to do: a NullPool aiosqlite engine with echo=True
+and Base.metadata.create_all on every request.
+
+Usage:
+    python -m benchmarks.bench_db_engine --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import time
+from uuid import uuid4
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.crud import recipe_row, save_recipes
+from app.db.database import Base, build_engine, get_db
+from app.main import app
+from benchmarks.results import write_results
+
+
+def sample_recipe(number: int) -> dict:
+    return {
+        "Name": f"Benchmark recipe {number}",
+        "CookingTime": "30 minutes",
+        "RequiredTools": ["pan", "knife"],
+        "Ingredients": [{"Name": "rice", "grams": 200}, {"Name": "chickpeas", "grams": 150}],
+        "Step-by-step directions": ["Cook the rice.", "Add the chickpeas."],
+        "nutrition": {"calories": 650, "protein": 20, "fat": 8, "carbohydrates": 120, "totalWeight": 350},
+        "status": "ACTIVE",
+    }
+
+
+def session_dependency(engine, create_schema_per_request: bool):
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def dependency():
+        if create_schema_per_request:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    return dependency
+
+
+async def seed(url: str, rows: int):
+    engine = build_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(bind=engine)() as session:
+        await save_recipes(session, [recipe_row(sample_recipe(i), str(uuid4())) for i in range(rows)])
+    await engine.dispose()
+
+
+async def measure(path: str, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def call():
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+async def run(requests: int, concurrency: int, rows: int, path: str) -> dict:
+    url = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+    await seed(url, rows)
+    results = {}
+    profiles = {
+        "legacy": (lambda: create_async_engine(url, echo=True), True),
+        "configured": (lambda: build_engine(url), False),
+    }
+    for name, (make_engine, create_schema_per_request) in profiles.items():
+        engine = make_engine()
+        app.dependency_overrides[get_db] = session_dependency(engine, create_schema_per_request)
+        try:
+            await measure(path, min(requests, 100), concurrency)
+            results[name] = await measure(path, requests, concurrency)
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+    results["speedup"] = results["configured"] / results["legacy"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=20, help="Recipes in the benchmark table.")
+    parser.add_argument("--path", default="/recipes", help="Endpoint to request.")
+    parser.add_argument("--output", help="Results file to add the results to.")
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = asyncio.run(run(args.requests, args.concurrency, args.rows, args.path))
+    results = {name: round(value, 2) for name, value in results.items()}
+    if args.output:
+        write_results(args.output, "db_engine", results,
+                      {name: value for name, value in vars(args).items() if name != "output"})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Open-loop load on the API: `POST /generate_recipe`, `GET /recipe/{id}` and `GET /recipes` requested at a fixed
+rate, with the throughput, errors and p50/p95/p99 latency of each endpoint.
+
+Requests start every 1/`--rate` seconds whether or not earlier ones have finished, and their latency is counted
+from the time they were due, so a slow server shows up as latency instead of a lower request rate. `--mix` sets
+the share of each endpoint. `GET /recipe/{id}` asks for a random recipe of the seeded and generated ones.
+
+By default the app runs in this process with a fresh SQLite database of `--rows` recipes, and generation tasks
+run on the same event loop instead of a Celery worker, against a fake LLM (see benchmarks.fake_openai). The
+generation time and outcome of the tasks are reported too. With `--url`, an API started separately is loaded
+instead, e.g. with its worker pointed at `python -m benchmarks.fake_openai`.
+
+Usage:
+    python -m benchmarks.bench_load --rate 50 --duration 20 --latency 0.2 --output results.json
+    python -m benchmarks.bench_load --url http://127.0.0.1:8000 --rate 50 --duration 20
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+from uuid import uuid4
+
+import httpx
+
+from benchmarks.fake_openai import NUTRITION, RECIPE, fake_openai_server
+from benchmarks.results import percentiles, write_results
+
+ENDPOINTS = ("generate", "get", "list")
+# Parameters the recipe of the fake LLM satisfies, so it passes the pre-validation.
+GENERATE_PARAMS = {"amountOfPersons": 4, "dishType": "main", "maxCooking": 60, "allergiesList": [],
+                   "dietRequirements": [], "cuisineList": ["Italian"]}
+
+
+class InProcessTasks:
+    """
+    Stands in for generate_recipe_task and AsyncResult in the routes: tasks run on the event loop of the app,
+    and their states are kept in memory.
+    """
+
+    def __init__(self):
+        self.states: Dict[str, str] = {}
+        self.durations: List[float] = []
+        self.running = set()
+
+    def apply_async(self, args: list, kwargs: dict | None = None, task_id: str | None = None):
+        params, recipe_id = args
+        self.states[recipe_id] = "STARTED"
+        task = asyncio.get_running_loop().create_task(self._run(params, recipe_id, kwargs or {}))
+        self.running.add(task)
+        task.add_done_callback(self.running.discard)
+        return SimpleNamespace(id=task_id)
+
+    async def _run(self, params: dict, recipe_id: str, kwargs: dict):
+        from app.core.create_recipes import async_generate_recipe_task
+
+        started = time.perf_counter()
+        result = await async_generate_recipe_task(self, params, recipe_id, **kwargs)
+        if self.states[recipe_id] != "FAILURE" and not (isinstance(result, dict) and result.get("status") == "error"):
+            self.states[recipe_id] = "SUCCESS"
+            self.durations.append(time.perf_counter() - started)
+
+    def update_state(self, task_id: str, state: str, meta=None):
+        self.states[task_id] = state
+
+    def result(self, id: str, app=None):
+        return SimpleNamespace(state=self.states.get(id, "PENDING"), info=None)
+
+
+async def drive(client: httpx.AsyncClient, rate: float, duration: float, mix: Dict[str, float], ids: List[str],
+                seed: int) -> dict:
+    """
+    Send requests at `rate` per second for `duration` seconds and wait for all of them.
+
+    :return: dict: Per endpoint, the latencies in seconds of the successful requests and the number of errors.
+    """
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    stats = {endpoint: {"latencies": [], "errors": 0} for endpoint in mix}
+
+    async def call(endpoint: str, due: float):
+        try:
+            if endpoint == "generate":
+                response = await client.post("/generate_recipe", json=GENERATE_PARAMS)
+                if response.status_code == 200:
+                    ids.append(response.json()["recipe_id"])
+            elif endpoint == "get":
+                response = await client.get(f"/recipe/{rng.choice(ids)}")
+            else:
+                response = await client.get("/recipes", params={"limit": 20})
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if failed:
+            stats[endpoint]["errors"] += 1
+        else:
+            stats[endpoint]["latencies"].append(loop.time() - due)
+
+    endpoints, weights = list(mix), list(mix.values())
+    started = loop.time()
+    requests = []
+    for number in range(int(rate * duration)):
+        due = started + number / rate
+        if due > loop.time():
+            await asyncio.sleep(due - loop.time())
+        requests.append(asyncio.create_task(call(rng.choices(endpoints, weights)[0], due)))
+    await asyncio.gather(*requests)
+    stats["elapsed"] = loop.time() - started
+    return stats
+
+
+def summarize(stats: dict) -> dict:
+    elapsed = stats.pop("elapsed")
+    results = {}
+    for endpoint, values in stats.items():
+        latencies = values["latencies"]
+        results[endpoint] = {
+            "requests": len(latencies) + values["errors"],
+            "errors": values["errors"],
+            "throughput": len(latencies) / elapsed,
+            **{f"{name}_ms": value * 1000 for name, value in percentiles(latencies).items()},
+        }
+    results["total"] = {"throughput": sum(result["throughput"] for result in results.values()),
+                        "elapsed": elapsed}
+    return results
+
+
+async def existing_ids(client: httpx.AsyncClient) -> List[str]:
+    response = await client.get("/recipes", params={"limit": 100, "fields": "id"})
+    response.raise_for_status()
+    return [recipe["id"] for recipe in response.json()]
+
+
+async def run_remote(url: str, rate: float, duration: float, mix: Dict[str, float], seed: int) -> dict:
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        ids = await existing_ids(client)
+        if not ids and "get" in mix:
+            raise SystemExit("GET /recipe/{id} needs at least one recipe in the database")
+        return summarize(await drive(client, rate, duration, mix, ids, seed))
+
+
+async def run_in_process(rate: float, duration: float, mix: Dict[str, float], rows: int, seed: int,
+                         drain_timeout: float) -> dict:
+    from app.api.routes import recipe_routes
+    from app.core import create_recipes
+    from app.core.llm import close_llm_client
+    from app.db import init_db
+    from app.db.crud import recipe_row, save_recipes
+    from app.db.database import AsyncSessionLocal, engine
+    from app.main import app
+
+    async def no_event(*args, **kwargs):
+        pass
+
+    tasks = InProcessTasks()
+    recipe_routes.generate_recipe_task = tasks
+    recipe_routes.AsyncResult = tasks.result
+    # There is no Redis to publish task events to.
+    create_recipes.publish_task_event = no_event
+
+    await init_db()
+    recipe = {**RECIPE, "nutrition": NUTRITION, "status": "ACTIVE"}
+    ids = [str(uuid4()) for _ in range(rows)]
+    async with AsyncSessionLocal() as db:
+        await save_recipes(db, [recipe_row({**recipe, "Name": f"Recipe {number}"}, recipe_id)
+                                for number, recipe_id in enumerate(ids)])
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        results = summarize(await drive(client, rate, duration, mix, ids, seed))
+
+    if tasks.running:
+        await asyncio.wait(tasks.running, timeout=drain_timeout)
+    states = list(tasks.states.values())
+    results["generation"] = {
+        "succeeded": states.count("SUCCESS"),
+        "failed": states.count("FAILURE"),
+        "unfinished": states.count("STARTED"),
+        **{f"{name}_s": value for name, value in percentiles(tasks.durations).items()},
+    }
+    for task in tasks.running:
+        task.cancel()
+    await close_llm_client()
+    await engine.dispose()
+    return results
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        endpoint, _, share = part.partition("=")
+        if endpoint not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {endpoint!r}, must be one of {ENDPOINTS}")
+        mix[endpoint] = float(share)
+    return {endpoint: share for endpoint, share in mix.items() if share > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=50, help="Requests per second.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load.")
+    parser.add_argument("--mix", type=parse_mix, default="generate=1,get=5,list=4",
+                        help="Relative share of each endpoint.")
+    parser.add_argument("--url", help="Base URL of a running API, instead of the app in this process.")
+    parser.add_argument("--rows", type=int, default=200, help="Recipes seeded into the in-process database.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per fake LLM request.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of fake LLM requests failing.")
+    parser.add_argument("--reject-rate", type=float, default=0.2, help="Share of recipes judged unrealistic.")
+    parser.add_argument("--drain-timeout", type=float, default=60,
+                        help="Seconds to wait for the generation tasks after the load.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Results file to add the results to.")
+    args = parser.parse_args()
+
+    parameters = {name: value for name, value in vars(args).items() if name != "output"}
+    if args.url:
+        results = asyncio.run(run_remote(args.url, args.rate, args.duration, args.mix, args.seed))
+        parameters = {name: parameters[name] for name in ("rate", "duration", "mix", "url", "seed")}
+    else:
+        with fake_openai_server(args.latency, args.failure_rate, args.reject_rate, seed=args.seed) as server:
+            os.environ.update({
+                "OPENAI_API_KEY": "benchmark",
+                "OPENAI_BASE_URL": server.base_url,
+                "DATABASE_URL": f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db",
+                "NUTRITION_TABLE_PATH": f"{tempfile.mkdtemp()}/nutrition_learned.json",
+                "LLM_CACHE_ENABLED": "false",
+                "DEDUP_ENABLED": "false",
+                "INVENTORY_ENABLED": "false",
+                "LOGGING_LEVEL": "WARNING",
+            })
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results = asyncio.run(run_in_process(args.rate, args.duration, args.mix, args.rows, args.seed,
+                                                     args.drain_timeout))
+            results["generation"]["llm_requests"] = server.requests
+            results["generation"]["llm_failures"] = server.failures
+
+    results = {group: {name: round(value, 3) for name, value in values.items()} for group, values in results.items()}
+    if args.output:
+        write_results(args.output, "load", results, parameters)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
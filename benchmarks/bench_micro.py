@@ -0,0 +1,98 @@
+"""
+Per-call time of the hot helpers of the generation task: parsing a model answer, filling the recipe
+parameters and saving a recipe.
+
+Each case is called `--calls` times after `--warmup` calls, and the mean, p50, p95 and p99 of the call times
+are reported in microseconds. save_recipe writes to a fresh SQLite database.
+
+Usage:
+    python -m benchmarks.bench_micro --calls 2000 --output results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from benchmarks.fake_openai import NUTRITION, RECIPE
+from benchmarks.results import percentiles, write_results
+
+
+async def time_calls(call: Callable[[], Awaitable], calls: int, warmup: int) -> dict:
+    """
+    :param call: Callable[[], Awaitable]: The case, called without arguments.
+    :param calls: int: Number of measured calls.
+    :param warmup: int: Number of calls before the measured ones.
+    :return: dict: Calls per second and the call time statistics in microseconds.
+    """
+    for _ in range(warmup):
+        await call()
+    durations = []
+    for _ in range(calls):
+        started = time.perf_counter_ns()
+        await call()
+        durations.append((time.perf_counter_ns() - started) / 1000)
+    return {
+        "calls_per_second": 1e6 / statistics.fmean(durations),
+        "mean_us": statistics.fmean(durations),
+        **{f"{name}_us": value for name, value in percentiles(durations).items()},
+    }
+
+
+async def run(calls: int, warmup: int) -> dict:
+    from app.core.utils import generate_random_recipe_values, parse_gpt_response
+    from app.db import init_db
+    from app.db.crud import save_recipe
+    from app.db.database import AsyncSessionLocal, engine
+    from app.schemas.recipe_schemas import Recipe
+
+    answer = json.dumps(RECIPE)
+    fenced = f"```json\n{json.dumps(RECIPE, indent=2)}\n```"
+    params = Recipe(amountOfPersons=4, dishType="main", maxCooking=60, allergiesList=[], dietRequirements=[],
+                    cuisineList=["Italian"])
+    partial = Recipe(dishType="main")
+    recipe = {**RECIPE, "nutrition": NUTRITION, "status": "ACTIVE"}
+
+    await init_db()
+    results = {}
+    async with AsyncSessionLocal() as db:
+        cases = {
+            "parse_gpt_response": lambda: parse_gpt_response(answer),
+            "parse_gpt_response_fenced": lambda: parse_gpt_response(fenced),
+            "generate_random_recipe_values": lambda: generate_random_recipe_values(Recipe()),
+            "generate_random_recipe_values_weighted": lambda: generate_random_recipe_values(partial, True),
+            "save_recipe": lambda: save_recipe(db, recipe, str(uuid4()), params),
+        }
+        for name, call in cases.items():
+            results[name] = await time_calls(call, calls, warmup)
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000, help="Measured calls per case.")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured calls per case.")
+    parser.add_argument("--output", help="Results file to add the results to.")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db",
+        "LOGGING_LEVEL": "WARNING",
+    })
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = asyncio.run(run(args.calls, args.warmup))
+
+    results = {case: {name: round(value, 2) for name, value in values.items()} for case, values in results.items()}
+    if args.output:
+        write_results(args.output, "micro", results, {"calls": args.calls, "warmup": args.warmup})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
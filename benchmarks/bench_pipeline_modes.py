@@ -0,0 +1,103 @@
+"""
+End-to-end latency, LLM requests and tokens per accepted recipe of the classic and fused pipelines,
+measured against a local fake LLM.
+
+Every request to the fake LLM takes `--latency` seconds, and streamed answers also wait `--chunk-latency` seconds
+per 8 characters, so longer answers take longer. The validator and the self-check answer "No" with
+probability `--reject-rate`. Tokens are the words of the prompts and completions.
+
+Usage:
+    python -m benchmarks.bench_pipeline_modes --recipes 50 --concurrency 8 --latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.fake_openai import fake_openai_server
+from benchmarks.results import write_results
+from tests.fake_llm import FakeLLMServer
+
+
+async def measure(mode: str, confirm: bool, recipes: int, concurrency: int, server: FakeLLMServer) -> dict:
+    from app.core import create_recipes
+    from app.core.llm import close_llm_client
+    from app.schemas.recipe_schemas import Recipe
+
+    params = Recipe(amountOfPersons=4, dishType="main", maxCooking=60, allergiesList=[], dietRequirements=[],
+                    cuisineList=["Italian"])
+    create_recipes.FUSED_CONFIRMATION = confirm
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def accept_one():
+        async with semaphore:
+            started = time.perf_counter()
+            await create_recipes.generate_valid_recipe(params, pipeline_mode=mode)
+            latencies.append(time.perf_counter() - started)
+
+    requests, tokens = server.requests, server.prompt_tokens + server.completion_tokens
+    started = time.perf_counter()
+    await asyncio.gather(*(accept_one() for _ in range(recipes)))
+    elapsed = time.perf_counter() - started
+    await close_llm_client()
+
+    latencies.sort()
+    return {
+        "latency_p50": statistics.median(latencies),
+        "latency_p95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        "requests_per_recipe": (server.requests - requests) / recipes,
+        "tokens_per_recipe": (server.prompt_tokens + server.completion_tokens - tokens) / recipes,
+        "recipes_per_second": recipes / elapsed,
+    }
+
+
+async def run(recipes: int, concurrency: int, server: FakeLLMServer) -> dict:
+    results = {}
+    for name, mode, confirm in (("classic", "classic", False), ("fused", "fused", False),
+                                ("fused+confirm", "fused", True)):
+        results[name] = await measure(mode, confirm, recipes, concurrency, server)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=50, help="Accepted recipes per mode.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per LLM request.")
+    parser.add_argument("--chunk-latency", type=float, default=0.001, help="Seconds per streamed chunk.")
+    parser.add_argument("--reject-rate", type=float, default=0.2, help="Share of recipes judged unrealistic.")
+    parser.add_argument("--nutrition-engine", choices=("local", "llm"), default="llm",
+                        help="How the classic pipeline computes nutrition.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Results file to add the results to.")
+    args = parser.parse_args()
+
+    with fake_openai_server(args.latency, reject_rate=args.reject_rate, chunk_latency=args.chunk_latency,
+                            seed=args.seed) as server:
+        os.environ.update({
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": server.base_url,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db",
+            "NUTRITION_TABLE_PATH": f"{tempfile.mkdtemp()}/nutrition_learned.json",
+            "NUTRITION_ENGINE": args.nutrition_engine,
+            "LLM_CACHE_ENABLED": "false",
+            "DEDUP_ENABLED": "false",
+            "LOGGING_LEVEL": "WARNING",
+        })
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results = asyncio.run(run(args.recipes, args.concurrency, server))
+
+    results = {mode: {name: round(value, 3) for name, value in values.items()} for mode, values in results.items()}
+    if args.output:
+        write_results(args.output, "pipeline_modes", results,
+                      {name: value for name, value in vars(args).items() if name != "output"})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Local OpenAI-compatible server answering the prompts of the recipe pipeline, for benchmarks that must not
+call the real API.
+
+Every request takes `--latency` seconds, streamed answers also wait `--chunk-latency` seconds per 8 characters,
+and a share `--failure-rate` of the requests is answered with HTTP 503. The validator and the self-check answer
+"No" with probability `--reject-rate`. Point the API and the worker at it with OPENAI_BASE_URL.
+
+Usage:
+    python -m benchmarks.fake_openai --port 8100 --latency 0.5 --failure-rate 0.05 --reject-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=benchmark celery -A app.api.routes.recipe_routes worker
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from tests.fake_llm import FakeLLMServer
+
+RECIPE = {
+    "Name": "Chickpea and Spinach Risotto",
+    "CookingTime": "40 minutes",
+    "RequiredTools": ["pan", "knife", "wooden spoon"],
+    "Ingredients": [
+        {"Name": "arborio rice", "grams": 300, "cups": 1.5},
+        {"Name": "chickpeas", "grams": 240, "cups": 1},
+        {"Name": "spinach", "grams": 150, "cups": 5},
+        {"Name": "onion", "grams": 110, "piece": 1},
+        {"Name": "olive oil", "ml": 30, "tablespoons": 2},
+        {"Name": "vegetable stock", "ml": 1000, "cups": 4},
+    ],
+    "Step-by-step directions": [
+        "Chop the onion and fry it in the olive oil until soft.",
+        "Add the rice and toast it for two minutes.",
+        "Add the stock a ladle at a time, stirring until absorbed.",
+        "Stir in the chickpeas and spinach and cook until the spinach wilts.",
+    ],
+}
+NUTRITION = {"calories": 1650, "protein": 52, "fat": 38, "carbohydrates": 270, "totalWeight": 1830}
+
+
+class FakeRecipeLLM:
+    """
+    Answers each prompt of the pipeline like the model would: recipes, fused recipes, nutrition and verdicts.
+    """
+
+    def __init__(self, reject_rate: float, seed: int | None = None):
+        self.reject_rate = reject_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def realistic(self) -> str:
+        with self._lock:
+            return "No" if self._random.random() < self.reject_rate else "Yes"
+
+    def __call__(self, prompt: str) -> str:
+        if "Check if it is realistic" in prompt:
+            return self.realistic()
+        if "<ingredients>" in prompt:
+            return json.dumps({name: {"calories": 100, "protein": 5, "fat": 2, "carbohydrates": 15}
+                               for name in prompt.split("<ingredients>")[1].split("</ingredients>")[0].split()})
+        if "food technologist" in prompt:
+            return json.dumps(NUTRITION)
+        if "SelfCheck" in prompt:
+            return json.dumps({**RECIPE, "nutrition": NUTRITION,
+                               "SelfCheck": {"realistic": self.realistic(), "issues": []}})
+        return json.dumps(RECIPE)
+
+
+def fake_openai_server(latency: float = 0.2, failure_rate: float = 0.0, reject_rate: float = 0.2,
+                       chunk_latency: float = 0.001, seed: int | None = None, port: int = 0) -> FakeLLMServer:
+    """
+    :param latency: float: Seconds per request.
+    :param failure_rate: float: Share of the requests answered with HTTP 503.
+    :param reject_rate: float: Share of the recipes judged unrealistic.
+    :param chunk_latency: float: Seconds per streamed chunk.
+    :param seed: int: Seed of the failures and verdicts.
+    :param port: int: Port to listen on, 0 for a free one.
+    :return: FakeLLMServer: The server, not started yet.
+    """
+    return FakeLLMServer(reply=FakeRecipeLLM(reject_rate, seed), latency=latency, failure_rate=failure_rate,
+                         chunk_latency=chunk_latency, seed=seed, port=port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per LLM request.")
+    parser.add_argument("--chunk-latency", type=float, default=0.001, help="Seconds per streamed chunk.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests failing with 503.")
+    parser.add_argument("--reject-rate", type=float, default=0.2, help="Share of recipes judged unrealistic.")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    with fake_openai_server(args.latency, args.failure_rate, args.reject_rate, args.chunk_latency, args.seed,
+                            args.port) as server:
+        print(f"Serving a fake OpenAI API at {server.base_url}", flush=True)
+        try:
+            while True:
+                time.sleep(10)
+                print(f"{server.requests} requests, {server.failures} failed, {server.max_in_flight} max in flight",
+                      flush=True)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark results files, and the comparison of two of them.
+
+Benchmarks run with `--output FILE` add their results to FILE under their own name, together with the commit
+they were measured at. Comparing the files written at two commits shows the relative change of every metric.
+
+Usage:
+    python -m benchmarks.bench_micro --output before.json
+    python -m benchmarks.bench_load --output before.json
+    python -m benchmarks.results before.json after.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, Iterable, List, Sequence
+
+
+def percentiles(values: Iterable[float], points: Sequence[int] = (50, 95, 99)) -> Dict[str, float]:
+    """
+    :param values: Iterable[float]: The measurements.
+    :param points: Sequence[int]: The percentiles to compute.
+    :return: Dict[str, float]: The nearest-rank percentiles, keyed "p50", "p95"..., empty without values.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {f"p{point}": ordered[max(0, math.ceil(point / 100 * len(ordered)) - 1)] for point in points}
+
+
+def git_commit() -> str | None:
+    """
+    :return: str: The checked out commit, suffixed with "-dirty" when the tree has changes, None outside git.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def write_results(path: str, benchmark: str, results: dict, parameters: dict):
+    """
+    Add the results of a benchmark to a results file, replacing its previous results there.
+
+    :param path: str: The JSON file, created if missing.
+    :param benchmark: str: The name of the benchmark.
+    :param results: dict: The measured metrics, nested dicts of numbers.
+    :param parameters: dict: The options the benchmark ran with.
+    """
+    document = {"benchmarks": {}}
+    if os.path.exists(path):
+        with open(path) as file:
+            document = json.load(file)
+    document["benchmarks"][benchmark] = {
+        "commit": git_commit(),
+        "measured_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "parameters": parameters,
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    """
+    :param results: dict: Nested dicts of numbers.
+    :param prefix: str: Prefix of the keys.
+    :return: Dict[str, float]: The numbers keyed by their dotted path.
+    """
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(old: dict, new: dict) -> List[tuple]:
+    """
+    :param old: dict: The results file of the baseline.
+    :param new: dict: The results file to compare with it.
+    :return: List[tuple]: (metric, old value, new value, relative change) of the metrics in both files.
+    """
+    rows = []
+    for benchmark in sorted(old["benchmarks"].keys() & new["benchmarks"].keys()):
+        before = flatten(old["benchmarks"][benchmark]["results"])
+        after = flatten(new["benchmarks"][benchmark]["results"])
+        for metric in sorted(before.keys() & after.keys()):
+            change = (after[metric] - before[metric]) / before[metric] if before[metric] else None
+            rows.append((f"{benchmark}.{metric}", before[metric], after[metric], change))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old", help="Results file of the baseline.")
+    parser.add_argument("new", help="Results file to compare with it.")
+    args = parser.parse_args()
+
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+    for benchmark in sorted(old["benchmarks"].keys() & new["benchmarks"].keys()):
+        print(f"# {benchmark}: {old['benchmarks'][benchmark]['commit']} -> {new['benchmarks'][benchmark]['commit']}")
+    rows = compare(old, new)
+    width = max((len(row[0]) for row in rows), default=0)
+    for metric, before, after, change in rows:
+        change = f"{change:+.1%}" if change is not None else "n/a"
+        print(f"{metric:<{width}}  {before:>12.4g}  {after:>12.4g}  {change:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db")
+os.environ.setdefault("LLM_CACHE_PATH", f"{tempfile.mkdtemp()}/llm_cache.db")
+os.environ.setdefault("NUTRITION_TABLE_PATH", f"{tempfile.mkdtemp()}/nutrition_learned.json")
+os.environ.setdefault("LOG_FILE", f"{tempfile.mkdtemp()}/app.log")
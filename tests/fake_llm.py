@@ -0,0 +1,160 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+
+class FakeLLMServer:
+    """
+    Local stand-in for the OpenAI chat completions API, served from a background thread.
+
+    :param reply: str | Callable[[str], str]: The completion content, or a function of the prompt.
+    :param latency: float: Seconds to wait before answering each request.
+    :param fail_first: int: Number of initial requests answered with `fail_status` instead of a completion.
+    :param failure_rate: float: Probability of answering any later request with `fail_status`.
+    :param fail_status: int: HTTP status of the failed requests, e.g. 429 or 503.
+    :param retry_after: float: Retry-After header sent with the failed requests, None for none.
+    :param chunk_size: int: Characters per event of streamed completions.
+    :param chunk_latency: float: Seconds to wait before each event of streamed completions.
+    :param seed: int: Seed of the random failures.
+    :param port: int: Port to listen on, 0 for a free one.
+    """
+
+    def __init__(self, reply: str | Callable[[str], str] = "Yes", latency: float = 0.0, fail_first: int = 0,
+                 failure_rate: float = 0.0, fail_status: int = 503, retry_after: float | None = None,
+                 chunk_size: int = 8, chunk_latency: float = 0.0, seed: int | None = None, port: int = 0):
+        self.reply = reply
+        self.latency = latency
+        self.fail_first = fail_first
+        self.failure_rate = failure_rate
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.chunk_size = chunk_size
+        self.chunk_latency = chunk_latency
+        self.streamed_chars = 0
+        self.aborted_streams = 0
+        self.requests = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def completion(self, body: dict) -> dict:
+        prompt = body["messages"][-1]["content"]
+        content = self.reply(prompt) if callable(self.reply) else self.reply
+        with self._lock:
+            self.prompt_tokens += len(prompt.split())
+            self.completion_tokens += len(content.split())
+        return {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(content.split()),
+                      "total_tokens": len(prompt.split()) + len(content.split())},
+        }
+
+    def chunks(self, body: dict):
+        completion = self.completion(body)
+        content = completion["choices"][0]["message"]["content"]
+        base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+                "model": completion["model"]}
+        for start in range(0, len(content), self.chunk_size):
+            delta = content[start:start + self.chunk_size]
+            yield len(delta), {**base, "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+        yield 0, {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield 0, {**base, "choices": [], "usage": completion["usage"]}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    failed = server.requests <= server.fail_first or server._random.random() < server.failure_rate
+                    server.failures += failed
+                if body.get("stream") and not failed:
+                    try:
+                        time.sleep(server.latency)
+                        self.stream(body)
+                    finally:
+                        with server._lock:
+                            server.in_flight -= 1
+                    return
+                try:
+                    time.sleep(server.latency)
+                    if failed:
+                        payload = json.dumps({"error": {"message": "Unavailable", "type": "server_error"}}).encode()
+                    else:
+                        payload = json.dumps(server.completion(body)).encode()
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+                try:
+                    self.send_response(server.fail_status if failed else 200)
+                    if failed and server.retry_after is not None:
+                        self.send_header("Retry-After", str(server.retry_after))
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                try:
+                    for size, chunk in server.chunks(body):
+                        time.sleep(server.chunk_latency)
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                        with server._lock:
+                            server.streamed_chars += size
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.aborted_streams += 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from typing import Dict, List, Tuple
+
+
+class FakeRedis:
+    """
+    In-process stand-in for the pub/sub and plain key parts of the redis.asyncio client.
+
+    Messages are delivered through the event loop of each subscriber, so `publish` can be awaited from
+    any loop or thread, e.g. from a worker loop while the API runs on another. Keys do not expire, their
+    requested lifetimes are kept in `expiries`.
+    """
+
+    def __init__(self):
+        self.published: List[Tuple[str, str]] = []
+        self.subscriptions = 0
+        self.values: Dict[str, bytes] = {}
+        self.expiries: Dict[str, int] = {}
+        self._subscribers: List["FakePubSub"] = []
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> bytes | None:
+        return self.values.get(key)
+
+    async def set(self, key: str, value: bytes | str | int, ex: int | None = None, nx: bool = False) -> bool | None:
+        if nx and key in self.values:
+            return None
+        self.values[key] = value if isinstance(value, bytes) else str(value).encode()
+        if ex is not None:
+            self.expiries[key] = ex
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        deleted = [key for key in keys if self.values.pop(key, None) is not None]
+        return len(deleted)
+
+    async def incr(self, key: str) -> int:
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+    async def publish(self, channel: str, message: str) -> int:
+        with self._lock:
+            self.published.append((channel, message))
+            receivers = [pubsub for pubsub in self._subscribers if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub.deliver({"type": "message", "pattern": None, "channel": channel, "data": message})
+        return len(receivers)
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    def pubsub(self) -> "FakePubSub":
+        return FakePubSub(self)
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    """
+    Queues commands and runs them in order on `execute`, like the redis.asyncio pipeline.
+    """
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def set(self, *args, **kwargs) -> "FakePipeline":
+        self.commands.append((self.redis.set, args, kwargs))
+        return self
+
+    def incr(self, *args, **kwargs) -> "FakePipeline":
+        self.commands.append((self.redis.incr, args, kwargs))
+        return self
+
+    async def execute(self) -> list:
+        commands, self.commands = self.commands, []
+        return [await command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class FakePubSub:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.channels = set()
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def subscribe(self, *channels: str):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        with self.redis._lock:
+            self.channels.update(channels)
+            self.redis._subscribers.append(self)
+            self.redis.subscriptions += 1
+        for channel in channels:
+            self._queue.put_nowait({"type": "subscribe", "pattern": None, "channel": channel, "data": 1})
+
+    def deliver(self, message: dict):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+
+    async def listen(self):
+        while self.channels:
+            yield await self._queue.get()
+
+    async def aclose(self):
+        with self.redis._lock:
+            self.channels.clear()
+            if self in self.redis._subscribers:
+                self.redis._subscribers.remove(self)
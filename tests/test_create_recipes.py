@@ -0,0 +1,183 @@
+import asyncio
+import itertools
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core import create_recipes
+from app.core.retry import RetryExhausted
+from app.db.models import Base, Recipe as RecipeModel
+from app.schemas.recipe_schemas import Recipe
+
+
+@pytest.fixture
+def params():
+    return Recipe(amountOfPersons=2, dishType="main", maxCooking=30, allergiesList=[],
+                  dietRequirements=[], cuisineList=["Italian"])
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    """
+    Replace the LLM stages: candidate N takes (10 - N) * 10 ms to generate and only candidate 3 is valid.
+    """
+    counter = itertools.count()
+    state = {"started": 0, "cancelled": 0}
+
+    async def generate(params, on_value=None):
+        number = next(counter)
+        state["started"] += 1
+        try:
+            await asyncio.sleep((10 - number) * 0.01)
+        except asyncio.CancelledError:
+            state["cancelled"] += 1
+            raise
+        return {"Name": f"Recipe {number}", "CookingTime": "20 minutes", "Ingredients": [{"Name": "rice", "grams": 100}],
+                "Step-by-step directions": ["Cook."], "status": "ACTIVE"}
+
+    async def nutrition(recipe, use_cache=False, local_only=False):
+        return {"calories": 100}
+
+    async def validate(recipe, use_cache=False):
+        return "Yes" if recipe["Name"] == "Recipe 3" else "No"
+
+    monkeypatch.setattr(create_recipes, "generate_single_recipe", generate)
+    monkeypatch.setattr(create_recipes, "calculate_nutrition", nutrition)
+    monkeypatch.setattr(create_recipes, "validate_recipe", validate)
+    monkeypatch.setattr(create_recipes, "DEDUP_ENABLED", False)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_sequential_mode_retries_until_valid(params, fake_stages):
+    recipe = await create_recipes.generate_valid_recipe(params, candidates=1)
+
+    assert recipe["Name"] == "Recipe 3"
+    assert recipe["nutrition"] == {"calories": 100}
+    assert fake_stages["started"] == 4
+    assert fake_stages["cancelled"] == 0
+
+
+@pytest.mark.asyncio
+async def test_speculative_mode_cancels_remaining_candidates(params, fake_stages):
+    recipe = await create_recipes.generate_valid_recipe(params, candidates=4)
+
+    assert recipe["Name"] == "Recipe 3"
+    assert fake_stages["started"] == 4
+    assert fake_stages["cancelled"] == 3
+
+
+@pytest.mark.asyncio
+async def test_deadline_is_enforced(params, fake_stages, monkeypatch):
+    async def reject(recipe, use_cache=False):
+        return "No"
+
+    monkeypatch.setattr(create_recipes, "validate_recipe", reject)
+
+    with pytest.raises(TimeoutError):
+        await create_recipes.generate_valid_recipe(params, candidates=2, deadline=0.2)
+
+
+@pytest.mark.asyncio
+async def test_rejected_candidates_are_capped(params, fake_stages, monkeypatch):
+    async def reject(recipe, use_cache=False):
+        return "No"
+
+    monkeypatch.setattr(create_recipes, "validate_recipe", reject)
+
+    with pytest.raises(RetryExhausted):
+        await create_recipes.generate_valid_recipe(params, candidates=2, max_candidates=5)
+    assert fake_stages["started"] == 5
+
+
+class FakeTask:
+    def __init__(self):
+        self.states = []
+
+    def update_state(self, task_id, state, meta):
+        self.states.append((state, meta))
+
+
+@pytest.mark.asyncio
+async def test_batch_task_bulk_inserts_in_chunks(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'batch.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(create_recipes, "async_session", async_sessionmaker(bind=engine, expire_on_commit=False))
+
+    async def generate(params, on_value=None):
+        if params.dishType == "dessert":
+            raise Exception("LLM unavailable")
+        return {"Name": f"{params.dishType} dish", "CookingTime": "5 minutes", "RequiredTools": [],
+                "Ingredients": [{"Name": "spinach", "grams": 100}], "Step-by-step directions": ["Cook."],
+                "status": "ACTIVE"}
+
+    async def nutrition(recipe, use_cache=False, local_only=False):
+        return {"calories": 100}
+
+    async def validate(recipe, use_cache=False):
+        return "Yes"
+
+    monkeypatch.setattr(create_recipes, "generate_single_recipe", generate)
+    monkeypatch.setattr(create_recipes, "calculate_nutrition", nutrition)
+    monkeypatch.setattr(create_recipes, "validate_recipe", validate)
+    monkeypatch.setattr(create_recipes, "DEDUP_ENABLED", False)
+
+    task = FakeTask()
+    chunk = {"params": {"dishType": "main"}, "randomization_type": "weighted"}
+    result = await create_recipes.async_generate_recipe_batch_task(task, "batch", chunk, 7, concurrency=3, insert_size=3)
+
+    assert result["completed"] == 7
+    assert result["failed"] == 0
+    assert len(set(result["recipe_ids"])) == 7
+    assert [meta["completed"] for _, meta in task.states] == [3, 6, 7]
+
+    async with engine.connect() as conn:
+        assert await conn.scalar(select(func.count()).select_from(RecipeModel)) == 7
+
+    failing = await create_recipes.async_generate_recipe_batch_task(
+        FakeTask(), "failing-batch", {"params": {"dishType": "dessert"}}, 2)
+    assert failing["completed"] == 0
+    assert failing["failed"] == 2
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_fused_mode_uses_the_generated_nutrition_and_self_check(params, monkeypatch):
+    calls = {"generate": 0, "nutrition": 0, "validate": []}
+
+    async def generate(params, on_value=None):
+        calls["generate"] += 1
+        realistic = "Yes" if calls["generate"] > 1 else "No"
+        nutrition = {"calories": "450 kcal", "protein": 20, "fat": 10, "carbohydrates": 60, "totalWeight": 400}
+        return {"Name": f"Recipe {calls['generate']}", "CookingTime": "20 minutes",
+                "Ingredients": [{"Name": "rice", "grams": 100}], "Step-by-step directions": ["Cook."],
+                "nutrition": nutrition if calls["generate"] < 3 else None,
+                "SelfCheck": {"realistic": realistic, "issues": []}, "status": "ACTIVE"}
+
+    async def nutrition(recipe, use_cache=False, local_only=False):
+        calls["nutrition"] += 1
+        return {"calories": 100}
+
+    async def validate(recipe, use_cache=False, model=None):
+        calls["validate"].append(model)
+        return "Yes"
+
+    monkeypatch.setattr(create_recipes, "generate_fused_recipe", generate)
+    monkeypatch.setattr(create_recipes, "calculate_nutrition", nutrition)
+    monkeypatch.setattr(create_recipes, "validate_recipe", validate)
+    monkeypatch.setattr(create_recipes, "DEDUP_ENABLED", False)
+
+    recipe = await create_recipes.generate_valid_recipe(params, pipeline_mode="fused")
+    assert recipe["Name"] == "Recipe 2"
+    assert recipe["nutrition"] == {"calories": 450, "protein": 20, "fat": 10, "carbohydrates": 60, "totalWeight": 400}
+    assert "SelfCheck" not in recipe
+    assert calls["nutrition"] == 0 and calls["validate"] == []
+
+    recipe = await create_recipes.generate_fused_candidate(params, confirm=True)
+    assert recipe["nutrition"] == {"calories": 100}
+    assert calls["validate"] == [create_recipes.FUSED_CONFIRMATION_MODEL]
+
+    with pytest.raises(ValueError):
+        await create_recipes.generate_valid_recipe(params, pipeline_mode="parallel")
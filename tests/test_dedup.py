@@ -0,0 +1,121 @@
+from uuid import uuid4
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core import create_recipes
+from app.core.dedup import dedup_recipes
+from app.core.similarity import MinHasher, SimilarityIndex, lsh_bands, recipe_shingles
+from app.db.crud import find_similar_recipes, recipe_row, save_recipes
+from app.db.models import Base, Recipe as RecipeModel, RecipeMinHash, RecipeStatus
+from app.schemas.recipe_schemas import Recipe
+
+INGREDIENTS = ["spaghetti", "tomato", "garlic", "olive oil", "basil", "parmesan", "onion", "salt"]
+
+
+def generated(name, ingredients):
+    return {"Name": name, "CookingTime": "20 minutes", "RequiredTools": ["pan"],
+            "Ingredients": [{"Name": item, "grams": 100} for item in ingredients],
+            "Step-by-step directions": ["Cook."], "nutrition": {"calories": 300}, "status": "ACTIVE"}
+
+
+@pytest_asyncio.fixture
+async def sessions(tmp_path):
+    test_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'dedup.db'}")
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(bind=test_engine, expire_on_commit=False)
+    await test_engine.dispose()
+
+
+async def save(sessions, *recipes):
+    rows = [recipe_row(recipe, str(uuid4())) for recipe in recipes]
+    async with sessions() as db:
+        await save_recipes(db, rows)
+    return [row["id"] for row in rows]
+
+
+def test_signatures_estimate_jaccard_similarity():
+    sets = [recipe_shingles("Spaghetti al Pomodoro", INGREDIENTS),
+            recipe_shingles("Spaghetti Pomodoro", ["2 fresh Tomatoes"] + INGREDIENTS[:1] + INGREDIENTS[2:]),
+            recipe_shingles("Beef Stew", ["beef", "carrot", "potato"]),
+            set()]
+    signatures = MinHasher(num_perm=256).signatures(sets)
+
+    exact = len(sets[0] & sets[1]) / len(sets[0] | sets[1])
+    assert signatures.shape == (4, 256) and signatures.dtype == np.uint32
+    assert abs((signatures[0] == signatures[1]).mean() - exact) < 0.1
+    assert (signatures[0] == signatures[2]).mean() < 0.1
+    assert lsh_bands(0.8, 128) == (12, 10)
+
+    index = SimilarityIndex(0.5, num_perm=256)
+    buckets = index.buckets(signatures)
+    index.add("pomodoro", signatures[0], buckets[0])
+    assert [key for key, _ in index.query(signatures[1], buckets[1])] == ["pomodoro"]
+    assert index.query(signatures[2], buckets[2]) == []
+    assert index.query(signatures[3], buckets[3]) == []
+
+
+@pytest.mark.asyncio
+async def test_saved_recipes_are_found_by_near_duplicates(sessions):
+    pomodoro, _ = await save(sessions, generated("Spaghetti Pomodoro", INGREDIENTS),
+                             generated("Beef Stew", ["beef", "carrot", "potato", "onion"]))
+
+    async with sessions() as db:
+        matches = await find_similar_recipes(db, "Spaghetti Pomodoro", ["Tomatoes"] + INGREDIENTS[:1] + INGREDIENTS[2:])
+        assert [recipe_id for recipe_id, _ in matches] == [pomodoro]
+        assert await find_similar_recipes(db, "Chicken Curry", ["chicken", "curry paste", "rice"]) == []
+        assert await find_similar_recipes(db, None, []) == []
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_candidates_are_rejected(sessions, monkeypatch):
+    await save(sessions, generated("Spaghetti Pomodoro", INGREDIENTS))
+    monkeypatch.setattr(create_recipes, "async_session", sessions)
+    monkeypatch.setattr(create_recipes, "DEDUP_ENABLED", True)
+    recipes = iter([generated("Spaghetti Pomodoro", INGREDIENTS), generated("Beef Stew", ["beef", "carrot"])])
+
+    async def generate(params, on_value=None):
+        return next(recipes)
+
+    async def nutrition(recipe, use_cache=False, local_only=False):
+        return {"calories": 100}
+
+    async def validate(recipe, use_cache=False):
+        return "Yes"
+
+    monkeypatch.setattr(create_recipes, "generate_single_recipe", generate)
+    monkeypatch.setattr(create_recipes, "calculate_nutrition", nutrition)
+    monkeypatch.setattr(create_recipes, "validate_recipe", validate)
+
+    recipe = await create_recipes.generate_valid_recipe(Recipe(amountOfPersons=2, maxCooking=30), candidates=1)
+    assert recipe["Name"] == "Beef Stew"
+
+
+@pytest.mark.asyncio
+async def test_dedup_job_keeps_the_first_of_each_group(sessions):
+    first, duplicate, other = await save(sessions, generated("Spaghetti Pomodoro", INGREDIENTS),
+                                         generated("Spaghetti Pomodoro", INGREDIENTS[::-1]),
+                                         generated("Beef Stew", ["beef", "carrot", "potato"]))
+    ordered = sorted([first, duplicate], key=str)
+
+    async with sessions() as db:
+        result = await dedup_recipes(db, threshold=0.8, dry_run=True)
+        assert (result["scanned"], result["duplicates"]) == (3, 1)
+        assert result["pairs"][0][:2] == [str(ordered[1]), str(ordered[0])]
+
+        result = await dedup_recipes(db, threshold=0.8, action="freeze")
+        recipe = await db.get(RecipeModel, ordered[1])
+        assert recipe.status == RecipeStatus.FROZEN
+        assert await db.scalar(select(func.count()).select_from(RecipeMinHash)) == 2
+
+        result = await dedup_recipes(db, threshold=0.8, batch_size=2)
+        assert result["duplicates"] == 1
+        assert await db.scalar(select(func.count()).select_from(RecipeModel)) == 2
+        assert await find_similar_recipes(db, "Beef Stew", ["beef", "carrot", "potato"]) != []
+
+        with pytest.raises(ValueError):
+            await dedup_recipes(db, action="merge")
@@ -0,0 +1,25 @@
+from app.core.ingredients import index_ingredients, ingredient_allergens, ingredient_terms, search_terms
+
+
+def test_terms_are_singular_and_skip_preparation_words():
+    assert ingredient_terms("Canned chickpeas, drained") == {"canned", "chickpea", "drained"}
+    assert ingredient_terms("2 cups finely chopped tomatoes") == {"tomato"}
+    assert search_terms(["Chickpeas", "olive oil"]) == {"chickpea", "olive", "oil"}
+
+
+def test_allergens_respect_exceptions():
+    assert ingredient_allergens("Parmesan cheese") == {"dairy"}
+    assert ingredient_allergens("Coconut milk") == set()
+    assert ingredient_allergens("Peanut butter") == {"nuts"}
+    assert ingredient_allergens("Gluten-free flour") == set()
+    assert ingredient_allergens("Anchovies") == {"seafood"}
+
+
+def test_index_accepts_generated_ingredient_shapes():
+    as_list = [{"Name": "Tofu", "grams": 200}, {"name": "Soy sauce"}, "Rice"]
+    as_dict = {"Tofu": {"grams": 200}, "Soy sauce": {"ml": 30}, "Rice": {"grams": 100}}
+
+    assert index_ingredients(as_list) == index_ingredients(as_dict) == {
+        "terms": {"tofu", "soy", "sauce", "rice"},
+        "allergens": {"soy"},
+    }
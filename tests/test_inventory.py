@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.routes import recipe_routes
+from app.core import create_recipes, inventory
+from app.core.inventory import inventory_row, inventory_targets, satisfies, serve_from_inventory
+from app.db import engine, init_db
+from app.db.crud import add_inventory_recipes, inventory_stock
+from app.db.database import AsyncSessionLocal
+from app.db.models import Base, InventoryRecipe
+from app.main import app
+from app.schemas.recipe_schemas import Recipe
+
+
+def generated(*ingredients, cooking_time="20 minutes"):
+    return {"Name": "Dish", "CookingTime": cooking_time, "RequiredTools": ["pan"],
+            "Ingredients": [{"Name": name, "grams": 100} for name in ingredients],
+            "Step-by-step directions": ["Cook."], "nutrition": {"calories": 300}, "status": "ACTIVE"}
+
+
+def filled(**values):
+    params = dict(amountOfPersons=2, dishType="main", maxCooking=30, allergiesList=[], dietRequirements=[],
+                  cuisineList=["Italian"])
+    return Recipe(**{**params, **values})
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    inventory.reset_inventory_stats()
+
+
+@pytest_asyncio.fixture
+async def sessions(tmp_path):
+    test_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'inventory.db'}")
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(bind=test_engine, expire_on_commit=False)
+    await test_engine.dispose()
+
+
+def test_stock_follows_the_weights():
+    targets = inventory_targets(total=50, overrides={"dessert:French": 3, "main:Chinese": 0})
+
+    assert next(iter(targets)) == "main:Italian"
+    assert targets["main:Italian"] == max(targets.values())
+    assert targets["dessert:French"] == 3
+    assert "main:Chinese" not in targets
+    assert "appetizer:French" not in targets
+
+
+def test_requests_are_matched_on_allergens_and_diets():
+    item = InventoryRecipe(**inventory_row(generated("chicken breast", "peanut butter", "rice", "sesame seeds"),
+                                           filled()))
+
+    assert item.bucket == "main:Italian"
+    assert item.allergens == ["nuts"]
+    assert item.diets == ["gluten-free"]
+    assert satisfies(item, Recipe(allergiesList=["dairy"], dietRequirements=["gluten-free"]))
+    assert not satisfies(item, Recipe(allergiesList=["nuts"]))
+    assert not satisfies(item, Recipe(allergiesList=["Sesame"]))
+    assert not satisfies(item, Recipe(dietRequirements=["vegetarian"]))
+
+
+@pytest.mark.asyncio
+async def test_each_inventory_recipe_is_served_once(sessions):
+    rows = [inventory_row(generated("peanut", "spinach"), filled()),
+            inventory_row(generated("spinach", cooking_time="1 hour"), filled()),
+            inventory_row(generated("spinach"), filled(amountOfPersons=4))]
+    async with sessions() as db:
+        await add_inventory_recipes(db, rows)
+
+    request = Recipe(dishType="main", amountOfPersons=2, maxCooking=30, allergiesList=["nuts"])
+    async with sessions() as db:
+        assert await serve_from_inventory(db, request, str(uuid4())) is None
+        recipe, bucket = await serve_from_inventory(db, Recipe(amountOfPersons=2, maxCooking=30), str(uuid4()))
+        assert (recipe.name, recipe.cuisine, bucket) == ("Dish", "Italian", "main:Italian")
+        assert await serve_from_inventory(db, Recipe(amountOfPersons=2, maxCooking=30), str(uuid4())) is None
+        assert await inventory_stock(db) == {"main:Italian": 2}
+
+    assert inventory.inventory_stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+
+@pytest.mark.asyncio
+async def test_replenisher_fills_buckets_up_to_their_target(sessions, monkeypatch):
+    monkeypatch.setattr(create_recipes, "async_session", sessions)
+    monkeypatch.setattr(create_recipes, "inventory_targets", lambda: {"main:Italian": 3, "dessert:French": 1})
+    requested = []
+
+    async def generate_valid_recipe(params, candidates=1, deadline=None):
+        requested.append(params)
+        return generated("spinach")
+
+    monkeypatch.setattr(create_recipes, "generate_valid_recipe", generate_valid_recipe)
+
+    assert await create_recipes.async_replenish_inventory() == {"main:Italian": 3, "dessert:French": 1}
+    assert await create_recipes.async_replenish_inventory(["main:Italian"]) == {"main:Italian": 0}
+    async with sessions() as db:
+        assert await inventory_stock(db) == {"main:Italian": 3, "dessert:French": 1}
+    assert all(params.amountOfPersons is not None and params.maxCooking is not None for params in requested)
+    assert {(params.dishType, params.cuisineList[0]) for params in requested} == {("main", "Italian"),
+                                                                                  ("dessert", "French")}
+
+
+@pytest.mark.asyncio
+async def test_generate_endpoint_serves_the_inventory(monkeypatch):
+    await init_db()
+    cuisine = f"Cuisine-{uuid4().hex[:8]}"
+    async with AsyncSessionLocal() as db:
+        await add_inventory_recipes(db, [inventory_row(generated("spinach"), filled(cuisineList=[cuisine]))])
+    replenished = []
+    monkeypatch.setattr(recipe_routes, "INVENTORY_ENABLED", True)
+    monkeypatch.setattr(recipe_routes, "replenish_inventory_task",
+                        SimpleNamespace(apply_async=lambda **kwargs: replenished.append(kwargs)))
+    monkeypatch.setattr(recipe_routes, "AsyncResult", lambda id, app: SimpleNamespace(state="PENDING"))
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/generate_recipe", json={"cuisineList": [cuisine]})
+        data = response.json()
+        assert data["status"] == "Recipe served from inventory"
+        assert data["recipe"]["name"] == "Dish"
+        assert replenished == [{"kwargs": {"buckets": [f"main:{cuisine}"]}}]
+
+        response = await client.get(f"/recipe/{data['recipe_id']}")
+        assert response.json()["cuisine"] == cuisine
+
+        response = await client.get("/inventory")
+        assert response.json()["hits"] == 1
+    await engine.dispose()
@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+from app.core import create_recipes, llm
+from app.core.json_stream import IncrementalJSONParser, StreamAborted
+from app.schemas.recipe_schemas import Recipe
+from tests.fake_llm import FakeLLMServer
+
+RECIPE = {
+    "Name": "Tomato soup",
+    "CookingTime": "20 minutes",
+    "Ingredients": [{"Name": "tomato", "grams": 400}, {"Name": "onion", "grams": 100}],
+    "Step-by-step directions": ["Chop the vegetables.", "Simmer for 15 minutes, then blend."],
+    "Notes": {"tags": ["vegan", "quick"], "spicy": False, "rating": -1.5e0, "source": None},
+}
+REQUIRED = ("Name", "Ingredients", "Step-by-step directions")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_members_are_returned_as_soon_as_they_complete(chunk_size):
+    text = "```json\n" + json.dumps(RECIPE, indent=2) + "\n```\nEnjoy your meal!"
+    parser = IncrementalJSONParser(REQUIRED)
+
+    members = []
+    for start in range(0, len(text), chunk_size):
+        members += parser.feed(text[start:start + chunk_size])
+
+    assert members == list(RECIPE.items())
+    assert parser.finish() == RECIPE
+
+
+def test_ingredients_are_available_before_the_directions():
+    text = json.dumps(RECIPE)
+    parser = IncrementalJSONParser(REQUIRED)
+
+    members = parser.feed(text[:text.index('"Step-by-step directions"') + 5])
+
+    assert dict(members)["Ingredients"] == RECIPE["Ingredients"]
+    assert not parser.done
+
+
+@pytest.mark.parametrize("text", [
+    "Here is your recipe: {",
+    '[{"Name": "x"}]',
+    '{"Name": "x"]',
+    '{"Name" "x"}',
+    '{"Name": "x",, ',
+    '{"Name": "x" "Ingredients": []}',
+    '{"Name": yes}',
+    '{"Name": "x", "Ingredients": [], "Step-by-step directions": [1,]}',
+])
+def test_structural_errors_abort_immediately(text):
+    with pytest.raises(StreamAborted):
+        IncrementalJSONParser(REQUIRED).feed(text)
+
+
+def test_missing_required_keys_abort_when_the_object_closes():
+    parser = IncrementalJSONParser(REQUIRED)
+
+    with pytest.raises(StreamAborted, match="Step-by-step directions"):
+        parser.feed('{"Name": "x", "Ingredients": []}')
+
+
+def test_incomplete_and_oversized_objects_are_rejected():
+    parser = IncrementalJSONParser()
+    parser.feed('{"Name": "x"')
+    with pytest.raises(StreamAborted):
+        parser.finish()
+
+    with pytest.raises(StreamAborted):
+        IncrementalJSONParser(max_chars=10).feed('{"Name": "a long name"')
+
+
+@pytest.mark.asyncio
+async def test_broken_completions_stop_streaming_early(monkeypatch):
+    reply = "I'm sorry, I can't write a recipe today. " * 50
+    with FakeLLMServer(reply=reply, chunk_size=4, chunk_latency=0.001) as server:
+        client = llm.LLMClient(api_key="test", base_url=server.base_url)
+        monkeypatch.setattr(llm, "get_llm_client", lambda: client)
+        try:
+            with pytest.raises(StreamAborted):
+                await llm.stream_chat_json("prompt", REQUIRED)
+        finally:
+            await client.aclose()
+
+    assert server.streamed_chars < len(reply) / 2
+
+
+@pytest.mark.asyncio
+async def test_streamed_members_reach_the_callback(monkeypatch):
+    received = []
+
+    async def on_value(key, value):
+        received.append(key)
+
+    with FakeLLMServer(reply=json.dumps(RECIPE), chunk_size=5) as server:
+        client = llm.LLMClient(api_key="test", base_url=server.base_url)
+        monkeypatch.setattr(llm, "get_llm_client", lambda: client)
+        try:
+            assert await llm.stream_chat_json("prompt", REQUIRED, on_value) == RECIPE
+        finally:
+            await client.aclose()
+
+    assert received == list(RECIPE)
+
+
+@pytest.mark.asyncio
+async def test_candidate_is_rejected_while_streaming(monkeypatch):
+    recipe = {**RECIPE, "Ingredients": [{"Name": "peanut butter", "grams": 100}]}
+    nutrition_calls = []
+
+    async def generate(params, on_value=None):
+        for key, value in recipe.items():
+            await on_value(key, value)
+            if key == "Ingredients":
+                pytest.fail("Generation continued after the ingredients broke the allergies.")
+        return recipe
+
+    async def nutrition(recipe, use_cache=False, local_only=False):
+        nutrition_calls.append(recipe)
+        return {"calories": 100}
+
+    monkeypatch.setattr(create_recipes, "generate_single_recipe", generate)
+    monkeypatch.setattr(create_recipes, "calculate_nutrition", nutrition)
+
+    assert await create_recipes.generate_candidate(Recipe(allergiesList=["peanuts"])) is None
+    assert nutrition_calls == []
+
+
+@pytest.mark.asyncio
+async def test_early_nutrition_falls_back_to_the_whole_recipe(monkeypatch):
+    nutrition_calls = []
+
+    async def generate(params, on_value=None):
+        for key, value in RECIPE.items():
+            await on_value(key, value)
+        return dict(RECIPE)
+
+    async def nutrition(recipe, use_cache=False, local_only=False):
+        nutrition_calls.append((sorted(recipe), local_only))
+        return None if local_only else {"calories": 100}
+
+    async def validate(recipe, use_cache=False):
+        return "Yes"
+
+    monkeypatch.setattr(create_recipes, "generate_single_recipe", generate)
+    monkeypatch.setattr(create_recipes, "calculate_nutrition", nutrition)
+    monkeypatch.setattr(create_recipes, "validate_recipe", validate)
+    monkeypatch.setattr(create_recipes, "DEDUP_ENABLED", False)
+
+    recipe = await create_recipes.generate_candidate(Recipe())
+    assert recipe["nutrition"] == {"calories": 100}
+    assert nutrition_calls == [(["Ingredients"], True), (sorted(RECIPE), False)]
@@ -0,0 +1,45 @@
+import asyncio
+
+import openai
+import pytest
+
+from app.core.llm import LLMClient
+from tests.fake_llm import FakeLLMServer
+
+
+@pytest.fixture
+def fake_llm():
+    with FakeLLMServer(reply="  Yes  ", latency=0.1) as server:
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_returns_stripped_content(fake_llm):
+    client = LLMClient(api_key="test", base_url=fake_llm.base_url)
+    try:
+        assert await client.chat_completion("Is this realistic?") == "Yes"
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_in_flight_requests_are_limited(fake_llm):
+    client = LLMClient(api_key="test", base_url=fake_llm.base_url, max_concurrency=2)
+    try:
+        results = await asyncio.gather(*(client.chat_completion(f"prompt {i}") for i in range(6)))
+    finally:
+        await client.aclose()
+
+    assert results == ["Yes"] * 6
+    assert fake_llm.requests == 6
+    assert fake_llm.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_per_call_timeout(fake_llm):
+    client = LLMClient(api_key="test", base_url=fake_llm.base_url, max_retries=0)
+    try:
+        with pytest.raises(openai.APITimeoutError):
+            await client.chat_completion("slow", timeout=0.01)
+    finally:
+        await client.aclose()
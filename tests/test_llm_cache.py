@@ -0,0 +1,71 @@
+import pytest
+
+from app.core.llm_cache import LLMCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_key_ignores_payload_key_order():
+    first = LLMCache.make_key("gpt-4o", "template {recipe}", {"Name": "Soup", "CookingTime": "20"})
+    second = LLMCache.make_key("gpt-4o", "template {recipe}", {"CookingTime": "20", "Name": "Soup"})
+
+    assert first == second
+    assert first != LLMCache.make_key("gpt-4o-mini", "template {recipe}", {"Name": "Soup", "CookingTime": "20"})
+    assert first != LLMCache.make_key("gpt-4o", "other {recipe}", {"Name": "Soup", "CookingTime": "20"})
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_is_lru_bounded(clock):
+    cache = LLMCache(path=None, max_memory_entries=2, clock=clock)
+    await cache.set("a", "1")
+    await cache.set("b", "2")
+    assert await cache.get("a") == "1"
+    await cache.set("c", "3")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "1"
+    assert await cache.get("c") == "3"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.75
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = LLMCache(path=str(tmp_path / "cache.db"), ttl=60, clock=clock)
+    await cache.set("key", "value")
+    clock.now += 61
+
+    assert await cache.get("key") is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart_and_is_bounded(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = LLMCache(path=path, max_disk_entries=2, clock=clock)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        await cache.set(key, key.upper())
+    cache.close()
+
+    reopened = LLMCache(path=path, clock=clock)
+    assert await reopened.get("a") is None
+    assert await reopened.get("c") == "C"
+    assert reopened.stats()["disk_hits"] == 1
+    assert await reopened.get("c") == "C"
+    assert reopened.stats()["memory_hits"] == 1
+    reopened.close()
@@ -0,0 +1,83 @@
+import json
+import logging
+import queue
+import threading
+
+from app.logging_config import (
+    JsonFormatter,
+    LazyQueueHandler,
+    LogListener,
+    SamplingFilter,
+    TextFormatter,
+    render_message,
+)
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class FormattedIn:
+    """An argument recording the thread that turns it into text."""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return "recipe"
+
+
+def record(msg, *args, **extra):
+    return logging.makeLogRecord({"name": "app_logger", "levelno": logging.INFO, "levelname": "INFO",
+                                  "msg": msg, "args": args, **extra})
+
+
+def test_messages_are_formatted_by_the_listener_thread():
+    collected = CollectingHandler()
+    collected.setFormatter(TextFormatter())
+    handler = LazyQueueHandler(queue.Queue(10))
+    listener = LogListener(handler.queue, collected)
+    test_logger = logging.getLogger("test_lazy_logging")
+    test_logger.propagate = False
+    test_logger.addHandler(handler)
+    argument = FormattedIn()
+
+    listener.start()
+    test_logger.warning("Generated %s", argument)
+    listener.stop()
+
+    assert collected.lines[0].endswith("Generated recipe")
+    assert argument.threads and threading.current_thread().name not in argument.threads
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = LazyQueueHandler(queue.Queue(2))
+    for number in range(5):
+        handler.handle(record("Record %s", number))
+    assert (handler.queue.qsize(), handler.dropped) == (2, 3)
+
+
+def test_json_records_carry_extras_and_truncate_large_arguments():
+    recipe = {"Name": "Risotto", "Ingredients": ["rice"] * 1000}
+    line = json.loads(JsonFormatter().format(record("Recipe generated: %s", recipe, recipe_id="abc")))
+
+    assert (line["level"], line["logger"], line["recipe_id"]) == ("INFO", "app_logger", "abc")
+    assert line["message"].startswith("Recipe generated: {'Name': 'Risotto'")
+    assert line["message"].endswith("more characters)")
+    assert render_message(record("%s of %s", 3, 4)) == "3 of 4"
+    assert render_message(record("Score %.2f", 0.456)) == "Score 0.46"
+
+
+def test_sampling_keeps_a_share_of_configured_messages():
+    sampling = SamplingFilter({"Recipe generated: %s": 0.2})
+    kept = sum(sampling.filter(record("Recipe generated: %s", number)) for number in range(2000))
+
+    assert 300 < kept < 500
+    assert all(sampling.filter(record("Recipe saved")) for _ in range(100))
+    assert not any(sampling.filter(record("Chatty", sample_rate=0.0)) for _ in range(100))
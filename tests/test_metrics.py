@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import create_recipes
+from app.core.llm import LLMClient
+from app.core.metrics import instrument_engine, registry
+from app.main import app
+from app.schemas.recipe_schemas import Recipe
+from tests.fake_llm import FakeLLMServer
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_stage_latency_and_candidates_are_recorded(monkeypatch):
+    verdicts = iter(["No", "Yes"])
+
+    async def generate(params, on_value=None):
+        return {"Name": "Soup", "CookingTime": "10 minutes", "Ingredients": [{"Name": "carrot", "grams": 200}],
+                "Step-by-step directions": ["Boil."], "status": "ACTIVE"}
+
+    async def nutrition(recipe, use_cache=False, local_only=False):
+        return {"calories": 80}
+
+    async def validate(recipe, use_cache=False):
+        return next(verdicts)
+
+    monkeypatch.setattr(create_recipes, "generate_single_recipe", generate)
+    monkeypatch.setattr(create_recipes, "calculate_nutrition", nutrition)
+    monkeypatch.setattr(create_recipes, "validate_recipe", validate)
+    before = {stage: sample("recipe_stage_duration_seconds_count", stage=stage)
+              for stage in ("generate", "nutrition", "validate")}
+    rejected = sample("recipe_stage_outcomes_total", stage="validate", outcome="rejected")
+    candidates = sample("recipe_candidates_per_recipe_sum")
+
+    await create_recipes.generate_valid_recipe(Recipe(maxCooking=30))
+
+    for stage, count in before.items():
+        assert sample("recipe_stage_duration_seconds_count", stage=stage) == count + 2
+    assert sample("recipe_stage_outcomes_total", stage="validate", outcome="rejected") == rejected + 1
+    assert sample("recipe_candidates_per_recipe_sum") == candidates + 2
+
+
+@pytest.mark.asyncio
+async def test_llm_tokens_come_from_the_usage():
+    before = sample("llm_tokens_total", model="gpt-4o", kind="completion")
+    with FakeLLMServer(reply="one two three") as server:
+        client = LLMClient(api_key="test", base_url=server.base_url)
+        try:
+            await client.chat_completion("prompt", model="gpt-4o")
+        finally:
+            await client.aclose()
+
+    assert sample("llm_tokens_total", model="gpt-4o", kind="completion") == before + 3
+    assert sample("llm_tokens_total", model="gpt-4o", kind="prompt") > 0
+
+
+@pytest.mark.asyncio
+async def test_db_queries_are_timed(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'metrics.db'}")
+    instrument_engine(engine)
+    before = sample("db_query_duration_seconds_count", operation="SELECT")
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    await engine.dispose()
+
+    assert sample("db_query_duration_seconds_count", operation="SELECT") == before + 1
+
+
+def test_queue_wait_is_measured_from_the_publish_header():
+    headers = {}
+    create_recipes.stamp_enqueued_at(headers=headers)
+    headers["enqueued_at"] -= 2
+    task = SimpleNamespace(name="generate_recipe_task", request=SimpleNamespace(get=headers.get))
+
+    create_recipes.observe_queue_wait(task=task)
+
+    assert 2 <= sample("celery_queue_wait_seconds_sum", task="generate_recipe_task") < 3
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_prometheus_text():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE recipe_stage_duration_seconds histogram" in response.text
+    assert "llm_circuit_open 0.0" in response.text
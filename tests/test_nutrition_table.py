@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+from app.core import nutritional_calculator
+from app.core.nutrition_table import NutritionTable
+
+
+@pytest.fixture
+def table(tmp_path):
+    foods = {"olive oil": [884, 0, 100, 0], "oil": [880, 0, 99, 0], "chickpea": [164, 8.9, 2.6, 27],
+             "onion": [40, 1.1, 0.1, 9.3]}
+    return NutritionTable(foods, {"onion": 110}, learned_path=str(tmp_path / "learned.json"))
+
+
+def test_resolves_the_most_specific_food(table):
+    assert table.resolve("Extra virgin olive oil") == table.resolve("olive oil")
+    assert table.resolve("Canned chickpeas") == table.resolve("chickpea")
+    assert table.resolve("Sunflower oil") == table.resolve("oil")
+    assert table.resolve("Saffron") is None
+
+
+def test_computes_totals_from_mixed_units(table):
+    quantities = table.quantities([
+        {"Name": "Chickpeas", "grams": "200g"},
+        {"Name": "Olive oil", "tablespoons": 2},
+        {"Name": "Onion", "piece": 1},
+    ])
+
+    assert quantities == [("Chickpeas", 200.0), ("Olive oil", 30.0), ("Onion", 110.0)]
+    assert table.compute(quantities) == {"calories": 637, "protein": 19.0, "fat": 35.3,
+                                         "carbohydrates": 64.2, "totalWeight": 340}
+    assert table.compute([("Onion", None)]) is None
+
+
+def test_learned_values_are_saved_separately(table):
+    table.learn({"Saffron": [310, 11.4, 5.9, 65]})
+
+    assert table.resolve("saffron") is not None
+    assert not os.path.exists(table.learned_path)
+    table.save()
+    assert json.load(open(table.learned_path)) == {"saffron": [310, 11.4, 5.9, 65]}
+
+
+@pytest.mark.asyncio
+async def test_llm_is_asked_only_for_unknown_ingredients(table, monkeypatch):
+    prompts = []
+
+    async def chat_completion(prompt, cache_key=None):
+        prompts.append(prompt)
+        return json.dumps({"Saffron": {"calories": 310, "protein": 11.4, "fat": 5.9, "carbohydrates": 65}})
+
+    monkeypatch.setattr(nutritional_calculator, "chat_completion", chat_completion)
+    monkeypatch.setattr(nutritional_calculator, "get_nutrition_table", lambda: table)
+    recipe = {"Ingredients": [{"Name": "Chickpeas", "grams": 100}, {"Name": "Saffron", "grams": 1}]}
+
+    first = await nutritional_calculator.calculate_nutrition(recipe)
+    second = await nutritional_calculator.calculate_nutrition(recipe)
+
+    assert first == second == {"calories": 167, "protein": 9.0, "fat": 2.7, "carbohydrates": 27.6,
+                               "totalWeight": 101}
+    assert len(prompts) == 1
+    assert "Saffron" in prompts[0] and "Chickpeas" not in prompts[0]
+    assert json.load(open(table.learned_path)) == {"saffron": [310, 11.4, 5.9, 65]}
+
+
+@pytest.mark.asyncio
+async def test_local_only_does_not_ask_about_the_whole_recipe(table, monkeypatch):
+    async def chat_completion(prompt, cache_key=None):
+        pytest.fail("The LLM was asked about a partial recipe.")
+
+    monkeypatch.setattr(nutritional_calculator, "chat_completion", chat_completion)
+    monkeypatch.setattr(nutritional_calculator, "get_nutrition_table", lambda: table)
+
+    assert await nutritional_calculator.calculate_nutrition({"Ingredients": [{"Name": "Onion"}]},
+                                                            local_only=True) is None
+
+
+def test_matches_need_the_same_head_noun():
+    table = NutritionTable.load(learned_path=None)
+
+    def food(name):
+        index = table.resolve(name)
+        return table._names[index] if index is not None else None
+
+    assert food("Ground black pepper") == "black pepper"
+    assert food("Green pepper") == "green pepper"
+    assert food("Chili pepper") == "chili pepper"
+    assert food("Jalapeno pepper") == "jalapeno pepper"
+    assert food("Red pepper flakes") == "red pepper flakes"
+    assert food("Vanilla ice cream") == "ice cream"
+    assert food("Garlic cloves") == "garlic"
+    assert food("Olive oil, extra virgin") == "olive oil"
+    assert food("Lemon zest") is None
@@ -0,0 +1,70 @@
+import pytest
+
+from app.core import create_recipes
+from app.core.prevalidator import prevalidate_recipe
+from app.schemas.recipe_schemas import Recipe
+
+
+@pytest.fixture
+def recipe():
+    return {
+        "Name": "Chickpea curry",
+        "CookingTime": "35 minutes",
+        "Ingredients": [{"Name": "Chickpeas", "grams": 400, "piece": 0}, {"Name": "Coconut milk", "ml": 400},
+                        {"Name": "Onion", "piece": 1}],
+        "Step-by-step directions": ["Fry the onion.", "Add the chickpeas and coconut milk."],
+    }
+
+
+def rules(result):
+    return [issue.rule for issue in result.issues]
+
+
+def test_accepts_a_recipe_matching_the_parameters(recipe):
+    params = Recipe(amountOfPersons=2, maxCooking=40, allergiesList=["dairy", "nuts"], dietRequirements=["vegan"])
+
+    assert prevalidate_recipe(recipe, params).passed
+
+
+def test_rejects_cooking_time_allergens_and_diet(recipe):
+    recipe["CookingTime"] = "1 hour 10 minutes"
+    recipe["Ingredients"] += [{"Name": "Greek yogurt", "grams": 100}, {"Name": "Toasted cashews", "grams": 30}]
+    params = Recipe(amountOfPersons=2, maxCooking=40, allergiesList=["nuts"], dietRequirements=["vegan"])
+
+    result = prevalidate_recipe(recipe, params)
+
+    assert not result.passed
+    assert rules(result) == ["cooking_time", "allergen", "diet"]
+    assert result.issues[1].ingredient == "Toasted cashews"
+    assert "70 minutes exceeds 40 minutes" in result.reason
+
+
+def test_rejects_missing_steps_and_absurd_quantities(recipe):
+    recipe["Step-by-step directions"] = [" "]
+    recipe["Ingredients"][0]["grams"] = 20000
+    recipe["Ingredients"][1]["ml"] = -5
+
+    result = prevalidate_recipe(recipe, Recipe(amountOfPersons=1))
+
+    assert rules(result) == ["steps", "quantity", "quantity"]
+
+
+@pytest.mark.asyncio
+async def test_rejected_candidates_skip_the_llm_stages(recipe, monkeypatch):
+    calls = []
+
+    async def generate(params, on_value=None):
+        return dict(recipe, CookingTime="2 hours")
+
+    async def nutrition(recipe, use_cache=False, local_only=False):
+        calls.append("nutrition")
+
+    async def validate(recipe, use_cache=False):
+        calls.append("validate")
+
+    monkeypatch.setattr(create_recipes, "generate_single_recipe", generate)
+    monkeypatch.setattr(create_recipes, "calculate_nutrition", nutrition)
+    monkeypatch.setattr(create_recipes, "validate_recipe", validate)
+
+    assert await create_recipes.generate_candidate(Recipe(maxCooking=60)) is None
+    assert calls == []
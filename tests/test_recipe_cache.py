@@ -0,0 +1,149 @@
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from app.core import recipe_cache
+from app.core.recipe_cache import CachedResponse, RecipeCache
+from app.db import engine, init_db
+from app.db.crud import save_recipe
+from app.db.database import AsyncSessionLocal
+from app.main import app
+from app.schemas.recipe_schemas import Recipe
+from tests.fake_redis import FakeRedis
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Loader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class BrokenRedis:
+    async def get(self, key):
+        raise ConnectionError("redis is down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis is down")
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_lru_bounded_and_expires():
+    clock = FakeClock()
+    cache = RecipeCache(max_entries=2, local_ttl=5, clock=clock)
+    first, second, third = uuid4(), uuid4(), uuid4()
+    load = Loader((b'{"name":"Soup"}', "etag"))
+
+    assert await cache.get_recipe(first, load) == CachedResponse(b'{"name":"Soup"}', "etag")
+    await cache.get_recipe(first, load)
+    await cache.get_recipe(second, load)
+    await cache.get_recipe(third, load)
+    assert load.calls == 3
+    await cache.get_recipe(first, load)
+    assert load.calls == 4
+
+    clock.now += 6
+    await cache.get_recipe(first, load)
+    assert load.calls == 5
+
+    missing = Loader(None)
+    assert await cache.get_recipe(uuid4(), missing) is None
+    stats = cache.stats()
+    assert (stats["local_hits"], stats["misses"], stats["evictions"]) == (1, 6, 2)
+    assert stats["hit_rate"] == 1 / 7
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_is_invalidated_across_processes():
+    clock = FakeClock()
+    redis = FakeRedis()
+    api, worker = (RecipeCache(local_ttl=5, ttl=300, redis_client=redis, clock=clock) for _ in range(2))
+    recipe_id = uuid4()
+    query = {"path": "/recipes", "limit": 20}
+
+    await api.get_recipe(recipe_id, Loader((b"{}", "old")))
+    assert (await worker.get_recipe(recipe_id, Loader((b"{}", "other")))).etag == "old"
+    await api.get_page(query, Loader(CachedResponse(b"[]", "page", "next")))
+    assert await worker.get_page(query, Loader(None)) == CachedResponse(b"[]", "page", "next")
+    assert worker.stats()["redis_hits"] == 2 and set(redis.expiries.values()) == {300}
+
+    await worker.invalidate([recipe_id])
+    clock.now += 6
+    assert (await api.get_recipe(recipe_id, Loader((b"{}", "new")))).etag == "new"
+    assert (await api.get_page(query, Loader(CachedResponse(b"[{}]", "new page")))).etag == "new page"
+
+
+@pytest.mark.asyncio
+async def test_loads_racing_an_invalidation_are_not_cached():
+    redis = FakeRedis()
+    api, worker = (RecipeCache(redis_client=redis) for _ in range(2))
+    recipe_id = uuid4()
+
+    # The old version is read, then the change is committed and invalidated before the read stores it.
+    async def load_during_commit(committer):
+        await committer.invalidate([recipe_id])
+        return b"{}", "old"
+
+    assert (await api.get_recipe(recipe_id, lambda: load_during_commit(api))).etag == "old"
+    assert (await api.get_recipe(recipe_id, Loader((b"{}", "new")))).etag == "new"
+
+    await RecipeCache(redis_client=redis).get_recipe(recipe_id, lambda: load_during_commit(worker))
+    assert redis.values[f"recipe_cache:recipe:{recipe_id}"] == b""
+    assert (await RecipeCache(redis_client=redis).get_recipe(recipe_id, Loader((b"{}", "new")))).etag == "new"
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_fall_back_to_the_database():
+    cache = RecipeCache(redis_client=BrokenRedis())
+    load = Loader((b"{}", "etag"))
+
+    assert (await cache.get_recipe(uuid4(), load)).etag == "etag"
+    assert load.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_routes_read_through_and_invalidate(monkeypatch):
+    monkeypatch.setattr(recipe_cache, "_cache", RecipeCache(local_ttl=60))
+    await init_db()
+    cuisine = f"Cuisine-{uuid4().hex[:8]}"
+    recipe = {"Name": "Soup", "CookingTime": "20 minutes", "RequiredTools": ["pot"],
+              "Ingredients": [{"Name": "rice", "grams": 100}], "Step-by-step directions": ["Cook."],
+              "nutrition": {"calories": 300}, "status": "ACTIVE"}
+    recipe_id = str(uuid4())
+    async with AsyncSessionLocal() as db:
+        await save_recipe(db, recipe, recipe_id, Recipe(cuisineList=[cuisine]))
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.get(f"/recipe/{recipe_id}")).json()["status"] == "ACTIVE"
+        assert (await client.get(f"/recipe/{recipe_id}")).json()["status"] == "ACTIVE"
+        await client.patch(f"/recipe/{recipe_id}/status", params={"status": "FROZEN"})
+        assert (await client.get(f"/recipe/{recipe_id}")).json()["status"] == "FROZEN"
+
+        assert [r["name"] for r in (await client.get("/recipes", params={"cuisine": cuisine})).json()] == ["Soup"]
+        await client.put(f"/recipe/{recipe_id}", json={"name": "Stew", "cooking_time": "20 minutes",
+                                                       "ingredients": recipe["Ingredients"], "status": "FROZEN"})
+        assert [r["name"] for r in (await client.get("/recipes", params={"cuisine": cuisine})).json()] == ["Stew"]
+
+        async with AsyncSessionLocal() as db:
+            await save_recipe(db, {**recipe, "Name": "Salad"}, str(uuid4()), Recipe(cuisineList=[cuisine]))
+        page = await client.get("/recipes", params={"cuisine": cuisine})
+        assert sorted(r["name"] for r in page.json()) == ["Salad", "Stew"]
+        await client.get("/recipes", params={"cuisine": cuisine})
+
+        stats = (await client.get("/recipes/cache")).json()
+        assert (stats["enabled"], stats["shared"]) == (True, False)
+        assert (stats["local_hits"], stats["misses"], stats["invalidations"]) == (2, 5, 4)
+        assert stats["hit_rate"] == 2 / 7
+    await engine.dispose()
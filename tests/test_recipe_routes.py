@@ -1,16 +1,30 @@
+import asyncio
+import json
+
 import pytest
+import pytest_asyncio
 import httpx
-from uuid import uuid4
+from uuid import UUID, uuid4
 from fastapi.testclient import TestClient
+from sqlalchemy import select, update
 
-from app.db import init_db
+from app.core.recipe_cache import get_recipe_cache
+from app.db import init_db, engine
+from app.db.crud import recipe_row, save_recipes
+from app.db.database import AsyncSessionLocal
+from app.db.models import Recipe as RecipeModel
 from app.main import app
+from app.schemas.recipe_schemas import Recipe
 
 client = TestClient(app)
 
 @pytest.fixture(scope="session", autouse=True)
-async def setup_database():
-    await init_db()
+def setup_database():
+    async def create_schema():
+        await init_db()
+        await engine.dispose()
+
+    asyncio.run(create_schema())
     yield
 
 @pytest.fixture
@@ -40,6 +54,17 @@ async def test_generate_recipe(sample_recipe):
         assert "recipe_id" in data
         assert data["status"] == "Recipe generation started"
 
+@pytest.mark.asyncio
+async def test_batch_rejects_invalid_chunks(sample_recipe):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        response = await async_client.post("/generate_recipe/batch", params={"count": 2},
+                                           json={"params": sample_recipe, "seed": -1})
+        assert response.status_code == 422
+
+        response = await async_client.post("/generate_recipe/batch", params={"count": 2},
+                                           json={"params": sample_recipe, "weights": {"Atlantis": 1}})
+        assert response.status_code == 400
+
 @pytest.mark.asyncio
 async def test_update_recipe_status():
     """Test updating the status of a recipe to FROZEN and ACTIVE."""
@@ -82,3 +107,215 @@ async def test_get_all_recipes():
         assert isinstance(response.json(), list)
 
 
+
+
+@pytest_asyncio.fixture
+async def stored_recipes():
+    """Stores five recipes of a cuisine unique to the test and returns their IDs."""
+    cuisine = f"Cuisine-{uuid4().hex[:8]}"
+    rows = [
+        recipe_row({
+            "Name": f"Recipe {number}",
+            "CookingTime": f"{(number + 1) * 10} minutes",
+            "RequiredTools": ["pan"],
+            "Ingredients": [{"Name": "rice", "grams": 100}],
+            "Step-by-step directions": ["Cook."],
+            "nutrition": {"calories": 300},
+            "status": "FROZEN" if number == 4 else "ACTIVE",
+        }, str(uuid4()), Recipe(cuisineList=[cuisine], dishType="main"))
+        for number in range(5)
+    ]
+    async with AsyncSessionLocal() as db:
+        await save_recipes(db, rows)
+    return cuisine, sorted(str(row["id"]) for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_get_recipes_pages_with_cursor(stored_recipes):
+    cuisine, ids = stored_recipes
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        first = await async_client.get("/recipes", params={"cuisine": cuisine, "limit": 3})
+        assert [recipe["id"] for recipe in first.json()] == ids[:3]
+        assert first.headers["X-Next-Cursor"] == ids[2]
+
+        second = await async_client.get("/recipes", params={"cuisine": cuisine, "limit": 3,
+                                                            "cursor": first.headers["X-Next-Cursor"]})
+        assert [recipe["id"] for recipe in second.json()] == ids[3:]
+        assert "X-Next-Cursor" not in second.headers
+
+
+@pytest.mark.asyncio
+async def test_recipes_are_served_from_stored_responses_with_etags(stored_recipes):
+    cuisine, ids = stored_recipes
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        response = await async_client.get(f"/recipe/{ids[0]}")
+        etag, recipe = response.headers["ETag"], response.json()
+        assert (recipe["id"], recipe["cuisine"]) == (ids[0], cuisine)
+
+        response = await async_client.get(f"/recipe/{ids[0]}", headers={"If-None-Match": etag})
+        assert (response.status_code, response.content) == (304, b"")
+
+        # The IDs are sorted, so the first recipe may be the frozen one.
+        status = "ACTIVE" if recipe["status"] == "FROZEN" else "FROZEN"
+        await async_client.patch(f"/recipe/{ids[0]}/status", params={"status": status})
+        response = await async_client.get(f"/recipe/{ids[0]}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["status"] == status and response.headers["ETag"] != etag
+
+        page = await async_client.get("/recipes", params={"cuisine": cuisine, "limit": 3})
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "limit": 3},
+                                          headers={"If-None-Match": page.headers["ETag"]})
+        assert response.status_code == 304 and response.headers["X-Next-Cursor"] == ids[2]
+
+        # The dedup freeze drops the stored responses, which are then encoded on read and stored again.
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(RecipeModel).where(RecipeModel.id.in_([UUID(ids[1]), UUID(ids[3])]))
+                             .values(name="Renamed", response_json=None, etag=None))
+            await db.commit()
+        await get_recipe_cache().invalidate([UUID(ids[1]), UUID(ids[3])])
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "limit": 3},
+                                          headers={"If-None-Match": page.headers["ETag"]})
+        assert response.status_code == 200 and response.json()[1]["name"] == "Renamed"
+        response = await async_client.get(f"/recipe/{ids[3]}")
+        assert response.json()["name"] == "Renamed"
+        etags = await stored_etags([ids[1], ids[3]])
+        assert etags[ids[3]] == response.headers["ETag"].strip('"') and etags[ids[1]] is not None
+
+
+async def stored_etags(ids):
+    """Reads the ETags of the stored responses of recipes, None where no response is stored."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(RecipeModel.id, RecipeModel.etag)
+                                  .where(RecipeModel.id.in_([UUID(recipe_id) for recipe_id in ids])))
+        return {str(recipe_id): etag for recipe_id, etag in result}
+
+
+@pytest.mark.asyncio
+async def test_edit_changes_only_given_fields(stored_recipes):
+    cuisine, ids = stored_recipes
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        before = (await async_client.get(f"/recipe/{ids[0]}")).json()
+        response = await async_client.put(f"/recipe/{ids[0]}", json={"cooking_time": "1 hour",
+                                                                     "ingredients": [{"Name": "chickpeas"}]})
+        edited = response.json()
+        assert {**before, "cooking_time": "1 hour", "cooking_minutes": 60,
+                "ingredients": [{"Name": "chickpeas"}]} == edited
+
+        assert await stored_etags(ids[:1]) == {ids[0]: response.headers["ETag"].strip('"')}
+        response = await async_client.get(f"/recipe/{ids[0]}", headers={"If-None-Match": response.headers["ETag"]})
+        assert response.status_code == 304
+        found = await async_client.get("/recipes/search", params={"ingredient": "chickpea", "cuisine": cuisine})
+        assert [recipe["id"] for recipe in found.json()] == [ids[0]]
+
+
+@pytest.mark.asyncio
+async def test_edit_rejects_nulls(stored_recipes):
+    cuisine, ids = stored_recipes
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        before = (await async_client.get(f"/recipe/{ids[0]}")).json()
+        for field in ("name", "cooking_time", "required_tools", "ingredients", "steps", "nutrition", "status"):
+            response = await async_client.put(f"/recipe/{ids[0]}", json={field: None})
+            assert response.status_code == 422
+        assert (await async_client.get(f"/recipe/{ids[0]}")).json() == before
+
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "format": "ndjson"})
+        assert len(response.text.splitlines()) == 5
+
+
+@pytest.mark.asyncio
+async def test_bulk_status_update(stored_recipes):
+    cuisine, ids = stored_recipes
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        frozen = await async_client.get("/recipes", params={"cuisine": cuisine, "status": "FROZEN"})
+        response = await async_client.patch("/recipes/status", json={"status": "FROZEN", "ids": ids})
+        assert response.json() == {"status": "updated", "updated": 4}
+        assert None not in (await stored_etags(ids)).values()
+        assert (await async_client.get(f"/recipe/{ids[0]}")).json()["status"] == "FROZEN"
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "status": "FROZEN"},
+                                          headers={"If-None-Match": frozen.headers["ETag"]})
+        assert response.status_code == 200 and len(response.json()) == 5
+
+        response = await async_client.patch("/recipes/status",
+                                            json={"status": "ACTIVE", "filters": {"cuisine": cuisine}})
+        assert response.json()["updated"] == 5
+        active = await async_client.get("/recipes", params={"cuisine": cuisine, "status": "ACTIVE"})
+        assert len(active.json()) == 5
+
+        for selection in ({}, {"ids": []}, {"filters": {}}, {"ids": ids, "filters": {"cuisine": cuisine}}):
+            response = await async_client.patch("/recipes/status", json={"status": "FROZEN", **selection})
+            assert response.status_code == 422
+        assert len((await async_client.get("/recipes", params={"cuisine": cuisine, "status": "ACTIVE"})).json()) == 5
+
+
+@pytest.mark.asyncio
+async def test_get_recipes_filters(stored_recipes):
+    cuisine, ids = stored_recipes
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "status": "ACTIVE",
+                                                              "max_cooking_time": 30, "dish_type": "main"})
+        assert sorted(recipe["name"] for recipe in response.json()) == ["Recipe 0", "Recipe 1", "Recipe 2"]
+
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "dish_type": "dessert"})
+        assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_get_recipes_streams_ndjson(stored_recipes):
+    cuisine, ids = stored_recipes
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "format": "ndjson"})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [recipe["id"] for recipe in lines] == ids
+
+
+@pytest.mark.asyncio
+async def test_get_recipes_loads_only_requested_fields(stored_recipes):
+    cuisine, ids = stored_recipes
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "fields": "name,status"})
+        first = response.json()[0]
+        assert set(first) == {"id", "name", "status"}
+        assert first["id"] == ids[0]
+
+        response = await async_client.get("/recipes", params={"cuisine": cuisine, "fields": "summary",
+                                                              "format": "ndjson"})
+        summary = json.loads(response.text.splitlines()[0])
+        assert set(summary) == {"id", "name", "status", "cooking_time", "cuisine", "dish_type"}
+
+        response = await async_client.get("/recipes", params={"fields": "name,secret"})
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_recipes_by_ingredient_allergen_and_calories():
+    cuisine = f"Cuisine-{uuid4().hex[:8]}"
+    recipes = {
+        "Chickpea curry": (["Canned chickpeas", "Coconut milk", "Rice"], "450 kcal"),
+        "Chickpea gratin": (["Chickpeas", "Parmesan cheese"], "700 kcal"),
+        "Rice bowl": (["Rice", "Tofu"], "400 kcal"),
+    }
+    rows = {
+        name: recipe_row({
+            "Name": name, "CookingTime": "30 minutes", "RequiredTools": [], "status": "ACTIVE",
+            "Ingredients": [{"Name": ingredient, "grams": 100} for ingredient in ingredients],
+            "Step-by-step directions": ["Cook."], "nutrition": {"calories": calories},
+        }, str(uuid4()), Recipe(cuisineList=[cuisine]))
+        for name, (ingredients, calories) in recipes.items()
+    }
+    async with AsyncSessionLocal() as db:
+        await save_recipes(db, list(rows.values()))
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+        async def search(**params):
+            response = await async_client.get("/recipes/search", params={"cuisine": cuisine, **params})
+            assert response.status_code == 200
+            return sorted(recipe["name"] for recipe in response.json())
+
+        assert await search(ingredient="chickpeas") == ["Chickpea curry", "Chickpea gratin"]
+        assert await search(ingredient="chickpeas", exclude_allergen="dairy") == ["Chickpea curry"]
+        assert await search(max_calories=500) == ["Chickpea curry", "Rice bowl"]
+        assert await search(ingredient="rice", exclude_allergen="soy") == ["Chickpea curry"]
+
+        response = await async_client.get("/recipes/search", params={"exclude_allergen": "gravel"})
+        assert response.status_code == 400
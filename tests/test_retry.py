@@ -0,0 +1,180 @@
+import random
+
+import httpx
+import pytest
+
+from app.core import llm, retry
+from app.core.json_stream import StreamAborted
+from app.core.prevalidator import RecipeRejected
+from app.core.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudgetExceeded,
+    RetryExhausted,
+    RetryPolicy,
+    retry_stats,
+    task_budget,
+)
+from app.schemas.recipe_schemas import PrevalidationResult
+from tests.fake_llm import FakeLLMServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    retry.reset_retry_stats()
+    monkeypatch.setattr(retry, "_circuit_breaker", CircuitBreaker(failure_threshold=3, reset_timeout=60))
+    monkeypatch.setattr(llm, "LLM_RETRY_POLICY", RetryPolicy(max_attempts=4, base_delay=0.001, max_delay=0.01))
+
+
+def test_backoff_grows_with_jitter_and_honors_retry_after():
+    policy = RetryPolicy(base_delay=1, max_delay=8, rng=random.Random(0))
+
+    delays = [policy.delay(attempt) for attempt in range(6) for _ in range(50)]
+    assert all(0 <= delay <= 8 for delay in delays)
+    assert max(delays[:50]) <= 1 < max(delays[100:150])
+    assert policy.delay(0, retry_after=5) >= 5
+
+
+@pytest.mark.asyncio
+async def test_invalid_results_are_retried_until_exhausted():
+    results = iter([None, None, "ok"])
+
+    async def operation():
+        return next(results)
+
+    assert await retry.retry("stage", operation, RetryPolicy(max_attempts=3, base_delay=0)) == "ok"
+
+    async def always_invalid():
+        return None
+
+    with pytest.raises(RetryExhausted):
+        await retry.retry("stage", always_invalid, RetryPolicy(max_attempts=2, base_delay=0))
+    assert retry_stats()["stage"] == {"exhausted": 1, "invalid": 4, "retry": 3, "success": 1}
+
+
+def test_circuit_breaker_opens_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 30
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_are_retried(monkeypatch):
+    with FakeLLMServer(reply="Yes", fail_first=2, fail_status=429, retry_after=0.01) as server:
+        client = llm.LLMClient(api_key="test", base_url=server.base_url)
+        monkeypatch.setattr(llm, "get_llm_client", lambda: client)
+        try:
+            assert await llm.chat_completion("Is this realistic?") == "Yes"
+        finally:
+            await client.aclose()
+
+    assert server.requests == 3
+    assert retry_stats()["llm"] == {"rate_limited": 2, "retry": 2, "success": 1}
+    assert retry.get_circuit_breaker().state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_outage_opens_the_circuit_and_fails_fast(monkeypatch):
+    with FakeLLMServer(fail_first=100, fail_status=503) as server:
+        client = llm.LLMClient(api_key="test", base_url=server.base_url)
+        monkeypatch.setattr(llm, "get_llm_client", lambda: client)
+        try:
+            with pytest.raises(CircuitOpenError):
+                await llm.chat_completion("prompt")
+            with pytest.raises(CircuitOpenError):
+                await llm.chat_completion("prompt")
+        finally:
+            await client.aclose()
+
+    assert server.requests == 3
+    assert retry_stats()["llm"]["circuit_open"] == 2
+
+
+@pytest.mark.asyncio
+async def test_only_answered_requests_keep_the_circuit_closed():
+    breaker = retry.get_circuit_breaker()
+
+    async def broken_stream():
+        raise httpx.RemoteProtocolError("peer closed connection without sending complete message body")
+
+    async def rejected():
+        raise RecipeRejected(PrevalidationResult(passed=False))
+
+    for _ in range(2):
+        with pytest.raises(httpx.RemoteProtocolError):
+            await llm.call_llm(broken_stream)
+    assert breaker.failures == 2
+    with pytest.raises(RecipeRejected):
+        await llm.call_llm(rejected)
+    assert breaker.failures == 0
+
+    for _ in range(3):
+        with pytest.raises(httpx.RemoteProtocolError):
+            await llm.call_llm(broken_stream)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_aborted_streams_keep_the_circuit_closed(monkeypatch):
+    with FakeLLMServer(reply="not json") as server:
+        client = llm.LLMClient(api_key="test", base_url=server.base_url)
+        monkeypatch.setattr(llm, "get_llm_client", lambda: client)
+        try:
+            for _ in range(5):
+                with pytest.raises(StreamAborted):
+                    await llm.stream_chat_json("prompt", ["Name"])
+        finally:
+            await client.aclose()
+
+    assert server.requests == 5
+    assert retry.get_circuit_breaker().state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_task_budget_limits_llm_attempts(monkeypatch):
+    with FakeLLMServer(reply="not json") as server:
+        client = llm.LLMClient(api_key="test", base_url=server.base_url)
+        monkeypatch.setattr(llm, "get_llm_client", lambda: client)
+        try:
+            with task_budget(max_attempts=3, timeout=None):
+                with pytest.raises(RetryBudgetExceeded):
+                    for _ in range(5):
+                        await llm.chat_completion("prompt")
+        finally:
+            await client.aclose()
+
+    assert server.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_random_failures_are_retried(monkeypatch):
+    with FakeLLMServer(reply="Yes", failure_rate=0.5, seed=3) as server:
+        client = llm.LLMClient(api_key="test", base_url=server.base_url)
+        monkeypatch.setattr(llm, "get_llm_client", lambda: client)
+        try:
+            for _ in range(5):
+                assert await llm.chat_completion("Is this realistic?") == "Yes"
+        finally:
+            await client.aclose()
+
+    assert (server.requests, server.failures) == (11, 6)
+    assert retry_stats()["llm"]["retry"] == 6
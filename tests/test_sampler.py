@@ -0,0 +1,54 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.config import POSSIBLE_CUISINES, POSSIBLE_DISH_TYPES
+from app.core.sampler import ParameterSampler
+from app.schemas.recipe_schemas import Recipe
+
+
+def test_same_seed_draws_the_same_parameters():
+    first = ParameterSampler("weighted", seed=7).sample(Recipe(), 50)
+    second = ParameterSampler("weighted", seed=7).sample(Recipe(), 50)
+
+    assert first == second
+    assert first != ParameterSampler("weighted", seed=8).sample(Recipe(), 50)
+    assert all(params.amountOfPersons is not None and params.cuisineList is not None for params in first)
+
+
+def test_given_values_are_kept_and_weights_are_overridden():
+    params = Recipe(dishType="main", allergiesList=["nuts"])
+    sampler = ParameterSampler("weighted", weights={"Italian": 0, "amountOfPersons:4": 100}, seed=1)
+    filled = sampler.sample(params, 500)
+
+    assert params.amountOfPersons is None
+    assert all(item.dishType == "main" and item.allergiesList == ["nuts"] for item in filled)
+    assert not any("Italian" in item.cuisineList for item in filled)
+    assert all(len(set(item.cuisineList)) == len(item.cuisineList) for item in filled)
+    assert Counter(item.amountOfPersons for item in filled).most_common(1)[0][0] == 4
+
+    for weights in ({"Klingon": 1}, {"colour:red": 1}, {"Italian": -1}):
+        with pytest.raises(ValueError):
+            ParameterSampler(weights=weights)
+
+
+def test_weighted_list_draws_follow_the_weights():
+    sampler = ParameterSampler("random", weights={"cuisineList:Italian": 8}, seed=3)
+    filled = sampler.sample(Recipe(), 4000)
+    first_picks = Counter(item.cuisineList[0] for item in filled if item.cuisineList)
+
+    assert first_picks.most_common(1)[0][0] == "Italian"
+    assert np.isclose(first_picks["Italian"] / sum(first_picks.values()), 8 / 12, atol=0.03)
+
+
+def test_stratified_mode_spreads_dish_types_and_cuisines_evenly():
+    combinations = len(POSSIBLE_DISH_TYPES) * len(POSSIBLE_CUISINES)
+    filled = ParameterSampler("stratified", seed=2).sample(Recipe(), 3 * combinations + 5)
+    counts = Counter((item.dishType, tuple(item.cuisineList)) for item in filled)
+
+    assert len(counts) == combinations
+    assert set(counts.values()) == {3, 4}
+
+    french = ParameterSampler("stratified", seed=2).sample(Recipe(cuisineList=["French"]), 8)
+    assert Counter(item.dishType for item in french) == Counter({dish_type: 2 for dish_type in POSSIBLE_DISH_TYPES})
@@ -0,0 +1,156 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.routes import recipe_routes
+from app.core import create_recipes, task_events
+from app.core.task_events import TaskEventHub, publish_task_event
+from app.db import engine, init_db
+from app.db.crud import recipe_row, save_recipes
+from app.db.database import AsyncSessionLocal
+from app.db.models import Base
+from app.main import app
+from tests.fake_redis import FakeRedis
+
+GENERATED = {"Name": "Soup", "CookingTime": "10 minutes", "RequiredTools": ["pot"],
+             "Ingredients": [{"Name": "carrot", "grams": 200}], "Step-by-step directions": ["Boil."],
+             "nutrition": {"calories": 80}, "status": "ACTIVE"}
+
+
+class FakeAsyncResult:
+    state = "PENDING"
+    info = None
+    reads = 0
+
+    def __init__(self, id, app):
+        FakeAsyncResult.reads += 1
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    async def create_schema():
+        await init_db()
+        await engine.dispose()
+
+    asyncio.run(create_schema())
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(task_events, "_redis", fake)
+    monkeypatch.setattr(task_events, "_hub", TaskEventHub(redis_factory=lambda: fake, reconnect_delay=0.01))
+    monkeypatch.setattr(recipe_routes, "AsyncResult", FakeAsyncResult)
+    FakeAsyncResult.reads = 0
+    return fake
+
+
+async def wait_for_listeners(count):
+    while task_events.get_task_event_hub().listener_count < count:
+        await asyncio.sleep(0.01)
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_one_subscription_serves_all_listeners(redis):
+    hub = task_events.get_task_event_hub()
+    recipe_id = str(uuid4())
+    try:
+        async with hub.listen(recipe_id) as first, hub.listen(recipe_id) as second, hub.listen("other") as other:
+            await publish_task_event(recipe_id, "STARTED")
+
+            assert (await first.get())["status"] == "STARTED"
+            assert (await second.get())["status"] == "STARTED"
+            assert other.empty()
+        assert hub.listener_count == 0
+    finally:
+        await hub.close()
+
+    assert redis.subscriptions == 1
+
+
+@pytest.mark.asyncio
+async def test_sse_pushes_transitions_and_the_recipe(redis):
+    recipe_id = str(uuid4())
+    recipe = {"id": recipe_id, "name": "Soup", "cooking_time": "10 minutes", "required_tools": [],
+              "ingredients": [], "steps": ["Boil."], "nutrition": {}, "status": "ACTIVE"}
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            request = asyncio.create_task(client.get(f"/recipe/{recipe_id}/events"))
+            await wait_for_listeners(1)
+            await publish_task_event(recipe_id, "STARTED")
+            await publish_task_event(recipe_id, "STARTED")
+            await publish_task_event(recipe_id, "SUCCESS", recipe=recipe)
+            response = await request
+    finally:
+        await task_events.close_task_event_hub()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [name for name, _ in events] == ["PENDING", "STARTED", "SUCCESS"]
+    assert events[-1][1]["recipe"] == recipe
+    assert FakeAsyncResult.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_saved_recipe_is_sent_without_reading_the_result_backend(redis):
+    row = recipe_row(GENERATED, str(uuid4()))
+    async with AsyncSessionLocal() as db:
+        await save_recipes(db, [row])
+
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(f"/recipe/{row['id']}/events")
+    finally:
+        await task_events.close_task_event_hub()
+
+    [(name, event)] = parse_sse(response.text)
+    assert name == "SUCCESS"
+    assert event["recipe"]["name"] == "Soup"
+    assert FakeAsyncResult.reads == 0
+
+
+def test_websocket_pushes_until_the_final_state(redis):
+    recipe_id = str(uuid4())
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/recipe/{recipe_id}/ws") as websocket:
+            assert websocket.receive_json()["status"] == "PENDING"
+            asyncio.run(publish_task_event(recipe_id, "STARTED"))
+            assert websocket.receive_json()["status"] == "STARTED"
+            asyncio.run(publish_task_event(recipe_id, "FAILURE", error="LLM unavailable"))
+            assert websocket.receive_json() == {"recipe_id": recipe_id, "status": "FAILURE",
+                                                "error": "LLM unavailable"}
+
+
+@pytest.mark.asyncio
+async def test_worker_publishes_started_and_success(redis, tmp_path, monkeypatch):
+    test_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'events.db'}")
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(create_recipes, "async_session", async_sessionmaker(bind=test_engine, expire_on_commit=False))
+
+    async def generate_valid_recipe(params, candidates=1, deadline=None):
+        return GENERATED
+
+    monkeypatch.setattr(create_recipes, "generate_valid_recipe", generate_valid_recipe)
+    recipe_id = str(uuid4())
+
+    await create_recipes.async_generate_recipe_task(None, {}, recipe_id)
+    await test_engine.dispose()
+
+    events = [json.loads(message) for _, message in redis.published]
+    assert [event["status"] for event in events] == ["STARTED", "SUCCESS"]
+    assert events[1]["recipe"]["id"] == recipe_id
+    assert events[1]["recipe"]["steps"] == ["Boil."]
@@ -0,0 +1,107 @@
+import gzip
+import json
+from uuid import UUID, uuid4
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.transfer import export_recipes, import_recipes, ndjson_lines
+from app.db import engine, init_db
+from app.db.crud import recipe_row, save_recipes, search_recipes
+from app.db.models import Base, Recipe as RecipeModel, RecipeStatus
+from app.main import app
+from app.schemas.recipe_schemas import Recipe, RecipeFilters, RecipeSearch
+
+
+def generated(number, ingredient="spinach"):
+    return {"Name": f"Dish {number}", "CookingTime": "25 minutes", "RequiredTools": ["pan"],
+            "Ingredients": [{"Name": ingredient, "grams": 100}], "Step-by-step directions": ["Cook."],
+            "nutrition": {"calories": "300 kcal"}, "status": "ACTIVE"}
+
+
+async def chunks(data: bytes, size: int = 97):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+@pytest_asyncio.fixture
+async def databases(tmp_path):
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}") for name in ("source.db", "target.db")]
+    for test_engine in engines:
+        async with test_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    yield [async_sessionmaker(bind=test_engine, expire_on_commit=False) for test_engine in engines]
+    for test_engine in engines:
+        await test_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_export_and_import_round_trip(databases):
+    source, target = databases
+    rows = [recipe_row(generated(i, "chickpeas" if i % 2 else "spinach"), str(uuid4()), Recipe(cuisineList=["Thai"]))
+            for i in range(25)]
+    rows[0]["status"] = "FROZEN"
+    async with source() as db:
+        await save_recipes(db, rows)
+        exported = b"".join([chunk async for chunk in export_recipes(db, batch_size=4)])
+
+    lines = gzip.decompress(exported).decode().splitlines()
+    assert len(lines) == 25
+    assert json.loads(lines[0])["id"] == str(min(row["id"] for row in rows))
+
+    async with target() as db:
+        result = await import_recipes(db, ndjson_lines(chunks(exported)), batch_size=4, commit_size=8)
+        assert result == {"read": 25, "written": 25, "skipped": 0, "invalid": 0}
+
+        recipe = await db.get(RecipeModel, rows[0]["id"])
+        assert (recipe.status, recipe.cuisine, recipe.cooking_minutes, recipe.calories) == \
+               (RecipeStatus.FROZEN, "Thai", 25, 300)
+        found, _ = await search_recipes(db, RecipeSearch(ingredients=["chickpea"]), RecipeFilters(), 100)
+        assert len(found) == 12
+
+        again = await import_recipes(db, ndjson_lines(chunks(exported)), update=False)
+        assert (again["written"], again["skipped"]) == (0, 25)
+        assert await db.scalar(select(func.count()).select_from(RecipeModel)) == 25
+
+
+@pytest.mark.asyncio
+async def test_import_updates_existing_recipes_and_skips_invalid_lines(databases):
+    _, target = databases
+    recipe_id = str(uuid4())
+    first = json.dumps({"id": recipe_id, "name": "Old name", "ingredients": [], "status": "ACTIVE"})
+    second = json.dumps({"id": recipe_id, "name": "New name", "ingredients": [{"Name": "rice"}],
+                         "cooking_time": "1 hour", "status": "ACTIVE"})
+    body = "\n".join([first, "not json", json.dumps({"name": "No ID"}), "", json.dumps(["list"])]).encode()
+
+    async with target() as db:
+        assert await import_recipes(db, ndjson_lines(chunks(body, 5))) == \
+               {"read": 4, "written": 1, "skipped": 0, "invalid": 3}
+        assert (await import_recipes(db, ndjson_lines(chunks(second.encode()))))["written"] == 1
+        recipe = await db.get(RecipeModel, UUID(recipe_id))
+        await db.refresh(recipe)
+        assert (recipe.name, recipe.cooking_minutes) == ("New name", 60)
+
+
+@pytest.mark.asyncio
+async def test_export_and_import_endpoints():
+    await init_db()
+    cuisine = f"Cuisine-{uuid4().hex[:8]}"
+    records = [{"id": str(uuid4()), "name": f"Dish {i}", "ingredients": [{"Name": "rice", "grams": 80}],
+                "status": "ACTIVE", "cuisine": cuisine} for i in range(3)]
+    body = gzip.compress("".join(json.dumps(record) + "\n" for record in records).encode())
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/recipes/import", content=body)
+        assert response.json() == {"read": 3, "written": 3, "skipped": 0, "invalid": 0}
+
+        response = await client.get("/recipes/export", params={"cuisine": cuisine})
+        assert response.headers["content-type"] == "application/gzip"
+        exported = [json.loads(line) for line in gzip.decompress(response.content).splitlines()]
+        assert sorted(record["id"] for record in exported) == sorted(record["id"] for record in records)
+
+        response = await client.post("/recipes/import?on_conflict=skip", content=body)
+        assert response.json()["skipped"] == 3
+    await engine.dispose()
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core import llm
+from app.core.worker_loop import WorkerLoop
+
+
+@pytest.fixture
+def worker_loop():
+    loop = WorkerLoop()
+    yield loop
+    loop.stop()
+
+
+def test_coroutines_share_one_loop_and_client(worker_loop, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def current():
+        return asyncio.get_running_loop(), llm.get_llm_client()
+
+    first_loop, first_client = worker_loop.run(current())
+    second_loop, second_client = worker_loop.run(current())
+
+    assert first_loop is second_loop is worker_loop.loop
+    assert first_client is second_client
+
+
+def test_clients_of_other_loops_are_closed(worker_loop, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def current():
+        return llm.get_llm_client()
+
+    async def replace():
+        client = llm.get_llm_client()
+        await asyncio.sleep(0.1)
+        return client
+
+    on_worker = worker_loop.run(current())
+    on_first_run = asyncio.run(replace())
+    assert on_worker._http_client.is_closed and not on_first_run._http_client.is_closed
+    asyncio.run(replace())
+    assert on_first_run._http_client.is_closed
+    asyncio.run(llm.close_llm_client())
+
+
+def test_tasks_from_several_threads_run_concurrently(worker_loop):
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    async def task():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        await asyncio.sleep(0.1)
+        with lock:
+            running -= 1
+        return threading.current_thread().name
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        names = list(pool.map(lambda _: worker_loop.run(task()), range(4)))
+
+    assert names == ["worker-event-loop"] * 4
+    assert peak == 4